@@ -1,12 +1,26 @@
 from __future__ import annotations
 
 import asyncio
+import ctypes
 import functools
 import json
+import shutil
+import sqlite3
+import zipfile
 from base64 import b64encode
 from datetime import datetime
 from pathlib import Path
-from typing import TYPE_CHECKING, List, NamedTuple, Optional, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import aiohttp
 import discord
@@ -15,6 +29,7 @@ from redbot.core import Config, commands
 from redbot.core.bot import Red
 from redbot.core.data_manager import cog_data_path
 from redbot.core.i18n import Translator, get_locale
+from redbot.core.utils import bounded_gather
 from redbot.core.utils.menus import start_adding_reactions
 from redbot.core.utils.predicates import ReactionPredicate
 from yarl import URL
@@ -43,6 +58,7 @@ from .errors import (
     Destiny2RefreshTokenError,
     ServersUnavailable,
 )
+from .manifest import DefinitionCache, ManifestStore, SearchIndex
 
 if TYPE_CHECKING:
     from .destiny import Destiny
@@ -57,6 +73,10 @@ BASE_HEADERS = {"User-Agent": "Red-TrustyCogs-DestinyCog"}
 
 BSKY_URL = "https://public.api.bsky.app/xrpc/app.bsky.feed.getAuthorFeed"
 
+MANIFEST_CHUNK_SIZE = 1024 * 64
+# Number of definitions requested from the API at once when the manifest is missing
+API_CONCURRENCY = 5
+
 COMPONENTS = DestinyComponents(
     DestinyComponentType.profiles,
     DestinyComponentType.profile_inventories,
@@ -175,6 +195,8 @@ class DestinyAPI:
             headers=headers,
         )
         self._manifest: dict = {}
+        self.manifest = ManifestStore(cog_data_path(cog) / "manifest.sqlite3")
+        self.definitions = DefinitionCache()
         self.throttle: float = 0.0
         self.extra_session = aiohttp.ClientSession(headers=BASE_HEADERS)
         # extra session for anything not bungie.net based
@@ -199,6 +221,7 @@ class DestinyAPI:
     async def close(self):
         await self.session.close()
         await self.extra_session.close()
+        self.manifest.close()
 
     async def request_url(
         self, url: URL, params: Optional[dict] = None, headers: Optional[dict] = None
@@ -652,6 +675,11 @@ class DestinyAPI:
         """
         This loads the entity from the saved manifest
         """
+        if not d1 and self.manifest.has(entity):
+            data = self.manifest.get_all(entity)
+            if cache:
+                self._manifest[entity] = data
+            return data
         if d1:
             path = cog_data_path(self.cog) / f"d1/{entity}.json"
         else:
@@ -684,7 +712,49 @@ class DestinyAPI:
         This will attempt to get a definition from the manifest
         if the manifest is missing it will try and pull the data
         from the API
+
+        Recently used definitions are kept in memory so only
+        hashes that haven't been seen lately are looked up.
+        """
+        if d1:
+            return await self._get_definition(entity, entity_hash, d1)
+        keys = [str(h) for h in entity_hash]
+        items = {}
+        missing = []
+        for key in keys:
+            data = self.definitions.get(entity, key)
+            if data is None:
+                missing.append(key)
+            else:
+                items[key] = data
+        if missing:
+            found = await self._get_definition(entity, missing)
+            for key, data in found.items():
+                self.definitions.set(entity, key, data)
+            items.update(found)
+        # keep the order the hashes were requested in
+        return {k: items[k] for k in keys if k in items}
+
+    async def get_definitions(self, entity_hashes: Dict[str, Iterable]) -> Dict[str, dict]:
+        """
+        Get definitions from multiple tables at once
+
+        `entity_hashes` is the definition table name and the hashes needed from it.
+        Returns the definitions found keyed by table and hash.
         """
+        entities = list(entity_hashes)
+        results = await asyncio.gather(
+            *[self.get_definition(e, list(dict.fromkeys(entity_hashes[e]))) for e in entities]
+        )
+        return dict(zip(entities, results))
+
+    async def _get_definition(self, entity: str, entity_hash: list, d1: bool = False) -> dict:
+        loop = asyncio.get_running_loop()
+        if not d1 and entity not in self._manifest:
+            if await loop.run_in_executor(None, self.manifest.has, entity):
+                # only read the rows we need rather than the whole table
+                task = functools.partial(self.manifest.get, entity, entity_hash)
+                return await loop.run_in_executor(None, task)
         items = {}
         try:
             data = await self.get_entities(entity, d1)
@@ -710,18 +780,54 @@ class DestinyAPI:
             headers = await self.build_headers()
         except Exception:
             raise Destiny2APIError
-        items = {}
-        for hashes in entity_hash:
-            url = URL(f"/Platform/Destiny2/Manifest/{entity}/{hashes}/")
-            data = await self.request_url(url, headers=headers)
-            items[str(hashes)] = data
-            # items.append(data)
-        return items
+        hashes = [str(h) for h in dict.fromkeys(entity_hash)]
+        results = await bounded_gather(
+            *[
+                self.request_url(
+                    URL(f"/Platform/Destiny2/Manifest/{entity}/{h}/"), headers=headers
+                )
+                for h in hashes
+            ],
+            limit=API_CONCURRENCY,
+        )
+        return dict(zip(hashes, results))
+
+    async def get_search_index(self, entity: str) -> Optional[SearchIndex]:
+        index = self.manifest.loaded_search_index(entity)
+        if index is None:
+            loop = asyncio.get_running_loop()
+            index = await loop.run_in_executor(None, self.manifest.search_index, entity)
+        return index
+
+    async def search_names(
+        self, entity: str, query: str, limit: int = 25
+    ) -> List[Tuple[str, str]]:
+        """
+        Get the hash and name of the best matches for `query`
 
-    async def search_definition(self, entity: str, entity_hash: str, d1: bool = False) -> dict:
+        This only loads names so it's fast enough for autocomplete
+        """
+        index = await self.get_search_index(entity)
+        if index is not None:
+            return index.search(query, limit)
+        items = await self.search_definition(entity, query)
+        return [(k, v["displayProperties"]["name"]) for k, v in items.items()][:limit]
+
+    async def search_definition(
+        self, entity: str, entity_hash: str, d1: bool = False, *, limit: int = 25
+    ) -> dict:
         """
         This is a helper to search clean names for a given definition of data
+
+        Matching names are ranked exact, then starting with, then containing the search
+        when the manifest has a search index for the entity.
         """
+        if not d1:
+            index = await self.get_search_index(entity)
+            if index is not None:
+                hashes = [str(entity_hash)] if str(entity_hash).isdigit() else []
+                hashes += [h for h, name in index.search(str(entity_hash), limit)]
+                return await self.get_definition(entity, hashes)
         try:
             data = await self.get_entities(entity, d1)
         except Exception:
@@ -1232,43 +1338,75 @@ class DestinyAPI:
         with path.open(encoding="utf-8", mode="w") as f:
             json.dump(data, f, indent=4, sort_keys=False, separators=(",", " : "))
 
-    def save_manifest(self, data: dict, d1: bool = False):
-        simple_items = {}
-        for key, value in data.items():
+    def _manifest_rows(
+        self, source: sqlite3.Connection, table: str, simple_items: Optional[dict] = None
+    ) -> Iterator[Tuple[str, str]]:
+        # most tables are keyed by an integer id but some use a text key
+        for _id, data in source.execute(f'SELECT * FROM "{table}"'):
+            try:
+                hash_id = str(ctypes.c_uint32(_id).value)
+            except TypeError:
+                hash_id = str(_id)
+            if simple_items is not None:
+                item_data = json.loads(data)
+                simple_items[hash_id] = {
+                    "displayProperties": item_data["displayProperties"],
+                    "itemType": item_data.get("itemType", 0),
+                    "hash": int(hash_id),
+                    "loreHash": item_data.get("loreHash", None),
+                }
+            yield hash_id, data
+
+    def _manifest_tables(self, source: sqlite3.Connection) -> Iterator[Tuple[str, Iterator]]:
+        tables = source.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        for (key,) in tables:
             path = cog_data_path(self.cog) / f"{key}.json"
-            if key in self._manifest:
-                self._manifest[key] = value
-            with path.open(encoding="utf-8", mode="w") as f:
-                if self.bot.user.id in DEV_BOTS:
+            simple_items = {} if key == "DestinyInventoryItemDefinition" else None
+            rows = self._manifest_rows(source, key, simple_items)
+            if self.bot.user.id in DEV_BOTS:
+                rows = list(rows)
+                with path.open(encoding="utf-8", mode="w") as f:
                     json.dump(
-                        value,
+                        {k: json.loads(v) for k, v in rows},
                         f,
                         indent=4,
                         sort_keys=False,
                         separators=(",", " : "),
                     )
-                else:
-                    json.dump(value, f)
-            if key == "DestinyInventoryItemDefinition":
-                for item_hash, item_data in value.items():
-                    simple_items[item_hash] = {
-                        "displayProperties": item_data["displayProperties"],
-                        "itemType": item_data.get("itemType", 0),
-                        "hash": int(item_hash),
-                        "loreHash": item_data.get("loreHash", None),
-                    }
-                path = cog_data_path(self.cog) / "simpleitems.json"
-                with path.open(encoding="utf-8", mode="w") as f:
-                    if self.bot.user.id in DEV_BOTS:
-                        json.dump(
-                            simple_items,
-                            f,
-                            indent=4,
-                            sort_keys=False,
-                            separators=(",", " : "),
-                        )
-                    else:
-                        json.dump(simple_items, f)
+            else:
+                # old manifests were saved as json files which are no longer needed
+                path.unlink(missing_ok=True)
+            yield key, rows
+            if simple_items is not None:
+                (cog_data_path(self.cog) / "simpleitems.json").unlink(missing_ok=True)
+                yield "simpleitems", ((k, json.dumps(v)) for k, v in simple_items.items())
+
+    def save_manifest(self, path: Path, d1: bool = False):
+        """
+        Build the manifest store from a downloaded SQLite manifest
+
+        Tables are copied over one row at a time so the whole manifest
+        never has to be loaded into memory at once.
+        """
+        directory = path.parent / "manifest_download"
+        try:
+            with zipfile.ZipFile(str(path), "r") as zip_ref:
+                db_name = zip_ref.namelist()[0]
+                zip_ref.extract(db_name, str(directory))
+            source = sqlite3.connect(str(directory / db_name))
+            try:
+                self.manifest.build(self._manifest_tables(source))
+            finally:
+                source.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+            path.unlink(missing_ok=True)
+        for key in list(self._manifest):
+            # refresh anything that was cached from the old manifest
+            if self.manifest.has(key):
+                self._manifest[key] = self.manifest.get_all(key)
+            else:
+                del self._manifest[key]
 
     async def get_manifest_data(self) -> Optional[dict]:
         try:
@@ -1294,26 +1432,18 @@ class DestinyAPI:
             return
         if d1:
             manifest_data = await self.get_d1_manifest_data()
-            if not manifest_data:
-                return
-            locale = get_locale()
-            if locale in manifest_data:
-                manifest = manifest_data["mobileWorldContentPaths"][locale]
-            elif locale[:-3] in manifest_data:
-                manifest = manifest_data["mobileWorldContentPaths"][locale[:-3]]
-            else:
-                manifest = manifest_data["mobileWorldContentPaths"]["en"]
         else:
+            # D2 uses the same SQLite manifest as D1 since it can be read one row at a time
             manifest_data = await self.get_manifest_data()
-            if manifest_data is None:
-                return
-            locale = get_locale()
-            if locale in manifest_data:
-                manifest = manifest_data["jsonWorldContentPaths"][locale]
-            elif locale[:-3] in manifest_data:
-                manifest = manifest_data["jsonWorldContentPaths"][locale[:-3]]
-            else:
-                manifest = manifest_data["jsonWorldContentPaths"]["en"]
+        if not manifest_data:
+            return
+        locale = get_locale()
+        if locale in manifest_data:
+            manifest = manifest_data["mobileWorldContentPaths"][locale]
+        elif locale[:-3] in manifest_data:
+            manifest = manifest_data["mobileWorldContentPaths"][locale[:-3]]
+        else:
+            manifest = manifest_data["mobileWorldContentPaths"]["en"]
         async with self.session.get(URL(manifest), headers=headers, timeout=None) as resp:
             if d1:
                 data = await resp.read()
@@ -1321,13 +1451,20 @@ class DestinyAPI:
                 loop = asyncio.get_running_loop()
                 await loop.run_in_executor(None, task)
             else:
-                # response_data = await resp.text()
-                # data = json.loads(response_data)
-                data = await resp.json()
-                loop = asyncio.get_running_loop()
-                task = functools.partial(self.save_manifest, data)
-                await loop.run_in_executor(None, task)
-                await self.config.manifest_version.set(manifest_data["version"])
+                if resp.status != 200:
+                    log.error("Could not download the manifest: %s", resp.status)
+                    raise Destiny2APIError
+                # stream the download to disk rather than holding it all in memory
+                path = cog_data_path(self.cog) / "manifest_download.zip"
+                with path.open(mode="wb") as f:
+                    async for chunk in resp.content.iter_chunked(MANIFEST_CHUNK_SIZE):
+                        f.write(chunk)
+        if not d1:
+            loop = asyncio.get_running_loop()
+            task = functools.partial(self.save_manifest, path)
+            await loop.run_in_executor(None, task)
+            self.definitions.clear()
+            await self.config.manifest_version.set(manifest_data["version"])
         return manifest_data["version"]
 
     def download_d1_manifest(self, data):
@@ -1435,9 +1572,7 @@ class DestinyAPI:
         return (False, "")
 
     async def get_weapon_possible_perks(self, weapon: dict) -> dict:
-        perks = {}
-        slot_counter = 1
-        count = 2
+        sockets = []
         for socket in weapon["sockets"]["socketEntries"]:
             if socket["singleInitialItemHash"] in [
                 4248210736,
@@ -1450,23 +1585,54 @@ class DestinyAPI:
                 continue
             if socket["socketTypeHash"] in [2218962841, 1282012138, 1456031260]:
                 continue
-            if "randomizedPlugSetHash" in socket:
-                pool = (
-                    await self.get_definition(
-                        "DestinyPlugSetDefinition", [socket["randomizedPlugSetHash"]]
-                    )
-                )[str(socket["randomizedPlugSetHash"])]
-                pool_perks = [v["plugItemHash"] for v in pool["reusablePlugItems"]]
-                all_perks = await self.get_definition(
-                    "DestinyInventoryItemLiteDefinition", pool_perks
-                )
+            sockets.append(socket)
+        # look up every definition a stage needs at once instead of one socket at a time
+        plug_set_hashes = [
+            s.get("randomizedPlugSetHash", s.get("reusablePlugSetHash"))
+            for s in sockets
+            if "randomizedPlugSetHash" in s or "reusablePlugSetHash" in s
+        ]
+        defs = await self.get_definitions(
+            {
+                "DestinyPlugSetDefinition": plug_set_hashes,
+                "DestinyInventoryItemLiteDefinition": [
+                    s["singleInitialItemHash"] for s in sockets
+                ],
+            }
+        )
+        plug_sets = defs["DestinyPlugSetDefinition"]
+        perk_hashes = [
+            v["plugItemHash"] for pool in plug_sets.values() for v in pool["reusablePlugItems"]
+        ]
+        all_items = await self.get_definition("DestinyInventoryItemLiteDefinition", perk_hashes)
+        all_items.update(defs["DestinyInventoryItemLiteDefinition"])
+        pools = {}
+        for plug_set_hash, pool in plug_sets.items():
+            pools[plug_set_hash] = {
+                str(v["plugItemHash"]): all_items[str(v["plugItemHash"])]
+                for v in pool["reusablePlugItems"]
+                if str(v["plugItemHash"]) in all_items
+            }
+        category_hashes = []
+        for pool_perks in pools.values():
+            try:
+                category_hashes.append(next(iter(pool_perks.values()))["itemCategoryHashes"][0])
+            except (StopIteration, IndexError):
+                pass
+        categories = await self.get_definition("DestinyItemCategoryDefinition", category_hashes)
+
+        perks = {}
+        slot_counter = 1
+        count = 2
+        for socket in sockets:
+            plug_set_hash = socket.get("randomizedPlugSetHash", socket.get("reusablePlugSetHash"))
+            if plug_set_hash is not None:
+                all_perks = pools[str(plug_set_hash)]
                 try:
                     # https://stackoverflow.com/questions/44914727/get-first-and-second-values-in-dictionary-in-cpython-3-6
                     it = iter(all_perks.values())
                     key_hash = next(it)["itemCategoryHashes"][0]
-                    key_data = (
-                        await self.get_definition("DestinyItemCategoryDefinition", [key_hash])
-                    )[str(key_hash)]
+                    key_data = categories[str(key_hash)]
                     key = key_data["displayProperties"]["name"]
                     if key in perks:
                         key = f"{key} {count}"
@@ -1478,49 +1644,8 @@ class DestinyAPI:
                 )
                 slot_counter += 1
                 continue
-            if "reusablePlugSetHash" in socket:
-                pool = (
-                    await self.get_definition(
-                        "DestinyPlugSetDefinition", [socket["reusablePlugSetHash"]]
-                    )
-                )[str(socket["reusablePlugSetHash"])]
-                pool_perks = [v["plugItemHash"] for v in pool["reusablePlugItems"]]
-                all_perks = await self.get_definition(
-                    "DestinyInventoryItemLiteDefinition", pool_perks
-                )
-                try:
-                    it = iter(all_perks.values())
-                    key_hash = next(it)["itemCategoryHashes"][0]
-                    key_data = (
-                        await self.get_definition("DestinyItemCategoryDefinition", [key_hash])
-                    )[str(key_hash)]
-                    key = key_data["displayProperties"]["name"]
-                    if key in perks:
-                        key = f"{key} {count}"
-                        count += 1
-                except IndexError:
-                    key = _("Perk {count}").format(count=slot_counter)
-                perks[key] = "\n".join(
-                    [p["displayProperties"]["name"] for h, p in all_perks.items()]
-                )
-                slot_counter += 1
-                continue
-            perk_hash = socket["singleInitialItemHash"]
-            perk = (await self.get_definition("DestinyInventoryItemLiteDefinition", [perk_hash]))[
-                str(perk_hash)
-            ]
-            try:
-                it = iter(all_perks.values())
-                key_hash = next(it)["itemCategoryHashes"][0]
-                key_data = (
-                    await self.get_definition("DestinyItemCategoryDefinition", [key_hash])
-                )[str(key_hash)]
-                key = key_data[0]["displayProperties"]["name"]
-                if key in perks:
-                    key = f"{key} {count}"
-                    count += 1
-            except (IndexError, KeyError):
-                key = _("Perk {count}").format(count=slot_counter)
+            perk = all_items[str(socket["singleInitialItemHash"])]
+            key = _("Perk {count}").format(count=slot_counter)
             perks[key] = perk["displayProperties"]["name"]
             slot_counter += 1
         return perks
@@ -131,6 +131,15 @@ class Destiny(commands.Cog):
             self._ready.set()
             return
         loop = asyncio.get_running_loop()
+        for name in await loop.run_in_executor(None, self.api.manifest.entities):
+            task = functools.partial(self.api.manifest.get_all, name)
+            try:
+                self.api._manifest[name] = await asyncio.wait_for(
+                    loop.run_in_executor(None, task), timeout=180
+                )
+            except asyncio.TimeoutError:
+                log.info("Error loading manifest data")
+                continue
         for file in cog_data_path(self).iterdir():
             if (
                 not file.is_file()
@@ -139,8 +148,11 @@ class Destiny(commands.Cog):
             ):
                 # ignore config's settings file and
                 continue
-            task = functools.partial(self.api.load_file, file=file)
             name = file.name.replace(".json", "")
+            if name in self.api._manifest:
+                # already loaded from the manifest store
+                continue
+            task = functools.partial(self.api.load_file, file=file)
             try:
                 self.api._manifest[name] = await asyncio.wait_for(
                     loop.run_in_executor(None, task), timeout=180
@@ -738,10 +750,9 @@ class Destiny(commands.Cog):
 
     @items.autocomplete("search")
     async def parse_search_items(self, interaction: discord.Interaction, current: str):
-        possible_options = await self.api.search_definition("simpleitems", current)
+        possible_options = await self.api.search_names("simpleitems", current)
         choices = []
-        for hash_key, data in possible_options.items():
-            name = data["displayProperties"]["name"]
+        for hash_key, name in possible_options:
             if name:
                 choices.append(app_commands.Choice(name=name, value=hash_key))
         return choices[:25]
@@ -1169,15 +1180,16 @@ class Destiny(commands.Cog):
 
     async def get_character_description(self, char: dict) -> str:
         info = ""
-        race = (await self.api.get_definition("DestinyRaceDefinition", [char["raceHash"]]))[
-            str(char["raceHash"])
-        ]
-        gender = (await self.api.get_definition("DestinyGenderDefinition", [char["genderHash"]]))[
-            str(char["genderHash"])
-        ]
-        char_class = (
-            await self.api.get_definition("DestinyClassDefinition", [char["classHash"]])
-        )[str(char["classHash"])]
+        defs = await self.api.get_definitions(
+            {
+                "DestinyRaceDefinition": [char["raceHash"]],
+                "DestinyGenderDefinition": [char["genderHash"]],
+                "DestinyClassDefinition": [char["classHash"]],
+            }
+        )
+        race = defs["DestinyRaceDefinition"][str(char["raceHash"])]
+        gender = defs["DestinyGenderDefinition"][str(char["genderHash"])]
+        char_class = defs["DestinyClassDefinition"][str(char["classHash"])]
         info += "{race} {gender} {char_class} ".format(
             race=race["displayProperties"]["name"],
             gender=gender["displayProperties"]["name"],
@@ -1250,10 +1262,9 @@ class Destiny(commands.Cog):
         last_played = datetime.datetime.strptime(
             char["dateLastPlayed"], "%Y-%m-%dT%H:%M:%SZ"
         ).replace(tzinfo=datetime.timezone.utc)
+        stat_defs = await self.api.get_definition("DestinyStatDefinition", list(char["stats"]))
         for stat_hash, value in char["stats"].items():
-            stat_info = (await self.api.get_definition("DestinyStatDefinition", [stat_hash]))[
-                str(stat_hash)
-            ]
+            stat_info = stat_defs[str(stat_hash)]
             stat_name = stat_info["displayProperties"]["name"]
             prog = "█" * int(value / 10)
             empty = "░" * int((100 - value) / 10)
@@ -2443,20 +2454,7 @@ class Destiny(commands.Cog):
         for char_id, loadouts in chars["characterLoadouts"]["data"].items():
             ret[char_id] = {"embeds": [], "char_info": ""}
             char = chars["characters"]["data"][char_id]
-            race = (await self.api.get_definition("DestinyRaceDefinition", [char["raceHash"]]))[
-                str(char["raceHash"])
-            ]
-            gender = (
-                await self.api.get_definition("DestinyGenderDefinition", [char["genderHash"]])
-            )[str(char["genderHash"])]
-            char_class = (
-                await self.api.get_definition("DestinyClassDefinition", [char["classHash"]])
-            )[str(char["classHash"])]
-            info = "{race} {gender} {char_class} ".format(
-                race=race["displayProperties"]["name"],
-                gender=gender["displayProperties"]["name"],
-                char_class=char_class["displayProperties"]["name"],
-            )
+            info = await self.get_character_description(char)
             ret[char_id]["char_info"] = info
             for loadout in loadouts["loadouts"]:
                 name = names.get(str(loadout["nameHash"]))
@@ -2667,21 +2665,7 @@ class Destiny(commands.Cog):
             bnet_code = chars["profile"]["data"]["userInfo"]["bungieGlobalDisplayNameCode"]
             bnet_name = f"{bnet_display_name}#{bnet_code}"
             for char_id, char in chars["characters"]["data"].items():
-                info = ""
-                race = (
-                    await self.api.get_definition("DestinyRaceDefinition", [char["raceHash"]])
-                )[str(char["raceHash"])]
-                gender = (
-                    await self.api.get_definition("DestinyGenderDefinition", [char["genderHash"]])
-                )[str(char["genderHash"])]
-                char_class = (
-                    await self.api.get_definition("DestinyClassDefinition", [char["classHash"]])
-                )[str(char["classHash"])]
-                info += "{race} {gender} {char_class} ".format(
-                    race=race["displayProperties"]["name"],
-                    gender=gender["displayProperties"]["name"],
-                    char_class=char_class["displayProperties"]["name"],
-                )
+                info = await self.get_character_description(char)
                 titles = ""
                 title_name = ""
                 if "titleRecordHash" in char:
@@ -2722,6 +2706,21 @@ class Destiny(commands.Cog):
                 # log.debug(item_list)
                 items = await self.api.get_definition("DestinyInventoryItemDefinition", item_list)
                 # log.debug(items)
+                # look up the perks and mods for all the gear at once
+                item_perks = chars["itemComponents"]["perks"]["data"]
+                item_sockets = chars["itemComponents"]["sockets"]["data"]
+                gear_hashes = {
+                    "DestinySandboxPerkDefinition": [],
+                    "DestinyInventoryItemDefinition": [],
+                }
+                for item in char_items:
+                    instance_id = item.get("itemInstanceId")
+                    for p in item_perks.get(instance_id, {}).get("perks", []):
+                        gear_hashes["DestinySandboxPerkDefinition"].append(p["perkHash"])
+                    for p in item_sockets.get(instance_id, {}).get("sockets", []):
+                        if "plugHash" in p:
+                            gear_hashes["DestinyInventoryItemDefinition"].append(p["plugHash"])
+                gear_defs = await self.api.get_definitions(gear_hashes)
                 weapons = ""
                 for item_hash, data in items.items():
                     # log.debug(data)
@@ -2742,10 +2741,12 @@ class Destiny(commands.Cog):
                         except KeyError:
                             light = ""
                         perk_list = chars["itemComponents"]["perks"]["data"][instance_id]["perks"]
-                        perk_hashes = [p["perkHash"] for p in perk_list]
-                        perk_data = await self.api.get_definition(
-                            "DestinySandboxPerkDefinition", perk_hashes
-                        )
+                        perk_defs = gear_defs["DestinySandboxPerkDefinition"]
+                        perk_data = {
+                            str(p["perkHash"]): perk_defs[str(p["perkHash"])]
+                            for p in perk_list
+                            if str(p["perkHash"]) in perk_defs
+                        }
                         perks = ""
                         for perk_hash, perk in perk_data.items():
                             properties = perk["displayProperties"]
@@ -2762,10 +2763,12 @@ class Destiny(commands.Cog):
                         mod_list = chars["itemComponents"]["sockets"]["data"][instance_id][
                             "sockets"
                         ]
-                        mod_hashes = [p["plugHash"] for p in mod_list if "plugHash" in p]
-                        mod_data = await self.api.get_definition(
-                            "DestinyInventoryItemDefinition", mod_hashes
-                        )
+                        mod_defs = gear_defs["DestinyInventoryItemDefinition"]
+                        mod_data = {
+                            str(p["plugHash"]): mod_defs[str(p["plugHash"])]
+                            for p in mod_list
+                            if str(p.get("plugHash")) in mod_defs
+                        }
                         mods = ""
                         for mod_hash, mod in mod_data.items():
                             properties = mod["displayProperties"]
@@ -2779,10 +2782,11 @@ class Destiny(commands.Cog):
                     # embed.add_field(name=name, value=value, inline=True)
                 # log.debug(data)
                 stats_str = ""
+                stat_defs = await self.api.get_definition(
+                    "DestinyStatDefinition", list(char["stats"])
+                )
                 for stat_hash, value in char["stats"].items():
-                    stat_info = (
-                        await self.api.get_definition("DestinyStatDefinition", [stat_hash])
-                    )[str(stat_hash)]
+                    stat_info = stat_defs[str(stat_hash)]
                     stat_name = stat_info["displayProperties"]["name"]
                     prog = "█" * int(value / 10)
                     empty = "░" * int((100 - value) / 10)
@@ -2997,21 +3001,7 @@ class Destiny(commands.Cog):
         aggregate: dict,
         acts: dict,
     ) -> discord.Embed:
-        char_info = ""
-        race = (await self.api.get_definition("DestinyRaceDefinition", [char["raceHash"]]))[
-            str(char["raceHash"])
-        ]
-        gender = (await self.api.get_definition("DestinyGenderDefinition", [char["genderHash"]]))[
-            str(char["genderHash"])
-        ]
-        char_class = (
-            await self.api.get_definition("DestinyClassDefinition", [char["classHash"]])
-        )[str(char["classHash"])]
-        char_info += "{race} {gender} {char_class} ".format(
-            race=race["displayProperties"]["name"],
-            gender=gender["displayProperties"]["name"],
-            char_class=char_class["displayProperties"]["name"],
-        )
+        char_info = await self.get_character_description(char)
         ATTRS = {
             "opponentsDefeated": _("Opponents Defeated"),
             "efficiency": _("Efficiency"),
@@ -3068,21 +3058,7 @@ class Destiny(commands.Cog):
     async def build_stat_embed_char_gambit(
         self, user: discord.Member, char: dict, data: dict, stat_type: str
     ) -> discord.Embed:
-        char_info = ""
-        race = (await self.api.get_definition("DestinyRaceDefinition", [char["raceHash"]]))[
-            str(char["raceHash"])
-        ]
-        gender = (await self.api.get_definition("DestinyGenderDefinition", [char["genderHash"]]))[
-            str(char["genderHash"])
-        ]
-        char_class = (
-            await self.api.get_definition("DestinyClassDefinition", [char["classHash"]])
-        )[str(char["classHash"])]
-        char_info += "{race} {gender} {char_class} ".format(
-            race=race["displayProperties"]["name"],
-            gender=gender["displayProperties"]["name"],
-            char_class=char_class["displayProperties"]["name"],
-        )
+        char_info = await self.get_character_description(char)
         ATTRS = {
             "opponentsDefeated": _("Opponents Defeated"),
             "efficiency": _("Efficiency"),
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from red_commons.logging import getLogger
+
+log = getLogger("red.trusty-cogs.Destiny")
+
+# SQLite versions before 3.32 only allow 999 variables in a single statement
+MAX_VARIABLES = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS definitions (
+    entity TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (entity, hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entities (
+    name TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS search (
+    entity TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (entity, hash)
+) WITHOUT ROWID;
+"""
+
+# Definition tables which can be searched by name
+SEARCH_ENTITIES = ("DestinyInventoryItemDefinition", "DestinyVendorDefinition")
+# Tables which share the search index of another table
+SEARCH_ALIASES = {"simpleitems": "DestinyInventoryItemDefinition"}
+
+
+def searchable_name(value: dict) -> Optional[str]:
+    """The display name of a definition if it's worth searching for"""
+    if value.get("itemType", 0) == 20:
+        # We generally don't care about dummy items in the lookup
+        return None
+    return value.get("displayProperties", {}).get("name") or None
+
+
+class SearchIndex:
+    """
+    Finds definitions by display name.
+
+    Names are kept sorted so exact and prefix matches are a binary search
+    and every three letter sequence points to the names containing it so
+    substring matches only check a few candidates.
+    Results are ranked exact, then prefix, then substring matches
+    and alphabetically within each group.
+    """
+
+    def __init__(self, names: Iterable[Tuple[str, str]]):
+        entries = sorted((name.lower(), item_hash, name) for item_hash, name in names)
+        self._keys: List[str] = [e[0] for e in entries]
+        self._hashes: List[str] = [e[1] for e in entries]
+        self._names: List[str] = [e[2] for e in entries]
+        trigrams: Dict[str, List[int]] = {}
+        for idx, key in enumerate(self._keys):
+            for trigram in {key[i : i + 3] for i in range(len(key) - 2)}:
+                trigrams.setdefault(trigram, []).append(idx)
+        self._trigrams: Dict[str, array] = {k: array("I", v) for k, v in trigrams.items()}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _substrings(self, query: str) -> Iterable[int]:
+        if len(query) < 3:
+            return range(len(self._keys))
+        smallest = None
+        for i in range(len(query) - 2):
+            postings = self._trigrams.get(query[i : i + 3])
+            if postings is None:
+                return ()
+            if smallest is None or len(postings) < len(smallest):
+                smallest = postings
+        return smallest
+
+    def search(self, query: str, limit: int = 25) -> List[Tuple[str, str]]:
+        """Return the hash and name of the best `limit` matches for `query`"""
+        query = query.lower()
+        results: List[int] = []
+        start = bisect_left(self._keys, query)
+        # exact matches sort before everything else starting with the query
+        for idx in range(start, len(self._keys)):
+            if len(results) >= limit or not self._keys[idx].startswith(query):
+                break
+            results.append(idx)
+        if len(results) < limit:
+            for idx in self._substrings(query):
+                key = self._keys[idx]
+                if query in key and not key.startswith(query):
+                    results.append(idx)
+                    if len(results) >= limit:
+                        break
+        return [(self._hashes[idx], self._names[idx]) for idx in results]
+
+
+class DefinitionCache:
+    """
+    The most recently used definitions.
+
+    Commands tend to look up the same stats, classes and perks over and over
+    so keeping these around saves reading them from the manifest every time.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._cache: OrderedDict[Tuple[str, str], dict] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, entity: str, item_hash: str) -> Optional[dict]:
+        key = (entity, item_hash)
+        data = self._cache.get(key)
+        if data is not None:
+            self._cache.move_to_end(key)
+        return data
+
+    def set(self, entity: str, item_hash: str, data: dict) -> None:
+        key = (entity, item_hash)
+        self._cache[key] = data
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class ManifestStore:
+    """
+    The Destiny 2 manifest stored in SQLite.
+
+    Every definition is its own row keyed by the definition table and hash
+    so looking up a few definitions only reads those rows instead of loading
+    a whole definition file into memory.
+
+    All methods block and should be run in an executor.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._entities: Optional[Set[str]] = None
+        self._indexes: Dict[str, Optional[SearchIndex]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._entities = None
+            self._indexes = {}
+
+    def entities(self) -> Set[str]:
+        """The names of every definition table in the store"""
+        with self._lock:
+            if self._entities is None:
+                if not self.path.is_file():
+                    return set()
+                rows = self._connect().execute("SELECT name FROM entities").fetchall()
+                self._entities = {row[0] for row in rows}
+            return self._entities
+
+    def has(self, entity: str) -> bool:
+        return entity in self.entities()
+
+    def get(self, entity: str, hashes: Iterable) -> Dict[str, dict]:
+        """Get the definitions for `hashes` from the `entity` table"""
+        keys = list(dict.fromkeys(str(h) for h in hashes))
+        items: Dict[str, dict] = {}
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(keys), MAX_VARIABLES):
+                chunk = keys[i : i + MAX_VARIABLES]
+                query = (
+                    "SELECT hash, data FROM definitions WHERE entity = ? AND hash IN ({})"
+                ).format(",".join("?" * len(chunk)))
+                rows = conn.execute(query, (entity, *chunk)).fetchall()
+                for item_hash, data in rows:
+                    items[item_hash] = json.loads(data)
+        # keep the order the hashes were requested in
+        return {k: items[k] for k in keys if k in items}
+
+    def get_all(self, entity: str) -> Dict[str, dict]:
+        """Get every definition in the `entity` table"""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute("SELECT hash, data FROM definitions WHERE entity = ?", (entity,))
+                .fetchall()
+            )
+        return {item_hash: json.loads(data) for item_hash, data in rows}
+
+    def loaded_search_index(self, entity: str) -> Optional[SearchIndex]:
+        """The search index for `entity` if it has already been built, this never blocks"""
+        return self._indexes.get(SEARCH_ALIASES.get(entity, entity))
+
+    def search_index(self, entity: str) -> Optional[SearchIndex]:
+        """
+        Get the name search index for `entity`
+
+        Returns `None` if the entity can't be searched this way.
+        """
+        entity = SEARCH_ALIASES.get(entity, entity)
+        if entity not in SEARCH_ENTITIES or not self.has(entity):
+            return None
+        with self._lock:
+            if entity not in self._indexes:
+                rows = (
+                    self._connect()
+                    .execute("SELECT hash, name FROM search WHERE entity = ?", (entity,))
+                    .fetchall()
+                )
+                # manifests saved before the search table existed need to be downloaded again
+                self._indexes[entity] = SearchIndex(rows) if rows else None
+            return self._indexes[entity]
+
+    def build(self, tables: Iterable[Tuple[str, Iterable[Tuple[str, str]]]]) -> None:
+        """
+        Build a new manifest from definition tables and swap it in
+
+        `tables` yields each table name with its hashes and definition json.
+        Rows are written as they are read so only one definition needs
+        to be in memory at a time and the name search index is built in the
+        same pass. The new manifest is written next to the current one which
+        keeps working until the finished file replaces it.
+        """
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        conn = sqlite3.connect(str(tmp))
+        names: List[str] = []
+        try:
+            # this file is thrown away if anything goes wrong
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            with conn:
+                for entity, rows in tables:
+                    names.append(entity)
+                    conn.execute("INSERT INTO entities (name) VALUES (?)", (entity,))
+                    search: List[Tuple[str, str, str]] = []
+                    if entity in SEARCH_ENTITIES:
+                        rows = self._index_rows(entity, rows, search)
+                    conn.executemany(
+                        "INSERT INTO definitions (entity, hash, data) VALUES (?, ?, ?)",
+                        ((entity, item_hash, data) for item_hash, data in rows),
+                    )
+                    conn.executemany(
+                        "INSERT INTO search (entity, hash, name) VALUES (?, ?, ?)", search
+                    )
+        except Exception:
+            conn.close()
+            tmp.unlink(missing_ok=True)
+            raise
+        conn.close()
+        with self._lock:
+            # the current connection has to be closed before the file can be replaced on windows
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            os.replace(tmp, self.path)
+            self._entities = set(names)
+            self._indexes = {}
+        log.debug("Saved %s manifest tables to %s", len(names), self.path)
+
+    @staticmethod
+    def _index_rows(
+        entity: str, rows: Iterable[Tuple[str, str]], search: List[Tuple[str, str, str]]
+    ) -> Iterator[Tuple[str, str]]:
+        for item_hash, data in rows:
+            name = searchable_name(json.loads(data))
+            if name:
+                search.append((entity, item_hash, name))
+            yield item_hash, data
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+import discord
+from red_commons.logging import getLogger
+
+logger = getLogger("red.trusty-cogs.ExtendedModLog")
+
+# How long to wait for an audit log entry to arrive before asking the API for it
+AUDIT_LOG_TIMEOUT = 5.0
+# Audit log entries older than this are ignored to reduce false positives
+MAX_AGE = datetime.timedelta(minutes=10)
+# Upper limit of entries kept per guild no matter how busy it is
+MAX_ENTRIES = 1000
+# Audit log entries may be created slightly before the event is received
+CLOCK_SKEW = datetime.timedelta(seconds=10)
+
+TargetID = Union[int, str, None]
+
+
+@dataclass
+class AuditLogQuery:
+    """
+    Describes the audit log entry an event is looking for.
+
+    Entries created before `after` belong to an earlier event and never match
+    unless they are `grouped`, Discord groups repeated message deletes into
+    the first entry and only increases its count.
+    """
+
+    action: discord.AuditLogAction
+    target_id: TargetID = None
+    extra: Optional[str] = None
+    added_roles: List[discord.Role] = field(default_factory=list)
+    removed_roles: List[discord.Role] = field(default_factory=list)
+    channel_id: Optional[int] = None
+    after: datetime.datetime = field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc) - CLOCK_SKEW
+    )
+
+    def matches(self, entry: discord.AuditLogEntry, *, grouped: bool = False) -> bool:
+        if entry.action != self.action:
+            return False
+        if entry.created_at < self.after and not (
+            grouped and self.action is discord.AuditLogAction.message_delete
+        ):
+            return False
+        if self.target_id is not None and self.target_id not in (
+            getattr(entry.target, "id", None),
+            getattr(entry.target, "code", None),
+        ):
+            return False
+        if self.channel_id is not None and self.action is discord.AuditLogAction.message_delete:
+            ex = getattr(entry, "extra", None)
+            if ex is not None and ex.channel is not None and ex.channel.id == self.channel_id:
+                return True
+        if self.extra is not None and getattr(entry.after, self.extra, None) is None:
+            return False
+        if entry.action is discord.AuditLogAction.member_role_update and (
+            self.added_roles or self.removed_roles
+        ):
+            log_before = set(getattr(entry.before, "roles", []))
+            log_after = set(getattr(entry.after, "roles", []))
+            log_added = {r.id for r in log_after - log_before}
+            log_removed = {r.id for r in log_before - log_after}
+            return any(r.id in log_added for r in self.added_roles) or any(
+                r.id in log_removed for r in self.removed_roles
+            )
+        return True
+
+
+class AuditLogCorrelator:
+    """
+    Matches events to the audit log entries that caused them.
+
+    Entries from `on_audit_log_entry_create` are kept per guild for
+    `MAX_AGE` and indexed by action and target. Events that arrive before
+    their audit log entry wait for it to show up instead of sleeping.
+    If nothing shows up in time the API is asked once per guild and action
+    no matter how many events are waiting on it.
+
+    Grouped entries whose count went up since they were last seen can be
+    matched by one event per increase even though they were created earlier.
+    """
+
+    def __init__(self, timeout: float = AUDIT_LOG_TIMEOUT):
+        self.timeout = timeout
+        self._entries: Dict[int, OrderedDict[int, discord.AuditLogEntry]] = {}
+        self._by_target: Dict[
+            int, Dict[Tuple[discord.AuditLogAction, TargetID], List[discord.AuditLogEntry]]
+        ] = {}
+        self._waiters: Dict[
+            Tuple[int, discord.AuditLogAction], List[Tuple[AuditLogQuery, asyncio.Future]]
+        ] = {}
+        self._fetches: Dict[Tuple[int, discord.AuditLogAction], asyncio.Task] = {}
+        # entry ID -> increases in count not yet matched to an event
+        self._unclaimed: Dict[int, int] = {}
+
+    @staticmethod
+    def _target_id(entry: discord.AuditLogEntry) -> TargetID:
+        target = entry.target
+        return getattr(target, "id", None) or getattr(target, "code", None)
+
+    @staticmethod
+    def _count(entry: discord.AuditLogEntry) -> Optional[int]:
+        return getattr(getattr(entry, "extra", None), "count", None)
+
+    def _matches(self, query: AuditLogQuery, entry: discord.AuditLogEntry) -> bool:
+        grouped = self._unclaimed.get(entry.id, 0) > 0
+        if not query.matches(entry, grouped=grouped):
+            return False
+        if grouped and entry.created_at < query.after:
+            self._unclaimed[entry.id] -= 1
+        return True
+
+    def _prune(self, guild_id: int) -> None:
+        entries = self._entries[guild_id]
+        now = datetime.datetime.now(datetime.timezone.utc)
+        while entries:
+            entry = next(iter(entries.values()))
+            if len(entries) <= MAX_ENTRIES and now - entry.created_at <= MAX_AGE:
+                break
+            entries.popitem(last=False)
+            self._unclaimed.pop(entry.id, None)
+            key = (entry.action, self._target_id(entry))
+            indexed = self._by_target[guild_id].get(key, [])
+            if entry in indexed:
+                indexed.remove(entry)
+            if not indexed:
+                self._by_target[guild_id].pop(key, None)
+
+    def add(self, entry: discord.AuditLogEntry) -> None:
+        """Store a new audit log entry and wake up any events waiting for it"""
+        guild_id = entry.guild.id
+        entries = self._entries.setdefault(guild_id, OrderedDict())
+        key = (entry.action, self._target_id(entry))
+        old = entries.get(entry.id)
+        if old is not None:
+            count, old_count = self._count(entry), self._count(old)
+            if count is None or old_count is None or count <= old_count:
+                return
+            self._unclaimed[entry.id] = self._unclaimed.get(entry.id, 0) + count - old_count
+            entries[entry.id] = entry
+            indexed = self._by_target[guild_id].get(key, [])
+            if old in indexed:
+                indexed[indexed.index(old)] = entry
+        else:
+            entries[entry.id] = entry
+            self._by_target.setdefault(guild_id, {}).setdefault(key, []).append(entry)
+            self._prune(guild_id)
+        waiters = self._waiters.get((guild_id, entry.action))
+        if not waiters:
+            return
+        for waiter in list(waiters):
+            query, fut = waiter
+            if not fut.done() and self._matches(query, entry):
+                fut.set_result(entry)
+                waiters.remove(waiter)
+
+    def find(self, guild_id: int, query: AuditLogQuery) -> Optional[discord.AuditLogEntry]:
+        """Find the newest stored entry matching `query`"""
+        if query.target_id is not None:
+            indexed = self._by_target.get(guild_id, {}).get((query.action, query.target_id), [])
+            for entry in reversed(indexed):
+                if self._matches(query, entry):
+                    return entry
+        for entry in reversed(self._entries.get(guild_id, {}).values()):
+            if self._matches(query, entry):
+                return entry
+        return None
+
+    async def _fetch(self, guild: discord.Guild, action: discord.AuditLogAction) -> None:
+        try:
+            async for entry in guild.audit_logs(limit=5, action=action):
+                self.add(entry)
+        finally:
+            self._fetches.pop((guild.id, action), None)
+
+    async def fetch(self, guild: discord.Guild, action: discord.AuditLogAction) -> None:
+        """Get the latest entries for `action` from the API, shared between concurrent callers"""
+        key = (guild.id, action)
+        if key not in self._fetches:
+            self._fetches[key] = asyncio.create_task(self._fetch(guild, action))
+        await asyncio.shield(self._fetches[key])
+
+    async def wait_for(
+        self, guild: discord.Guild, query: AuditLogQuery
+    ) -> Optional[discord.AuditLogEntry]:
+        """
+        Get the audit log entry matching `query`
+
+        Waits up to `timeout` seconds for the entry to arrive
+        before falling back to asking the API. The API is also how grouped
+        entries are noticed since Discord doesn't send an event when their
+        count goes up.
+        """
+        entry = self.find(guild.id, query)
+        if entry is not None:
+            logger.trace("Found entry through cache")
+            return entry
+        fut = asyncio.get_running_loop().create_future()
+        waiter = (query, fut)
+        waiters = self._waiters.setdefault((guild.id, query.action), [])
+        waiters.append(waiter)
+        try:
+            entry = await asyncio.wait_for(fut, timeout=self.timeout)
+            logger.trace("Found entry through gateway")
+            return entry
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters and self._waiters.get((guild.id, query.action)) is waiters:
+                del self._waiters[(guild.id, query.action)]
+        await self.fetch(guild, query.action)
+        entry = self.find(guild.id, query)
+        if entry is not None:
+            logger.trace("Found entry through fetch")
+        return entry
+
+    def close(self) -> None:
+        for task in self._fetches.values():
+            task.cancel()
+        for waiters in self._waiters.values():
+            for query, fut in waiters:
+                fut.cancel()
+        self._fetches.clear()
+        self._waiters.clear()
+        self._unclaimed.clear()
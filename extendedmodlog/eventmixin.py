@@ -1,8 +1,7 @@
 import asyncio
 import datetime
-from collections import deque
 from enum import Enum
-from typing import Any, Deque, Dict, List, Optional, Sequence, Union, cast
+from typing import Any, Dict, List, Optional, Sequence, Union, cast
 
 import discord
 from discord.ext import tasks
@@ -20,6 +19,8 @@ from redbot.core.utils.chat_formatting import (
     pagify,
 )
 
+from .auditlog import CLOCK_SKEW, MAX_AGE, AuditLogCorrelator, AuditLogQuery
+
 _ = i18n.Translator("ExtendedModLog", __file__)
 logger = getLogger("red.trusty-cogs.ExtendedModLog")
 
@@ -123,7 +124,7 @@ class EventMixin:
     settings: Dict[int, Any]
     _ban_cache: Dict[int, List[int]]
     allowed_mentions: discord.AllowedMentions
-    audit_log: Dict[int, Deque[discord.AuditLogEntry]]
+    audit_logs: AuditLogCorrelator
 
     async def save(self, guild: discord.Guild) -> None:
         async with self.config.guild(guild).all() as all_settings:
@@ -780,7 +781,10 @@ class EventMixin:
             await self.save_invite_links(guild)  # Save all the invites again since they've changed
         if check_logs and not possible_link:
             action = discord.AuditLogAction.invite_create
-            entry = await self.get_audit_log_entry(guild, None, action)
+            # the invite is always created before the member joins with it
+            entry = await self.get_audit_log_entry(
+                guild, None, action, after=datetime.datetime.now(datetime.timezone.utc) - MAX_AGE
+            )
             if entry and entry.target is not None:
                 invite: discord.Invite = cast(discord.Invite, entry.target)
                 possible_link = _("https://discord.gg/{code}\nInvited by: {inviter}").format(
@@ -1168,9 +1172,7 @@ class EventMixin:
 
     @commands.Cog.listener()
     async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
-        if entry.guild.id not in self.audit_log:
-            self.audit_log[entry.guild.id] = deque(maxlen=10)
-        self.audit_log[entry.guild.id].append(entry)
+        self.audit_logs.add(entry)
 
     async def get_audit_log_entry(
         self,
@@ -1191,6 +1193,7 @@ class EventMixin:
         removed_roles: Optional[List[discord.Role]] = None,
         added_roles: Optional[List[discord.Role]] = None,
         channel_id: Optional[int] = None,
+        after: Optional[datetime.datetime] = None,
     ) -> Optional[discord.AuditLogEntry]:
         entry = None
         if isinstance(target, int) or target is None:
@@ -1201,115 +1204,17 @@ class EventMixin:
             target_id = target.id
 
         if guild.me.guild_permissions.view_audit_log:
-            await asyncio.sleep(5)
-            # wait 5 seconds incase the audit log entry is slow and we prioritize the cache
-            if guild.id in self.audit_log:
-                for log in self.audit_log[guild.id]:
-                    if log.action != action:
-                        continue
-                    if (
-                        datetime.datetime.now(datetime.timezone.utc) - log.created_at
-                    ) > datetime.timedelta(minutes=10):
-                        # ignore audit log actions older than 10 minutes
-                        # to reduce instances of false positives
-                        continue
-                    if channel_id is not None and action is discord.AuditLogAction.message_delete:
-                        ex = getattr(log, "extra", None)
-                        if (
-                            ex is not None
-                            and ex.channel is not None
-                            and ex.channel.id == channel_id
-                        ):
-                            entry = log
-
-                    if extra is not None and getattr(log.after, extra, None) is None:
-                        continue
-                    if log.action is discord.AuditLogAction.member_role_update:
-                        log_before = getattr(log.before, "roles", [])
-                        log_after = getattr(log.after, "roles", [])
-                        log_removed = [r.id for r in set(set(log_before) - set(log_after))]
-                        log_added = [r.id for r in set(set(log_after) - set(log_before))]
-                        if added_roles:
-                            a_roles = [r.id for r in added_roles]
-                            if set(a_roles) == set(log_added):
-                                entry = log
-                                # This entry matches identically
-                                continue
-                            else:
-                                for role in added_roles:
-                                    if role.id in log_added:
-                                        entry = log
-                                        # this may be the correct log entry
-                        if removed_roles:
-                            r_roles = [r.id for r in removed_roles]
-                            if set(r_roles) == set(log_removed):
-                                entry = log
-                                # This entry matches identically
-                                continue
-                            else:
-                                for role in removed_roles:
-                                    if role.id in log_added:
-                                        entry = log
-                                        # this may be the correct log entry
-
-                    if target_id == getattr(log.target, "id", None) and entry is None:
-                        logger.trace("Found entry through cache")
-                        entry = log
-                    if target_id == getattr(log.target, "code", None):
-                        logger.trace("Found invite code entry through cache")
-                        entry = log
-
-            if entry is None:
-                async for log in guild.audit_logs(limit=5, action=action):
-                    if (
-                        datetime.datetime.now(datetime.timezone.utc) - log.created_at
-                    ) > datetime.timedelta(minutes=10):
-                        # ignore audit log actions older than 10 minutes
-                        # to reduce instances of false positives
-                        continue
-                    if channel_id is not None and action is discord.AuditLogAction.message_delete:
-                        ex = getattr(log, "extra", None)
-                        if (
-                            ex is not None
-                            and ex.channel is not None
-                            and ex.channel.id == channel_id
-                        ):
-                            entry = log
-
-                    if extra is not None and getattr(log.after, extra, None) is None:
-                        continue
-                    if log.action is discord.AuditLogAction.member_role_update:
-                        log_before = getattr(log.before, "roles", [])
-                        log_after = getattr(log.after, "roles", [])
-                        log_removed = [r.id for r in set(set(log_before) - set(log_after))]
-                        log_added = [r.id for r in set(set(log_after) - set(log_before))]
-                        if added_roles:
-                            a_roles = [r.id for r in added_roles]
-                            if set(a_roles) == set(log_added):
-                                entry = log
-                                # This entry matches identically
-                            else:
-                                for role in added_roles:
-                                    if role.id in log_added:
-                                        entry = log
-                                        # this may be the correct log entry
-                        if removed_roles:
-                            r_roles = [r.id for r in removed_roles]
-                            if set(r_roles) == set(log_removed):
-                                entry = log
-                                # This entry matches identically
-                            else:
-                                for role in removed_roles:
-                                    if role.id in log_added:
-                                        entry = log
-                                        # this may be the correct log entry
-                    if target_id == getattr(log.target, "id", None) and entry is None:
-                        logger.trace("Found entry through fetch")
-                        entry = log
-                        break
-                    if target_id == getattr(log.target, "code", None):
-                        logger.trace("Found invite code entry through fetch")
-                        entry = log
+            query = AuditLogQuery(
+                action=action,
+                target_id=target_id,
+                extra=extra,
+                added_roles=added_roles or [],
+                removed_roles=removed_roles or [],
+                channel_id=channel_id,
+            )
+            if after is not None:
+                query.after = after - CLOCK_SKEW
+            entry = await self.audit_logs.wait_for(guild, query)
         logger.info("Returning %s reason", entry.reason if entry is not None else None)
         return entry
 
@@ -2154,6 +2059,7 @@ class EventMixin:
                                 before,
                                 discord.AuditLogAction.member_role_update,
                                 removed_roles=[role],
+                                after=time,
                             )
                             perp = getattr(entry, "user", None)
                             reason = getattr(entry, "reason", None)
@@ -2176,6 +2082,7 @@ class EventMixin:
                                 before,
                                 discord.AuditLogAction.member_role_update,
                                 added_roles=[role],
+                                after=time,
                             )
                             perp = getattr(entry, "user", None)
                             reason = getattr(entry, "reason", None)
@@ -2239,7 +2146,7 @@ class EventMixin:
                         ).format(author=after.mention, since=since, relative=relative)
                 else:
                     entry = await self.get_audit_log_entry(
-                        guild, before, discord.AuditLogAction.member_update
+                        guild, before, discord.AuditLogAction.member_update, after=time
                     )
                     perp = getattr(entry, "user", None)
                     reason = getattr(entry, "reason", None)
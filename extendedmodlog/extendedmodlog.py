@@ -1,4 +1,4 @@
-from typing import Deque, Dict, Union
+from typing import Union
 
 import discord
 from red_commons.logging import getLogger
@@ -6,6 +6,7 @@ from redbot.core import Config, checks, commands, modlog
 from redbot.core.i18n import Translator, cog_i18n
 from redbot.core.utils.chat_formatting import humanize_list
 
+from .auditlog import AuditLogCorrelator
 from .eventmixin import CommandPrivs, EventChooser, EventMixin, MemberUpdateEnum
 from .settings import inv_settings
 
@@ -73,7 +74,7 @@ class ExtendedModLog(EventMixin, commands.Cog):
         self._ban_cache = {}
         self.invite_links_loop.start()
         self.allowed_mentions = discord.AllowedMentions(users=False, roles=False, everyone=False)
-        self.audit_log: Dict[int, Deque[discord.AuditLogEntry]] = {}
+        self.audit_logs = AuditLogCorrelator()
 
     def format_help_for_context(self, ctx: commands.Context):
         """
@@ -84,6 +85,7 @@ class ExtendedModLog(EventMixin, commands.Cog):
 
     async def cog_unload(self):
         self.invite_links_loop.stop()
+        self.audit_logs.close()
 
     async def red_delete_data_for_user(self, **kwargs):
         """
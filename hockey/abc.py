@@ -2,7 +2,7 @@ import asyncio
 from abc import ABC, abstractmethod
 from datetime import datetime
 from io import BytesIO
-from typing import Dict, List, Literal, Optional, Union
+from typing import Dict, List, Literal, Optional, Tuple, Union
 
 import aiohttp
 import discord
@@ -11,10 +11,13 @@ from redbot.core.bot import Red
 
 from .api import NewAPI
 from .game import Game
+from .gameday import GamedayRun
+from .gamestore import GameStateStore
 from .helper import (
     DateFinder,
     LeaderboardFinder,
     PlayerFinder,
+    SendLimiter,
     StandingsFinder,
     StateFinder,
     Team,
@@ -23,6 +26,7 @@ from .helper import (
 )
 from .pickems import Pickems
 from .stats import LeaderCategories
+from .subscriptions import ChannelSubscriptions
 
 
 class HockeyMixin(ABC):
@@ -43,6 +47,9 @@ class HockeyMixin(ABC):
         self.pickems_config: Config
         self._ready: asyncio.Event
         self.api: NewAPI
+        self.subscriptions: ChannelSubscriptions
+        self.send_limiter: SendLimiter
+        self.game_store: GameStateStore
 
     #######################################################################
     # hockey_commands.py                                                  #
@@ -251,7 +258,12 @@ class HockeyMixin(ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    async def create_gdc(self, guild: discord.Guild, game_data: Optional[Game] = None) -> None:
+    async def create_gdc(
+        self,
+        guild: discord.Guild,
+        game_data: Optional[Game] = None,
+        run: Optional[GamedayRun] = None,
+    ) -> None:
         raise NotImplementedError()
 
     @abstractmethod
@@ -308,7 +320,12 @@ class HockeyMixin(ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    async def create_gdt(self, guild: discord.Guild, game_data: Optional[Game] = None) -> None:
+    async def create_gdt(
+        self,
+        guild: discord.Guild,
+        game_data: Optional[Game] = None,
+        run: Optional[GamedayRun] = None,
+    ) -> None:
         raise NotImplementedError()
 
     @abstractmethod
@@ -495,6 +512,22 @@ class HockeyMixin(ABC):
     async def save_pickems_data(self) -> None:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def expire_old_pickems(self) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def track_pickem(self, guild_id: str, name: str, pickem: Pickems) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def track_pickem_message(self, pickem: Pickems, message: str) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def remove_pickem(self, guild_id: str, name: str) -> Optional[Pickems]:
+        raise NotImplementedError()
+
     @abstractmethod
     async def after_pickems_loop(self) -> None:
         raise NotImplementedError()
@@ -576,7 +609,11 @@ class HockeyMixin(ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    async def tally_guild_leaderboard(self, guild: discord.Guild) -> None:
+    async def tally_guild_leaderboard(
+        self,
+        guild: discord.Guild,
+        deposits: Optional[Dict[int, Tuple[discord.Member, int]]] = None,
+    ) -> None:
         raise NotImplementedError()
 
     @abstractmethod
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
+import itertools
 import json
-from collections import namedtuple
+import time
+from collections import OrderedDict, namedtuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import Enum
@@ -21,6 +26,7 @@ from .game import Game, GameState, GameType
 from .goal import Goal
 from .helper import Team
 from .player import PlayerStats, Roster, SearchPlayer
+from .render import LogoCache, RenderCache
 from .standings import Playoffs, Standings
 
 TEAM_IDS = {v["id"]: k for k, v in TEAMS.items()}
@@ -563,7 +569,9 @@ class Event:
                 away_sog += 1
         return away_sog, home_sog
 
-    def to_goal(self, data: dict, content: Optional[dict] = None) -> Goal:
+    def to_goal(
+        self, data: dict, content: Optional[dict] = None, sog: Optional[Tuple[int, int]] = None
+    ) -> Goal:
         scorer_id = self.details.get("scoringPlayerId", 0)
         if scorer_id == 0:
             scorer_id = self.details.get("shootingPlayerId", 0)
@@ -586,7 +594,7 @@ class Event:
         if period_ord == "REG":
             period_ord = ORDINALS.get(self.period)
         home = data["homeTeam"]["id"] == team_id
-        away_sog, home_sog = self.get_sog(data)
+        away_sog, home_sog = sog if sog is not None else self.get_sog(data)
         game_id = data.get("id", -1)
         return Goal(
             goal_id=self.id,
@@ -715,17 +723,141 @@ class Schedule:
         return cls(days, url)
 
 
+# Seconds responses are considered fresh before asking the API again.
+PBP_TTL = 10
+LANDING_TTL = 120
+RIGHT_RAIL_TTL = 120
+SCHEDULE_TTL = 60
+STANDINGS_TTL = 300
+
+_response_versions = itertools.count()
+
+
+@dataclass
+class CachedResponse:
+    """
+    A cached API response.
+
+    `version` changes only when the body of the response changes so callers
+    can skip work when the data they were given is the same as last time.
+    """
+
+    data: Any
+    version: int
+    expires: float
+    digest: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
 class HockeyAPI:
-    def __init__(self, base_url: Union[URL, str], *, testing: bool = False):
+    def __init__(self, base_url: Union[URL, str], *, testing: bool = False, max_cached: int = 128):
         self.base_url = URL(base_url)
         self.session = aiohttp.ClientSession(
             self.base_url, headers={"User-Agent": "Red-DiscordBot Trusty-cogs Hockey"}
         )
         self.testing = testing
+        self.max_cached = max_cached
+        self._responses: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.requests: int = 0
+        self.not_modified: int = 0
+        self.cache_hits: int = 0
 
     async def close(self):
         await self.session.close()
 
+    async def get_cached(self, url: URL, ttl: float) -> CachedResponse:
+        """
+        Get a response from the cache or the API.
+
+        Responses are reused for `ttl` seconds. After that the API is asked
+        again with the responses ETag so unchanged data doesn't have to be
+        downloaded and parsed again. Concurrent requests for the same URL
+        share a single request.
+        """
+        key = str(url)
+        cached = self._responses.get(key)
+        if cached is not None and cached.expires > time.monotonic():
+            self.cache_hits += 1
+            self._responses.move_to_end(key)
+            return cached
+        if key in self._in_flight:
+            self.cache_hits += 1
+            return await asyncio.shield(self._in_flight[key])
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await self._fetch(url, ttl, cached)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            # make sure the exception is marked as retrieved if nobody was waiting
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _fetch(
+        self, url: URL, ttl: float, cached: Optional[CachedResponse]
+    ) -> CachedResponse:
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        self.requests += 1
+        async with self.session.get(url, headers=headers) as resp:
+            if resp.status == 304 and cached is not None:
+                self.not_modified += 1
+                cached.expires = time.monotonic() + ttl
+                return cached
+            if resp.status != 200:
+                log.error("Error accessing %s. %s", resp.url, resp.status)
+                raise HockeyAPIError(
+                    "There was an error accessing the API.", resp.status, resp.url
+                )
+            log.trace("Hockey %s headers %s", url, resp.headers)
+            body = await resp.read()
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+        return self._store(url, ttl, cached, body, etag, last_modified)
+
+    def _store(
+        self,
+        url: URL,
+        ttl: float,
+        cached: Optional[CachedResponse],
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CachedResponse:
+        """Cache a downloaded response body, keeping the old version if it hasn't changed"""
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        if cached is not None and cached.digest == digest:
+            # The API doesn't always support conditional requests
+            # so the body is compared before parsing it again.
+            cached.expires = time.monotonic() + ttl
+            cached.etag = etag
+            cached.last_modified = last_modified
+            return cached
+        response = CachedResponse(
+            data=json.loads(body),
+            version=next(_response_versions),
+            expires=time.monotonic() + ttl,
+            digest=digest,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        key = str(url)
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_cached:
+            self._responses.popitem(last=False)
+        return response
+
 
 class StatsType(Enum):
     skater = "skater"
@@ -971,6 +1103,12 @@ class NewAPI(HockeyAPI):
         self.records_api = RecordsAPI(testing=testing)
         self.team_emojis: Dict[str, discord.Emoji] = {}
         self.cog_path = cog_path
+        # (game_id, include_extras) -> (response versions, Game)
+        self._games: OrderedDict[Tuple[int, bool], Tuple[Tuple[int, ...], Game]] = OrderedDict()
+        # (response version, Standings)
+        self._standings: Optional[Tuple[int, Standings]] = None
+        self.render_cache = RenderCache()
+        self.logos = LogoCache(self.logo_path)
 
     @property
     def logo_path(self) -> Path:
@@ -1004,14 +1142,7 @@ class NewAPI(HockeyAPI):
             data = await self.load_testing_data("testschedule.json")
             return Schedule.from_nhle(data, url=self.base_url.join(url), api=self)
 
-        async with self.session.get(url) as resp:
-            if resp.status != 200:
-                log.error("Error accessing the Schedule for now. %s", resp.status)
-                raise HockeyAPIError(
-                    "There was an error accessing the API.", resp.status, resp.url
-                )
-            log.trace("Hockey Schedule headers %s", resp.headers)
-            data = await resp.json()
+        data = (await self.get_cached(url, SCHEDULE_TTL)).data
         return Schedule.from_nhle(data, url=self.base_url.join(url), api=self)
 
     async def search_player(
@@ -1125,40 +1256,25 @@ class NewAPI(HockeyAPI):
         if self.testing:
             data = await self.load_testing_data("test-landing.json")
             return data
+        return (await self._landing_response(game_id)).data
+
+    async def _landing_response(self, game_id: int) -> CachedResponse:
         url = URL(f"/v1/gamecenter/{game_id}/landing")
-        async with self.session.get(url) as resp:
-            if resp.status != 200:
-                log.error("Error accessing the games landing page. %s", resp.status)
-                raise HockeyAPIError(
-                    "There was an error accessing the API.", resp.status, resp.url
-                )
-            log.trace("Hockey GC landing headers %s", resp.headers)
-            data = await resp.json()
-        return data
+        return await self.get_cached(url, LANDING_TTL)
 
     async def gamecenter_pbp(self, game_id: int):
+        return (await self._pbp_response(game_id)).data
+
+    async def _pbp_response(self, game_id: int) -> CachedResponse:
         url = URL(f"/v1/gamecenter/{game_id}/play-by-play")
-        async with self.session.get(url) as resp:
-            if resp.status != 200:
-                log.error("Error accessing the games play-by-play. %s", resp.status)
-                raise HockeyAPIError(
-                    "There was an error accessing the API.", resp.status, resp.url
-                )
-            log.trace("Hockey GC pbp headers %s", resp.headers)
-            data = await resp.json()
-        return data
+        return await self.get_cached(url, PBP_TTL)
 
     async def gamecenter_right_rail(self, game_id: int):
+        return (await self._right_rail_response(game_id)).data
+
+    async def _right_rail_response(self, game_id: int) -> CachedResponse:
         url = URL(f"/v1/gamecenter/{game_id}/right-rail")
-        async with self.session.get(url) as resp:
-            if resp.status != 200:
-                log.error("Error accessing the games right rail. %s", resp.status)
-                raise HockeyAPIError(
-                    "There was an error accessing the API.", resp.status, resp.url
-                )
-            log.trace("Hockey GC rr headers %s", resp.headers)
-            data = await resp.json()
-        return data
+        return await self.get_cached(url, RIGHT_RAIL_TTL)
 
     async def gamecenter_boxscore(self, game_id: int):
         url = URL(f"/v1/gamecenter/{game_id}/boxscore")
@@ -1174,15 +1290,7 @@ class NewAPI(HockeyAPI):
 
     async def standings_now(self):
         url = URL("/v1/standings/now")
-        async with self.session.get(url) as resp:
-            if resp.status != 200:
-                log.error("Error accessing the standings at %s. %s", resp.url, resp.status)
-                raise HockeyAPIError(
-                    "There was an error accessing the API.", resp.status, resp.url
-                )
-            log.trace("Hockey standings headers %s", resp.headers)
-            data = await resp.json()
-        return data
+        return (await self.get_cached(url, STANDINGS_TTL)).data
 
     async def get_schedule(
         self,
@@ -1199,8 +1307,12 @@ class NewAPI(HockeyAPI):
         return await self.schedule_now()
 
     async def get_standings(self) -> Standings:
-        data = await self.standings_now()
-        return Standings.from_nhle(data, self)
+        resp = await self.get_cached(URL("/v1/standings/now"), STANDINGS_TTL)
+        if self._standings is not None and self._standings[0] == resp.version:
+            return self._standings[1]
+        standings = Standings.from_nhle(resp.data, self)
+        self._standings = (resp.version, standings)
+        return standings
 
     async def get_playoffs(self, date: Optional[Union[datetime, int]] = None):
         if date is None:
@@ -1250,7 +1362,9 @@ class NewAPI(HockeyAPI):
             data = await self.load_testing_data("testgame.json")
             landing = await self.gamecenter_landing(game_id)
             return await self.to_game(data, landing=landing)
-        data = await self.gamecenter_pbp(game_id)
+        pbp = await self._pbp_response(game_id)
+        data = pbp.data
+        versions = [pbp.version]
         period = data.get("periodDescriptor", {}).get("number", -1)
         period_time_left = data.get("clock", {}).get("timeRemaining")
         game_state = GameState.from_nhle(data["gameState"], period, period_time_left)
@@ -1260,17 +1374,38 @@ class NewAPI(HockeyAPI):
             # Since we only need these for 3 stars and game recap video
             # Let's wait until after the second period before we start
             # looking for the extra API calls on this.
+            # These are cached for longer than the play-by-play since they
+            # change far less often.
             try:
-                landing = await self.gamecenter_landing(game_id)
+                landing_resp = await self._landing_response(game_id)
+                landing = landing_resp.data
+                versions.append(landing_resp.version)
             except Exception:
                 log.error("Error grabbing the %s landing page", game_id)
                 landing = None
+                versions.append(-1)
             try:
-                right_rail = await self.gamecenter_right_rail(game_id)
+                right_rail_resp = await self._right_rail_response(game_id)
+                right_rail = right_rail_resp.data
+                versions.append(right_rail_resp.version)
             except Exception:
                 log.error("Error grabbing the %s right_rail page", game_id)
                 right_rail = None
-        return await self.to_game(data, landing=landing, right_rail=right_rail)
+                versions.append(-1)
+        key = (game_id, include_extras)
+        cached = self._games.get(key)
+        if cached is not None and cached[0] == tuple(versions):
+            # Nothing has changed since we last built this game.
+            # Return a copy since the game loop changes the state of previews.
+            self._games.move_to_end(key)
+            return copy.copy(cached[1])
+        game = await self.to_game(data, landing=landing, right_rail=right_rail)
+        game.version = tuple(versions)
+        self._games[key] = (tuple(versions), game)
+        self._games.move_to_end(key)
+        while len(self._games) > self.max_cached:
+            self._games.popitem(last=False)
+        return copy.copy(game)
 
     async def get_game_recap(self, game_id: int, fr: bool = False) -> Optional[URL]:
         rr = await self.gamecenter_right_rail(game_id)
@@ -1292,6 +1427,35 @@ class NewAPI(HockeyAPI):
             return VIDEO_URL.with_query({"videoId": recap})
         return None
 
+    @staticmethod
+    def _shots_before_events(
+        data: dict,
+    ) -> Tuple[Dict[int, Tuple[int, int]], Tuple[int, int]]:
+        """
+        Count shots on goal before every shot in a single pass over the plays.
+
+        This gives the same result as `Event.get_sog` for every goal without
+        walking the play by play again for each of them.
+        """
+        home_id = data.get("homeTeam", {}).get("id", 0)
+        away_id = data.get("awayTeam", {}).get("id", 0)
+        home_sog = 0
+        away_sog = 0
+        shots = {}
+        for e in data["plays"]:
+            if e["typeCode"] not in [
+                GameEventTypeCode.GOAL.value,
+                GameEventTypeCode.SHOT_ON_GOAL.value,
+            ]:
+                continue
+            shots.setdefault(e["eventId"], (away_sog, home_sog))
+            team_id = e.get("details", {}).get("eventOwnerTeamId", -1)
+            if team_id == home_id:
+                home_sog += 1
+            if team_id == away_id:
+                away_sog += 1
+        return shots, (away_sog, home_sog)
+
     async def to_game(
         self, data: dict, landing: Optional[dict] = None, right_rail: Optional[dict] = None
     ) -> Game:
@@ -1336,7 +1500,12 @@ class NewAPI(HockeyAPI):
             if p["teamId"] == away_id
         }
         events = [Event.from_json(i, home, away, home_roster, away_roster) for i in data["plays"]]
-        goals = [e.to_goal(data, content=landing) for e in events if e.is_goal_or_shot()]
+        shots, total_shots = self._shots_before_events(data)
+        goals = [
+            e.to_goal(data, content=landing, sog=shots.get(e.id, total_shots))
+            for e in events
+            if e.is_goal_or_shot()
+        ]
         game_type = GameType.from_int(data["gameType"])
         first_star = None
         second_star = None
@@ -14,7 +14,7 @@ from redbot.core import commands
 from redbot.core.data_manager import cog_data_path
 from redbot.core.i18n import Translator
 from redbot.core.utils import AsyncIter
-from redbot.core.utils.chat_formatting import humanize_list, pagify
+from redbot.core.utils.chat_formatting import box, humanize_list, pagify
 
 from .abc import HockeyMixin
 from .constants import TEAMS
@@ -22,6 +22,7 @@ from .game import Game
 from .helper import get_channel_obj
 from .menu import BaseMenu, SimplePages
 from .pickems import Pickems
+from .replay import ReplayHarness
 from .standings import Standings
 
 _ = Translator("Hockey", __file__)
@@ -132,6 +133,7 @@ class HockeyDev(HockeyMixin):
             channel = await get_channel_obj(self.bot, channel_id, data)
             if channel is None:
                 await self.config.channel_from_id(channel_id).clear()
+                self.subscriptions.remove(channel_id)
         await ctx.tick(message="Done.")
 
     @hockeydev.command(name="errorchannel")
@@ -165,17 +167,8 @@ class HockeyDev(HockeyMixin):
         await game.check_game_state(self.bot)
         if (game.home_score + game.away_score) != 0:
             await game.check_team_goals(self.bot)
-        all_teams = await self.config.teams()
-        for team in await self.config.teams():
-            if team["team_name"] in [game.home_team, game.away_team]:
-                all_teams.remove(team)
-                team["goal_id"] = {}
-                team["game_state"] = "Null"
-                team["game_start"] = ""
-                team["period"] = 0
-                all_teams.append(team)
-
-        await self.config.teams.set(all_teams)
+        for team in [game.home_team, game.away_team]:
+            self.game_store.reset(game.game_id, team)
         await ctx.send("Done testing.")
 
     @hockeydev.group(name="pickems", with_app_command=False)
@@ -359,6 +352,7 @@ class HockeyDev(HockeyMixin):
         msg = await self.make_pickems_msg(ctx.guild, game)
         msg = await ctx.send(msg, view=fake_pickem)
         fake_pickem.messages.append(f"{ctx.channel.id}-{msg.id}")
+        self.track_pickem_message(fake_pickem, f"{ctx.channel.id}-{msg.id}")
         fake_pickem._should_save = True
 
     @pickems_dev_commands.command(name="disable", with_app_command=False)
@@ -674,6 +668,8 @@ class HockeyDev(HockeyMixin):
 
             await session.close()
             await self.load_bot_emojis()
+        if changed_logos:
+            self.api.logos.clear()
         if added:
             await ctx.send(
                 "I have uploaded the following team emojis: {teams}".format(
@@ -694,7 +690,7 @@ class HockeyDev(HockeyMixin):
         """
         Resets the bots game data incase something goes wrong
         """
-        await self.config.teams.clear()
+        await self.game_store.clear()
         await ctx.send(_("Saved game data reset."))
 
     @hockeydev.command(with_app_command=False)
@@ -718,6 +714,7 @@ class HockeyDev(HockeyMixin):
             channel = guild.get_channel(channel_id)
             if channel is None:
                 await self.config.channel_from_id(channel_id).clear()
+                self.subscriptions.remove(channel_id)
                 log.info("Removed the following channels %s", channel_id)
                 continue
             else:
@@ -733,6 +730,32 @@ class HockeyDev(HockeyMixin):
         self.TEST_LOOP = not self.TEST_LOOP
         await ctx.send(_("Test loop set to ") + str(self.TEST_LOOP))
 
+    @hockeydev.command(hidden=True, with_app_command=False)
+    async def replay(
+        self, ctx: commands.Context, name: str = "test", channels: int = 50, guilds: int = 10
+    ) -> None:
+        """
+        Replay recorded play by play data into fake channels
+
+        `<name>` The folder inside the cogs `replays` data folder holding
+        the play by play `.json` snapshots to replay in name order and
+        optionally the games `landing.json` and `right-rail.json`.
+        If the folder doesn't exist the bundled test game is used.
+        `<channels>` The number of fake channels following every team.
+        `<guilds>` The number of fake guilds the channels are spread across.
+
+        Nothing is posted to Discord, no game data is saved and the live API is never used.
+        """
+        path = cog_data_path(self) / "replays" / name
+        async with ctx.typing():
+            snapshots = ReplayHarness.load_snapshots(path)
+            if not snapshots:
+                snapshots = [await self.api.load_testing_data("testgame.json")]
+            harness = ReplayHarness(self, channels=channels, guilds=guilds)
+            report = await harness.run(snapshots, ReplayHarness.load_responses(path))
+        for page in pagify(str(report)):
+            await ctx.send(box(page))
+
     @hockeydev.command(with_app_command=False)
     async def clear_seasonal_leaderboard_all(self, ctx: commands.Context) -> None:
         """
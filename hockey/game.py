@@ -4,18 +4,24 @@ import asyncio
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from enum import Enum
-from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Set, Tuple, Union
+from typing import TYPE_CHECKING, Dict, Hashable, List, Literal, Optional, Set, Tuple, Union
 
 import discord
 from red_commons.logging import getLogger
 from redbot.core.bot import Red
 from redbot.core.i18n import Translator
-from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import humanize_list, pagify
 from yarl import URL
 
 from .goal import Goal
-from .helper import Team, check_to_post, get_channel_obj, get_team, get_team_role, utc_to_local
+from .helper import (
+    Team,
+    check_to_post,
+    game_state_name,
+    get_channel_obj,
+    get_team_role,
+    utc_to_local,
+)
 
 if TYPE_CHECKING:
     from .api import Event, Player
@@ -198,6 +204,8 @@ class Game:
         self.url = kwargs.get("url", None)
         self.landing: Optional[dict] = kwargs.get("landing", None)
         self.right_rail: Optional[dict] = kwargs.get("right_rail", None)
+        # versions of the API responses this game was built from
+        self.version: Optional[Tuple[int, ...]] = kwargs.get("version", None)
 
     def __repr__(self):
         return "<Hockey Game home={0.home_team} away={0.away_team} state={0.game_state}>".format(
@@ -654,6 +662,17 @@ class Game:
 
         return container
 
+    def render_key(self, *args: Hashable) -> Optional[Tuple[Hashable, ...]]:
+        """
+        The key used to cache embeds rendered from this game
+
+        Returns None when the game wasn't built from versioned API data
+        in which case nothing should be cached.
+        """
+        if self.version is None or self.api is None:
+            return None
+        return (self.game_id, self.version, self.game_state, *args)
+
     async def make_game_embed(
         self,
         include_plays: bool = False,
@@ -666,6 +685,26 @@ class Game:
         Builds the game embed when the command is called
         provides as much data as possible
         """
+        key = self.render_key(
+            "game", include_plays, period_goals, include_heatmap, include_gameflow, include_goals
+        )
+        if key is not None and (em := self.api.render_cache.get(key)) is not None:
+            return em
+        em = await self._make_game_embed(
+            include_plays, period_goals, include_heatmap, include_gameflow, include_goals
+        )
+        if key is not None:
+            self.api.render_cache.set(key, em)
+        return em
+
+    async def _make_game_embed(
+        self,
+        include_plays: bool,
+        period_goals: Optional[Literal["1st", "2nd", "3rd"]],
+        include_heatmap: bool,
+        include_gameflow: bool,
+        include_goals: bool,
+    ) -> discord.Embed:
         team_url = self.home.team_url
         # timestamp = datetime.strptime(self.game_start, "%Y-%m-%dT%H:%M:%SZ")
         title = "{away} @ {home} {state}".format(
@@ -752,6 +791,15 @@ class Game:
         """
         Makes the game state embed based on the game self provided
         """
+        key = self.render_key("state")
+        if key is not None and (em := self.api.render_cache.get(key)) is not None:
+            return em
+        em = await self._game_state_embed()
+        if key is not None:
+            self.api.render_cache.set(key, em)
+        return em
+
+    async def _game_state_embed(self) -> discord.Embed:
         # post_state = ["all", self.home_team, self.away_team]
         # timestamp = datetime.strptime(self.game_start, "%Y-%m-%dT%H:%M:%SZ")
         title = f"{self.away_team} @ {self.home_team} {str(self.game_state)}"
@@ -879,18 +927,17 @@ class Game:
 
     async def check_game_state(self, bot: Red, count: int = 0) -> bool:
         # post_state = ["all", self.home_team, self.away_team]
-        home = await get_team(bot, self.home_team, self.game_start_str, self.game_id)
-        await get_team(bot, self.away_team, self.game_start_str, self.game_id)
+        store = bot.get_cog("Hockey").game_store
+        home = store.get(self.game_id, self.home_team, self.game_start_str)
+        store.get(self.game_id, self.away_team, self.game_start_str)
         # ensures that the TeamEntry gets created for both teams to save their data
         try:
-            old_game_state = GameState(home["game_state"])
+            old_game_state = GameState(home.game_state)
             log.trace(
                 "Old Game State for %s @ %s is %r", self.away_team, self.home_team, old_game_state
             )
         except ValueError:
             old_game_state = GameState.unknown
-        # away = await get_team(self.away_team)
-        # team_list = await self.config.teams()
         # Home team checking
         end_first = self.period_time_left in ["END", "00:00"] and self.period == 1
         end_second = self.period_time_left in ["END", "00:00"] and self.period == 2
@@ -995,21 +1042,18 @@ class Game:
         em = await self.make_game_embed(False, None)
         tasks = []
         post_state = ["all", self.home_team, self.away_team]
-        config = bot.get_cog("Hockey").config
-        all_channels = await bot.get_cog("Hockey").config.all_channels()
-        async for channel_id, data in AsyncIter(all_channels.items(), steps=100):
-            await self.maybe_edit_gamedaythread_message(bot, channel_id, data)
+        cog = bot.get_cog("Hockey")
+        await self.edit_gamedaythread_messages(bot)
+        for channel_id, data in cog.subscriptions.get_channels(post_state, "Periodrecap").items():
             channel = await get_channel_obj(bot, channel_id, data)
             if not channel:
                 continue
 
             should_post = await check_to_post(bot, channel, data, post_state, self.game_state)
-            should_post &= "Periodrecap" in await config.channel(channel).game_states()
-            publish = "Periodrecap" in await config.channel(channel).publish_states()
+            publish = "Periodrecap" in data["publish_states"]
             if should_post:
-                tasks.append((channel, publish))
-        async for c, to_pub in AsyncIter(tasks, steps=5, delay=5):
-            await self.post_period_recap(c, em, to_pub)
+                tasks.append(self.post_period_recap(channel, em, publish))
+        await cog.send_limiter.gather(tasks)
 
     async def post_period_recap(
         self, channel: discord.TextChannel, embed: discord.Embed, publish: bool
@@ -1031,6 +1075,15 @@ class Game:
         except Exception:
             log.exception("Could not post goal in %s", repr(channel))
 
+    async def edit_gamedaythread_messages(self, bot: Red) -> None:
+        """
+        Edit the starting message of every game day thread following this game
+        """
+        post_state = ["all", self.home_team, self.away_team]
+        channels = bot.get_cog("Hockey").subscriptions.get_channels(post_state)
+        for channel_id, data in channels.items():
+            await self.maybe_edit_gamedaythread_message(bot, channel_id, data)
+
     async def maybe_edit_gamedaythread_message(
         self, bot: Red, channel_id: int, data: dict
     ) -> None:
@@ -1061,9 +1114,11 @@ class Game:
         state_embed = await self.game_state_embed()
         state_text = await self.game_state_text()
         tasks = []
-        all_channels = await bot.get_cog("Hockey").config.all_channels()
-        async for channel_id, data in AsyncIter(all_channels.items(), steps=100):
-            await self.maybe_edit_gamedaythread_message(bot, channel_id, data)
+        cog = bot.get_cog("Hockey")
+        await self.edit_gamedaythread_messages(bot)
+        state = game_state_name(self.game_state)
+        channels = cog.subscriptions.get_channels(post_state, state) if state else {}
+        for channel_id, data in channels.items():
             channel = await get_channel_obj(bot, channel_id, data)
             if not channel:
                 continue
@@ -1071,10 +1126,8 @@ class Game:
                 continue
             should_post = await check_to_post(bot, channel, data, post_state, self.game_state)
             if should_post:
-                tasks.append(channel)
-        async for channel in AsyncIter(tasks, steps=5, delay=5):
-            await self.actually_post_state(bot, channel, state_embed, state_text)
-        # previews = await bounded_gather(*tasks)
+                tasks.append(self.actually_post_state(bot, channel, state_embed, state_text))
+        await cog.send_limiter.gather(tasks)
 
     async def actually_post_state(
         self,
@@ -1186,119 +1239,76 @@ class Game:
 
     async def check_team_goals(self, bot: Red) -> None:
         """
-        Checks to see if a goal needs to be posted
+        Checks to see if a goal needs to be posted, edited or removed
+
+        Only goals which changed since the last check are processed.
         """
-        team_data = {
-            self.home_team: await get_team(bot, self.home_team, self.game_start_str, self.game_id),
-            self.away_team: await get_team(bot, self.away_team, self.game_start_str, self.game_id),
-        }
-        # home_team_data = await get_team(bot, self.home_team)
-        # away_team_data = await get_team(bot, self.away_team)
-        # all_data = await get_team("all")
-        # post_state = ["all", self.home_team, self.away_team]
         cog = bot.get_cog("Hockey")
-        # home_goal_ids = [goal.goal_id for goal in self.home_goals]
-        # away_goal_ids = [goal.goal_id for goal in self.away_goals]
+        store = cog.game_store
+        # ensures that the TeamEntry gets created for both teams to save their goals
+        store.get(self.game_id, self.home_team, self.game_start_str)
+        store.get(self.game_id, self.away_team, self.game_start_str)
+        changes = store.goal_changes(self.game_id, (self.home_team, self.away_team), self.goals)
+        if not changes:
+            return
+        log.trace("Goal changes for %s: %s", self.game_id, changes)
+
+        for goal in changes.added:
+            # attempts to post the goal if there is a new goal
+            bot.dispatch("hockey_goal", self, goal)
+            store.set_goal(goal.game_id, goal.team_name, goal.goal_id, goal.to_json(), [])
+            asyncio.create_task(goal.post_team_goal(bot, self))
+
+        for goal in changes.edited:
+            # attempts to edit the goal if the scorers have changed
+            bot.dispatch("hockey_goal_edit", self, goal)
+            log.debug(
+                "Goal %s edited, new desc=%s link=%s", goal.goal_id, goal.description, goal.link
+            )
 
-        home_goal_list = set(team_data[self.home_team]["goal_id"])
-        current_home_goals = set(str(goal.goal_id) for goal in self.home_goals)
-        away_goal_list = set(team_data[self.away_team]["goal_id"])
-        current_away_goals = set(str(goal.goal_id) for goal in self.away_goals)
+            # This is here in order to prevent the bot attempting to edit the same
+            # goal b2b causing increase of requests to discord for editing and
+            # hopefully reducing instances of rate limiting.
+            # The premise is that when we create this task, store a reference to it
+            # on the cog and when we want to edit see if there is already a task running.
+            # If a task is running we will instead wait for that task to finish and then
+            # run the same code. This way they work one after another instead of parallell.
+            # The done callback removes the task reference when the task is done so
+            # this should be efficient.
 
-        for goal in self.goals:
-            # goal_id = str(goal["result"]["eventCode"])
-            # team = goal["team"]["name"]
-            # team_data = await get_team(bot, goal.team_name)
-            if str(goal.goal_id) not in team_data[goal.team_name]["goal_id"]:
-                # attempts to post the goal if there is a new goal
-                bot.dispatch("hockey_goal", self, goal)
-                # goal.home_shots = self.home_shots
-                # goal.away_shots = self.away_shots
-                async with cog.config.teams() as teams:
-                    for team in teams:
-                        if team["team_name"] == goal.team_name and team["game_id"] == goal.game_id:
-                            team["goal_id"][str(goal.goal_id)] = {
-                                "goal": goal.to_json(),
-                                "messages": [],
-                            }
-                asyncio.create_task(goal.post_team_goal(bot, self))
-                continue
-            if str(goal.goal_id) in team_data[goal.team_name]["goal_id"]:
-                # attempts to edit the goal if the scorers have changed
-                old_goal = Goal(**team_data[goal.team_name]["goal_id"][str(goal.goal_id)]["goal"])
-                if goal != old_goal:
-                    # goal.home_shots = old_goal.home_shots
-                    # goal.away_shots = old_goal.away_shots
-                    # This is to keep shots consistent between edits
-                    # Shots should not update as the game continues
-                    bot.dispatch("hockey_goal_edit", self, goal)
-                    log.debug(
-                        "Before desc=%s after desc=%s equal=%s before link=%s after link=%s equal=%s",
-                        old_goal.description,
-                        goal.description,
-                        old_goal.description == goal.description,
-                        old_goal.link,
-                        goal.link,
-                        old_goal.link == goal.link,
+            key = f"{self.game_id}-{goal.goal_id}"
+
+            def done_edit_callback(task):
+                task_name = task.get_name()
+                try:
+                    del cog._edit_tasks[task_name]
+                except Exception:
+                    log.exception(
+                        "Error removing edit task from list, unknown task name %s",
+                        task_name,
                     )
 
-                    # This is here in order to prevent the bot attempting to edit the same
-                    # goal b2b causing increase of requests to discord for editing and
-                    # hopefully reducing instances of rate limiting.
-                    # The premise is that when we create this task, store a reference to it
-                    # on the cog and when we want to edit see if there is already a task running.
-                    # If a task is running we will instead wait for that task to finish and then
-                    # run the same code. This way they work one after another instead of parallell.
-                    # The done callback removes the task reference when the task is done so
-                    # this should be efficient.
-
-                    key = f"{self.game_id}-{goal.goal_id}"
-
-                    def done_edit_callback(task):
-                        task_name = task.get_name()
-                        try:
-                            del cog._edit_tasks[task_name]
-                        except Exception:
-                            log.exception(
-                                "Error removing edit task from list, unknown task name %s",
-                                task_name,
-                            )
-
-                    if key not in cog._edit_tasks:
-                        log.debug("Creating edit task for %s", key)
-                        cog._edit_tasks[key] = asyncio.create_task(
-                            goal.edit_team_goal(bot, self), name=key
-                        )
-                        cog._edit_tasks[key].add_done_callback(done_edit_callback)
-                    else:
-                        log.debug("Found existing edit task, waiting for %s", key)
-                        task = cog._edit_tasks[key]
-                        await asyncio.wait_for(task, timeout=30)
-                        log.debug("Done waiting for %s", key)
-                        cog._edit_tasks[key] = asyncio.create_task(
-                            goal.edit_team_goal(bot, self), name=key
-                        )
-                        cog._edit_tasks[key].add_done_callback(done_edit_callback)
-
-                    async with cog.config.teams() as teams:
-                        for team in teams:
-                            if (
-                                team["team_name"] == goal.team_name
-                                and team["game_id"] == goal.game_id
-                            ):
-                                team["goal_id"][str(goal.goal_id)]["goal"] = goal.to_json()
+            if key not in cog._edit_tasks:
+                log.debug("Creating edit task for %s", key)
+                cog._edit_tasks[key] = asyncio.create_task(
+                    goal.edit_team_goal(bot, self), name=key
+                )
+                cog._edit_tasks[key].add_done_callback(done_edit_callback)
+            else:
+                log.debug("Found existing edit task, waiting for %s", key)
+                task = cog._edit_tasks[key]
+                await asyncio.wait_for(task, timeout=30)
+                log.debug("Done waiting for %s", key)
+                cog._edit_tasks[key] = asyncio.create_task(
+                    goal.edit_team_goal(bot, self), name=key
+                )
+                cog._edit_tasks[key].add_done_callback(done_edit_callback)
+
+            store.set_goal(goal.game_id, goal.team_name, goal.goal_id, goal.to_json())
+
         # attempts to delete the goal if it was called back
-        home_diff = home_goal_list.difference(current_home_goals)
-        # the difference here from the saved data to the new data returns only goals
-        # that are missing from the old data and ignores new goals in the current data
-        away_diff = away_goal_list.difference(current_away_goals)
-        # log.debug("Home Diff %s Current %s Old %s", home_diff, current_home_goals, home_goal_list)
-        # log.debug("Away Diff %s Current %s Old %s", away_diff, current_away_goals, away_goal_list)
-
-        for goal_str in home_diff:
-            asyncio.create_task(Goal.remove_goal_post(bot, str(goal_str), self.home_team, self))
-        for goal_str in away_diff:
-            asyncio.create_task(Goal.remove_goal_post(bot, str(goal_str), self.away_team, self))
+        for team, goal_id in changes.removed:
+            asyncio.create_task(Goal.remove_goal_post(bot, goal_id, team, self))
 
     async def save_game_state(self, bot: Red, time_to_game_start: str = "0") -> None:
         """
@@ -1307,34 +1317,20 @@ class Game:
         game_state = self.game_state.value
         if time_to_game_start == "END3rd":
             game_state = GameState.live_end_third.value
-        async with bot.get_cog("Hockey").config.teams() as teams:
-            for team in teams:
-                if team["team_name"] not in [self.home_team, self.away_team]:
-                    continue
-                if team["game_id"] != self.game_id:
-                    continue
-
-                if self.game_state not in [GameState.final, GameState.official_final]:
-                    if self.game_state.is_preview() and time_to_game_start != "0":
-                        team["game_state"] = game_state
-                    elif self.game_state.is_live() and time_to_game_start != "0":
-                        team["game_state"] = game_state
-                    else:
-                        team["game_state"] = game_state
-                    team["period"] = self.period
-                    team["game_start"] = self.game_start_str
-
-                else:
-                    if time_to_game_start == "0":
-                        team["game_state"] = 0
-                        team["period"] = 0
-                        team["goal_id"] = {}
-                        team["game_start"] = ""
-                    elif (
-                        self.game_state in [GameState.final, GameState.official_final]
-                        and time_to_game_start != "0"
-                    ):
-                        team["game_state"] = game_state
+        store = bot.get_cog("Hockey").game_store
+        for team in (self.home_team, self.away_team):
+            if self.game_state not in [GameState.final, GameState.official_final]:
+                store.update(
+                    self.game_id,
+                    team,
+                    game_state=game_state,
+                    period=self.period,
+                    game_start=self.game_start_str,
+                )
+            elif time_to_game_start == "0":
+                store.reset(self.game_id, team)
+            else:
+                store.update(self.game_id, team, game_state=game_state)
 
     async def post_time_to_game_start(self, bot: Red, time_left: str) -> None:
         """
@@ -1350,19 +1346,18 @@ class Game:
             home=self.home_team,
         )
         tasks = []
-        all_channels = await bot.get_cog("Hockey").config.all_channels()
-        async for channel_id, data in AsyncIter(all_channels.items(), steps=100):
+        cog = bot.get_cog("Hockey")
+        state = game_state_name(self.game_state)
+        channels = cog.subscriptions.get_channels(post_state, state) if state else {}
+        for channel_id, data in channels.items():
             channel = await get_channel_obj(bot, channel_id, data)
             if not channel:
                 continue
 
             should_post = await check_to_post(bot, channel, data, post_state, self.game_state)
-            team_to_post = await bot.get_cog("Hockey").config.channel(channel).team()
-            if should_post and "all" not in team_to_post:
-                tasks.append(channel)
-        async for channel in AsyncIter(tasks, delay=5, steps=5):
-            await self.post_game_start(channel, msg)
-        # await bounded_gather(*tasks)
+            if should_post and "all" not in data["team"]:
+                tasks.append(self.post_game_start(channel, msg))
+        await cog.send_limiter.gather(tasks)
 
     async def post_game_start(self, channel: discord.TextChannel, msg: str) -> None:
         if not channel.permissions_for(channel.guild.me).send_messages:
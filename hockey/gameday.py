@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+import discord
+from red_commons.logging import getLogger
+from redbot.core.utils import bounded_gather
+
+if TYPE_CHECKING:
+    from .api import NewAPI
+    from .game import Game
+
+log = getLogger("red.trusty-cogs.Hockey")
+
+# Number of guilds having game day channels or threads made at the same time.
+# Each guild is handled sequentially so Discord's per guild channel
+# creation rate limits are never hit in parallel from within one guild.
+GAMEDAY_CONCURRENCY = 5
+
+
+class GamedayRun:
+    """
+    Shared state for one pass of creating game day channels or threads.
+
+    Each games preview and each teams next games are only built once per run
+    no matter how many guilds need them. The time spent in every guild is
+    recorded so slow day rollovers show up in the logs.
+    """
+
+    def __init__(self, name: str, api: NewAPI):
+        self.name = name
+        self.api = api
+        self.started = time.monotonic()
+        self.timings: Dict[int, float] = {}
+        self.failed: List[int] = []
+        self._previews: Dict[int, asyncio.Task] = {}
+        self._next_games: Dict[str, asyncio.Task] = {}
+
+    async def _build_preview(self, game: Game) -> Tuple[discord.Embed, str]:
+        return await game.game_state_embed(), await game.game_state_text()
+
+    async def preview(self, game: Game) -> Tuple[discord.Embed, str]:
+        """Get the preview embed and text for a game"""
+        if game.game_id not in self._previews:
+            self._previews[game.game_id] = asyncio.create_task(self._build_preview(game))
+        return await asyncio.shield(self._previews[game.game_id])
+
+    async def next_games(self, team: str) -> List[Game]:
+        """Get the next games for a team"""
+        if team not in self._next_games:
+            self._next_games[team] = asyncio.create_task(self.api.get_games(team, datetime.now()))
+        return await asyncio.shield(self._next_games[team])
+
+    async def _run_guild(
+        self, guild: discord.Guild, func: Callable[[discord.Guild, GamedayRun], Awaitable]
+    ) -> None:
+        start = time.monotonic()
+        try:
+            await func(guild, self)
+        except Exception:
+            log.exception("Error making %s in %r", self.name, guild)
+            self.failed.append(guild.id)
+        finally:
+            self.timings[guild.id] = time.monotonic() - start
+
+    async def run(
+        self,
+        guilds: Iterable[discord.Guild],
+        func: Callable[[discord.Guild, GamedayRun], Awaitable],
+    ) -> None:
+        """Run `func` for every guild with at most `GAMEDAY_CONCURRENCY` at once"""
+        await bounded_gather(
+            *[self._run_guild(guild, func) for guild in guilds], limit=GAMEDAY_CONCURRENCY
+        )
+        log.info(self.report())
+
+    def report(self) -> str:
+        total = time.monotonic() - self.started
+        msg = (
+            f"Finished {self.name} for {len(self.timings)} guilds in {total:.2f}s "
+            f"({len(self._previews)} previews built, {len(self.failed)} failed)"
+        )
+        if self.timings:
+            slowest = max(self.timings, key=self.timings.get)
+            msg += f", slowest guild {slowest} took {self.timings[slowest]:.2f}s"
+        return msg
@@ -1,5 +1,6 @@
+import functools
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import List, Optional
 
 import aiohttp
 import discord
@@ -11,6 +12,7 @@ from redbot.core.utils.chat_formatting import bold, humanize_list
 
 from .abc import HockeyMixin
 from .game import Game
+from .gameday import GamedayRun
 from .helper import StateFinder, TeamFinder, get_chn_name, get_team_role
 
 log = getLogger("red.trusty-cogs.Hockey")
@@ -388,45 +390,64 @@ class GameDayChannels(HockeyMixin):
 
     async def check_new_gdc(self) -> None:
         game_list = await self.api.get_games()  # Do this once so we don't spam the api
-        for guilds in await self.config.all_guilds():
-            guild = self.bot.get_guild(guilds)
+        guilds = []
+        for guild_id in await self.config.all_guilds():
+            guild = self.bot.get_guild(guild_id)
             if guild is None:
                 continue
             if not await self.config.guild(guild).create_channels():
                 continue
             if guild.me.is_timed_out():
                 continue
-            team = await self.config.guild(guild).gdc_team()
-            if team != "all":
-                next_games = await self.api.get_games(team, datetime.now())
-                next_game = None
-                if next_games != []:
-                    next_game = next_games[0]
-                if next_game is None:
-                    continue
-                if (next_game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
-                    continue
-                cur_channels = await self.config.guild(guild).gdc_chans()
-                cur_channel = guild.get_channel(cur_channels.get(str(next_game.game_id)))
+            guilds.append(guild)
+        run = GamedayRun("game day channels", self.api)
+        await run.run(guilds, functools.partial(self.update_guild_gdc, game_list=game_list))
 
-                if cur_channel is None:
-                    await self.delete_gdc(guild)
-                    await self.create_gdc(guild)
+    async def update_guild_gdc(
+        self, guild: discord.Guild, run: GamedayRun, game_list: List[Game]
+    ) -> None:
+        """
+        Replace the game day channels in a guild as part of `check_new_gdc`
+        """
+        team = await self.config.guild(guild).gdc_team()
+        if team != "all":
+            next_games = await run.next_games(team)
+            next_game = None
+            if next_games != []:
+                next_game = next_games[0]
+            if next_game is None:
+                return
+            if (next_game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
+                return
+            cur_channels = await self.config.guild(guild).gdc_chans()
+            cur_channel = guild.get_channel(cur_channels.get(str(next_game.game_id)))
 
-            else:
+            if cur_channel is None:
                 await self.delete_gdc(guild)
-                for game in game_list:
-                    if game.game_state == "Postponed":
-                        continue
-                    if (game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
-                        continue
-                    await self.create_gdc(guild, game)
+                await self.create_gdc(guild, run=run)
+
+        else:
+            await self.delete_gdc(guild)
+            for game in game_list:
+                if game.game_state == "Postponed":
+                    continue
+                if (game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
+                    continue
+                await self.create_gdc(guild, game, run=run)
 
-    async def create_gdc(self, guild: discord.Guild, game_data: Optional[Game] = None) -> None:
+    async def create_gdc(
+        self,
+        guild: discord.Guild,
+        game_data: Optional[Game] = None,
+        run: Optional[GamedayRun] = None,
+    ) -> None:
         """
         Creates a game day channel for the given game object
         if no game object is passed it looks for the set team for the guild
         returns None if not setup
+
+        `run` shares the games and previews between guilds when creating
+        channels for every guild at once.
         """
         category_id = await self.config.guild(guild).category()
         if not category_id:
@@ -444,7 +465,10 @@ class GameDayChannels(HockeyMixin):
         if game_data is None:
             team = await self.config.guild(guild).gdc_team()
 
-            next_games = await self.api.get_games(team, datetime.now())
+            if run is not None:
+                next_games = await run.next_games(team)
+            else:
+                next_games = await self.api.get_games(team, datetime.now())
             if next_games != []:
                 next_game = next_games[0]
                 if next_game is None:
@@ -486,6 +510,7 @@ class GameDayChannels(HockeyMixin):
         await self.config.channel(new_chn).game_state_roles.set(state_roles)
         goal_roles = await self.config.guild(guild).default_goal_roles()
         await self.config.channel(new_chn).game_goal_roles.set(goal_roles)
+        await self.subscriptions.refresh(new_chn.id)
 
         # Gets the timezone to use for game day channel topic
         # timestamp = datetime.strptime(next_game.game_start, "%Y-%m-%dT%H:%M:%SZ")
@@ -508,15 +533,21 @@ class GameDayChannels(HockeyMixin):
             await new_chn.edit(topic=game_msg)
         except discord.errors.Forbidden:
             log.error("Error editing the channel topic")
+        if run is not None:
+            em, game_text = await run.preview(next_game)
+        else:
+            em, game_text = None, None
         if new_chn.permissions_for(guild.me).embed_links:
-            em = await next_game.game_state_embed()
+            if em is None:
+                em = await next_game.game_state_embed()
             try:
                 preview_msg = await new_chn.send(game_msg, embed=em)
             except Exception:
                 log.error("Error posting game preview in GDC channel.")
         else:
             try:
-                game_text = await next_game.game_state_text()
+                if game_text is None:
+                    game_text = await next_game.game_state_text()
                 text_message = f"{game_msg}\n{game_text}"
                 preview_msg = await new_chn.send(text_message)
             except Exception:
@@ -543,6 +574,7 @@ class GameDayChannels(HockeyMixin):
         channels = await self.config.guild(guild).gdc_chans()
         for channel in channels.values():
             await self.config.channel_from_id(channel).clear()
+            self.subscriptions.remove(channel)
         await self.config.guild(guild).gdc_chans.clear()
 
     async def delete_gdc(self, guild: discord.Guild) -> None:
@@ -565,4 +597,5 @@ class GameDayChannels(HockeyMixin):
                     except Exception:
                         log.exception(f"Cannot delete GDC channels in {guild.id}")
             await self.config.channel_from_id(channel).clear()
+            self.subscriptions.remove(channel)
         await self.config.guild(guild).gdc_chans.clear()
@@ -1,5 +1,6 @@
+import functools
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 import aiohttp
 import discord
@@ -10,6 +11,7 @@ from redbot.core.utils.chat_formatting import bold, humanize_list
 
 from .abc import HockeyMixin
 from .game import Game
+from .gameday import GamedayRun
 from .helper import StateFinder, TeamFinder, get_chn_name, get_team_role
 
 log = getLogger("red.trusty-cogs.Hockey")
@@ -493,57 +495,76 @@ class GameDayThreads(HockeyMixin):
 
     async def check_new_gdt(self) -> None:
         game_list = await self.api.get_games()  # Do this once so we don't spam the api
-        for guilds in await self.config.all_guilds():
-            guild = self.bot.get_guild(guilds)
+        guilds = []
+        for guild_id in await self.config.all_guilds():
+            guild = self.bot.get_guild(guild_id)
             if guild is None:
                 continue
             if not await self.config.guild(guild).create_threads():
                 continue
             if guild.me.is_timed_out():
                 continue
-            team = await self.config.guild(guild).gdt_team()
-            if team != "all":
-                next_games = await self.api.get_games(team, datetime.now())
-                next_game = None
-                if next_games != []:
-                    next_game = next_games[0]
-                if next_game is None:
-                    continue
-                if (next_game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
-                    continue
-                cur_channel = None
-                cur_channels = await self.config.guild(guild).gdt_chans()
-                if cur_channels and str(next_game.game_id) in cur_channels:
-                    chan_id = cur_channels[str(next_game.game_id)]
-                    cur_channel = guild.get_thread(chan_id)
-                    if not cur_channel:
-                        try:
-                            cur_channel = await guild.fetch_channel(chan_id)
-                        except Exception:
-                            cur_channel = None
-                            await self.config.guild(guild).gdt_chans.clear()
-                            # clear the config data so that this always contains at most
-                            # 1 game day thread when only one team is specified
-                            # fetch_channel is used as a backup incase the thread
-                            # becomes archived and bot restarts and needs its reference
-                if cur_channel is None:
-                    await self.delete_gdt(guild)
-                    await self.create_gdt(guild)
+            guilds.append(guild)
+        run = GamedayRun("game day threads", self.api)
+        await run.run(guilds, functools.partial(self.update_guild_gdt, game_list=game_list))
 
-            else:
+    async def update_guild_gdt(
+        self, guild: discord.Guild, run: GamedayRun, game_list: List[Game]
+    ) -> None:
+        """
+        Replace the game day threads in a guild as part of `check_new_gdt`
+        """
+        team = await self.config.guild(guild).gdt_team()
+        if team != "all":
+            next_games = await run.next_games(team)
+            next_game = None
+            if next_games != []:
+                next_game = next_games[0]
+            if next_game is None:
+                return
+            if (next_game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
+                return
+            cur_channel = None
+            cur_channels = await self.config.guild(guild).gdt_chans()
+            if cur_channels and str(next_game.game_id) in cur_channels:
+                chan_id = cur_channels[str(next_game.game_id)]
+                cur_channel = guild.get_thread(chan_id)
+                if not cur_channel:
+                    try:
+                        cur_channel = await guild.fetch_channel(chan_id)
+                    except Exception:
+                        cur_channel = None
+                        await self.config.guild(guild).gdt_chans.clear()
+                        # clear the config data so that this always contains at most
+                        # 1 game day thread when only one team is specified
+                        # fetch_channel is used as a backup incase the thread
+                        # becomes archived and bot restarts and needs its reference
+            if cur_channel is None:
                 await self.delete_gdt(guild)
-                for game in game_list:
-                    if game.game_state == "Postponed":
-                        continue
-                    if (game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
-                        continue
-                    await self.create_gdt(guild, game)
+                await self.create_gdt(guild, run=run)
 
-    async def create_gdt(self, guild: discord.Guild, game_data: Optional[Game] = None) -> bool:
+        else:
+            await self.delete_gdt(guild)
+            for game in game_list:
+                if game.game_state == "Postponed":
+                    continue
+                if (game.game_start - datetime.now(timezone.utc)) > timedelta(days=7):
+                    continue
+                await self.create_gdt(guild, game, run=run)
+
+    async def create_gdt(
+        self,
+        guild: discord.Guild,
+        game_data: Optional[Game] = None,
+        run: Optional[GamedayRun] = None,
+    ) -> bool:
         """
         Creates a game day channel for the given game object
         if no game object is passed it looks for the set team for the guild
         returns None if not setup
+
+        `run` shares the games and previews between guilds when creating
+        threads for every guild at once.
         """
         log.debug("Making GDT for %s", game_data)
         channel_id = await self.config.guild(guild).gdt_channel()
@@ -570,7 +591,10 @@ class GameDayThreads(HockeyMixin):
         if game_data is None:
             team = await self.config.guild(guild).gdt_team()
 
-            next_games = await self.api.get_games_list(team, datetime.now())
+            if run is not None:
+                next_games = await run.next_games(team)
+            else:
+                next_games = await self.api.get_games_list(team, datetime.now())
             if next_games != []:
                 next_game = next_games[0]
                 if next_game is None:
@@ -616,8 +640,11 @@ class GameDayThreads(HockeyMixin):
         )
 
         chn_name = get_chn_name(next_game)
-        em = await next_game.game_state_embed()
-        game_text = await next_game.game_state_text()
+        if run is not None:
+            em, game_text = await run.preview(next_game)
+        else:
+            em = await next_game.game_state_embed()
+            game_text = await next_game.game_state_text()
         am = discord.AllowedMentions(roles=allowed_roles)
         new_chn = None
 
@@ -704,6 +731,7 @@ class GameDayThreads(HockeyMixin):
         await self.config.channel(new_chn).game_state_roles.set(state_roles)
         goal_roles = await self.config.guild(guild).default_goal_roles()
         await self.config.channel(new_chn).game_goal_roles.set(goal_roles)
+        await self.subscriptions.refresh(new_chn.id)
         # Gets the timezone to use for game day channel topic
         # timestamp = datetime.strptime(next_game.game_start, "%Y-%m-%dT%H:%M:%SZ")
         # guild_team = await config.guild(guild).gdc_team()
@@ -718,4 +746,5 @@ class GameDayThreads(HockeyMixin):
         channels = await self.config.guild(guild).gdt_chans()
         for channel in channels.values():
             await self.config.channel_from_id(channel).clear()
+            self.subscriptions.remove(channel)
         await self.config.guild(guild).gdt_chans.clear()
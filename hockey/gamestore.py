@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from red_commons.logging import getLogger
+from redbot.core import Config
+
+from .teamentry import TeamEntry
+
+if TYPE_CHECKING:
+    from .goal import Goal
+
+log = getLogger("red.trusty-cogs.Hockey")
+
+# Seconds to wait after a change before saving to config so that bursts
+# of changes during a live game are written together.
+SAVE_DELAY = 5
+
+
+class GoalChanges(NamedTuple):
+    added: List[Goal]
+    edited: List[Goal]
+    # (team_name, goal_id) of goals which have been called back
+    removed: List[Tuple[str, str]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.edited or self.removed)
+
+
+class GoalTracker:
+    """
+    Remembers what has already been processed for a single game.
+
+    Each goal is reduced to a fingerprint of the fields that decide whether
+    the posted message needs editing so each update only compares a couple
+    of strings per goal instead of rebuilding the saved goals from config.
+    """
+
+    def __init__(self, game_id: int):
+        self.game_id = game_id
+        self.goals: Dict[str, Tuple[str, Tuple[str, str]]] = {}
+
+    @staticmethod
+    def fingerprint(description: Optional[str], link: Optional[str]) -> Tuple[str, str]:
+        # mirrors `Goal.__eq__`, links are compared as str since they may be a URL
+        return (str(description), str(link))
+
+    def seed(self, entries: Iterable[TeamEntry]) -> None:
+        """Load goals which were processed before the cog was reloaded"""
+        for entry in entries:
+            for goal_id, data in entry.goal_id.items():
+                goal = data.get("goal", {})
+                fingerprint = self.fingerprint(goal.get("description"), goal.get("link"))
+                self.goals[str(goal_id)] = (entry.team_name, fingerprint)
+
+    def diff(self, goals: List[Goal]) -> GoalChanges:
+        changes = GoalChanges([], [], [])
+        current: Set[str] = set()
+        for goal in goals:
+            goal_id = str(goal.goal_id)
+            current.add(goal_id)
+            saved = self.goals.get(goal_id)
+            fingerprint = self.fingerprint(goal.description, goal.link)
+            if saved is None:
+                changes.added.append(goal)
+            elif saved[1] != fingerprint:
+                changes.edited.append(goal)
+            else:
+                continue
+            self.goals[goal_id] = (goal.team_name, fingerprint)
+        if len(current) != len(self.goals):
+            for goal_id, (team, _fingerprint) in list(self.goals.items()):
+                if goal_id not in current:
+                    del self.goals[goal_id]
+                    changes.removed.append((team, goal_id))
+        return changes
+
+
+class GameStateStore:
+    """
+    In memory store of the saved state for each team in each game.
+
+    Entries are keyed by `(game_id, team_name)` and goals are stored per
+    entry by goal ID. Reads never touch config and changes are written
+    after `SAVE_DELAY` seconds, only writing the entries and goals that
+    actually changed.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._entries: Dict[Tuple[int, str], TeamEntry] = {}
+        self._trackers: Dict[int, GoalTracker] = {}
+        self._new: Set[Tuple[int, str]] = set()
+        self._changed: Set[Tuple[int, str]] = set()
+        self._changed_goals: Set[Tuple[Tuple[int, str], str]] = set()
+        self._removed_goals: Set[Tuple[Tuple[int, str], str]] = set()
+        self._save_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[TeamEntry]:
+        return iter(self._entries.values())
+
+    async def load(self) -> None:
+        for data in (await self.config.saved_games()).values():
+            try:
+                entry = TeamEntry.from_json(data)
+            except KeyError:
+                log.exception("Error loading saved game state %s", data)
+                continue
+            self._entries[(entry.game_id, entry.team_name)] = entry
+
+    def get(self, game_id: int, team: str, game_start: str = "") -> TeamEntry:
+        """Get the saved state of a team in a game creating it if it doesn't exist"""
+        key = (game_id, team)
+        if key not in self._entries:
+            self._entries[key] = TeamEntry(
+                game_state=0,
+                team_name=team,
+                period=0,
+                channel=[],
+                goal_id={},
+                created_channel=[],
+                game_start=game_start,
+                game_id=game_id,
+            )
+            self._new.add(key)
+            self._queue_save()
+        return self._entries[key]
+
+    def update(self, game_id: int, team: str, **kwargs) -> None:
+        """Update `game_state`, `period` or `game_start` of a teams saved state"""
+        entry = self.get(game_id, team)
+        for attr, value in kwargs.items():
+            setattr(entry, attr, value)
+        self._changed.add((game_id, team))
+        self._queue_save()
+
+    def reset(self, game_id: int, team: str) -> None:
+        """Reset a teams state and forget all their goals"""
+        entry = self.get(game_id, team)
+        entry.game_state = 0
+        entry.period = 0
+        entry.goal_id = {}
+        entry.game_start = ""
+        self._trackers.pop(game_id, None)
+        # rewrite the whole entry rather than removing every goal
+        self._new.add((game_id, team))
+        self._queue_save()
+
+    def goal_changes(self, game_id: int, teams: Iterable[str], goals: List[Goal]) -> GoalChanges:
+        """
+        Get the goals which were added, edited or removed since the last update.
+
+        The returned goals are considered processed, saving them is still
+        up to the caller.
+        """
+        tracker = self._trackers.get(game_id)
+        if tracker is None:
+            tracker = self._trackers[game_id] = GoalTracker(game_id)
+            tracker.seed(e for e in (self._entries.get((game_id, t)) for t in teams) if e)
+        return tracker.diff(goals)
+
+    def get_goal(self, game_id: int, team: str, goal_id: str) -> Optional[dict]:
+        entry = self._entries.get((game_id, team))
+        if entry is None:
+            return None
+        return entry.goal_id.get(str(goal_id))
+
+    def set_goal(
+        self, game_id: int, team: str, goal_id: str, goal: dict, messages: Optional[list] = None
+    ) -> None:
+        """Save a goal, keeping any messages already posted for it"""
+        entry = self.get(game_id, team)
+        goal_id = str(goal_id)
+        if goal_id in entry.goal_id:
+            entry.goal_id[goal_id]["goal"] = goal
+            if messages is not None:
+                entry.goal_id[goal_id]["messages"] = messages
+        else:
+            entry.goal_id[goal_id] = {"goal": goal, "messages": messages or []}
+        self._goal_changed((game_id, team), goal_id)
+
+    def set_goal_messages(self, game_id: int, team: str, goal_id: str, messages: list) -> None:
+        goal = self.get_goal(game_id, team, goal_id)
+        if goal is None:
+            log.error("Error saving message list for goal %s in %s", goal_id, game_id)
+            return
+        goal["messages"] = messages
+        self._goal_changed((game_id, team), str(goal_id))
+
+    def remove_goal(self, game_id: int, team: str, goal_id: str) -> None:
+        entry = self._entries.get((game_id, team))
+        if entry is None or entry.goal_id.pop(str(goal_id), None) is None:
+            return
+        key = ((game_id, team), str(goal_id))
+        self._changed_goals.discard(key)
+        self._removed_goals.add(key)
+        self._queue_save()
+
+    def _goal_changed(self, key: Tuple[int, str], goal_id: str) -> None:
+        self._removed_goals.discard((key, goal_id))
+        self._changed_goals.add((key, goal_id))
+        self._queue_save()
+
+    async def clear(self) -> None:
+        """Forget every saved game"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+        async with self._lock:
+            self._entries = {}
+            self._trackers = {}
+            self._new = set()
+            self._changed = set()
+            self._changed_goals = set()
+            self._removed_goals = set()
+            await self.config.saved_games.clear()
+
+    def _queue_save(self) -> None:
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self) -> None:
+        await asyncio.sleep(SAVE_DELAY)
+        await self.save()
+
+    async def save(self) -> None:
+        """Write every pending change to config"""
+        async with self._lock:
+            new, self._new = self._new, set()
+            changed, self._changed = self._changed - new, set()
+            changed_goals, self._changed_goals = self._changed_goals, set()
+            removed_goals, self._removed_goals = self._removed_goals, set()
+            group = self.config.saved_games
+            try:
+                for key in new:
+                    if entry := self._entries.get(key):
+                        await group.set_raw(entry.key, value=entry.to_json())
+                for key in changed:
+                    if entry := self._entries.get(key):
+                        for attr in ("game_state", "period", "game_start"):
+                            await group.set_raw(entry.key, attr, value=getattr(entry, attr))
+                for key, goal_id in changed_goals:
+                    if key in new:
+                        continue
+                    entry = self._entries.get(key)
+                    if entry is None or goal_id not in entry.goal_id:
+                        continue
+                    await group.set_raw(
+                        entry.key, "goal_id", goal_id, value=entry.goal_id[goal_id]
+                    )
+                for key, goal_id in removed_goals:
+                    if key in new or key not in self._entries:
+                        continue
+                    await group.clear_raw(self._entries[key].key, "goal_id", goal_id)
+            except Exception:
+                log.exception("Error saving game states")
+                self._new |= new
+                self._changed |= changed
+                self._changed_goals |= changed_goals
+                self._removed_goals |= removed_goals
+                self._queue_save()
+
+    async def close(self) -> None:
+        if self._save_task is not None:
+            self._save_task.cancel()
+        await self.save()
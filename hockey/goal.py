@@ -8,10 +8,9 @@ import discord
 from red_commons.logging import getLogger
 from redbot.core.bot import Red
 from redbot.core.i18n import Translator
-from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import humanize_list
 
-from .helper import Team, check_to_post, get_channel_obj, get_team
+from .helper import Team, check_to_post, get_channel_obj
 
 if TYPE_CHECKING:
     from yarl import URL
@@ -230,9 +229,8 @@ class Goal:
         goal_embed = await self.goal_post_embed(game_data)
         goal_text = await self.goal_post_text(game_data)
         tasks = []
-        all_channels = await bot.get_cog("Hockey").config.all_channels()
-        post_data = []
-        async for channel_id, data in AsyncIter(all_channels.items(), steps=100):
+        channels = cog.subscriptions.get_channels(post_state, "Goal")
+        for channel_id, data in channels.items():
             channel = await get_channel_obj(bot, channel_id, data)
             if not channel:
                 continue
@@ -242,23 +240,14 @@ class Goal:
                 bot, channel, data, post_state, game_data.game_state, True
             )
             if should_post:
-                tasks.append(channel)
-        async for channel in AsyncIter(tasks, delay=5, steps=5):
-            post_data.append(await self.actually_post_goal(bot, channel, goal_embed, goal_text))
-        # data = await bounded_gather(*tasks)
+                tasks.append(self.actually_post_goal(bot, channel, goal_embed, goal_text))
+        post_data = await cog.send_limiter.gather(tasks)
         for channel in post_data:
             if channel is None:
                 continue
             else:
                 msg_list.append(channel)
-        config = cog.config
-        async with config.teams() as teams:
-            for team in teams:
-                if team["team_name"] == self.team_name and team["game_id"] == game_data.game_id:
-                    try:
-                        team["goal_id"][str(self.goal_id)]["messages"] = msg_list
-                    except KeyError:
-                        log.error("Error saving message list for goal %r", self)
+        cog.game_store.set_goal_messages(game_data.game_id, self.team_name, self.goal_id, msg_list)
         event.set()
         return msg_list
 
@@ -368,18 +357,13 @@ class Goal:
         """
         log.trace("Removing goal %s from game %s", goal_id, data)
         cog: Hockey = bot.get_cog("Hockey")
-        config = cog.config
         event = cog.get_goal_save_event(data.game_id, str(goal_id), True)
         await event.wait()
-        team_data = await get_team(bot, team, data.game_start_str, data.game_id)
         if str(goal_id) not in [str(goal.goal_id) for goal in data.goals]:
-            try:
-                old_msgs = team_data["goal_id"][goal_id]["messages"]
-            except KeyError:
-                return
-            except Exception:
-                log.exception("Error iterating saved goals")
+            saved_goal = cog.game_store.get_goal(data.game_id, team, goal_id)
+            if saved_goal is None:
                 return
+            old_msgs = saved_goal["messages"]
             msgs = []
             for guild_id, channel_id, message_id in old_msgs:
                 guild = bot.get_guild(int(guild_id))
@@ -392,7 +376,7 @@ class Goal:
                     continue
                 msgs.append(channel.get_partial_message(message_id))
 
-            async for message in AsyncIter(msgs, delay=5, steps=5):
+            async def delete_message(message: discord.PartialMessage) -> None:
                 try:
                     await message.delete()
                 except (discord.errors.NotFound, discord.errors.Forbidden):
@@ -406,14 +390,9 @@ class Goal:
                         message.channel.id,
                     )
 
-            async with config.teams() as team_entries:
-                for team_entry in team_entries:
-                    if team_entry["team_name"] == team and team_entry["game_id"] == data.game_id:
-                        try:
-                            del team_entry["goal_id"][goal_id]
-                        except KeyError:
-                            log.exception("Error removing teams goals")
-                            continue
+            await cog.send_limiter.gather(delete_message(m) for m in msgs)
+
+            cog.game_store.remove_goal(data.game_id, team, goal_id)
         return
 
     async def edit_team_goal(self, bot: Red, game_data: Game) -> None:
@@ -427,8 +406,8 @@ class Goal:
         await event.wait()
         # Wait until the initial posting has fully completed before continuing to edit
         og_msg = []
-        old_data = await get_team(bot, self.team_name, game_data.game_start_str, self.game_id)
-        og_msg = old_data["goal_id"].get(str(self.goal_id), {}).get("messages")
+        saved_goal = cog.game_store.get_goal(self.game_id, self.team_name, self.goal_id)
+        og_msg = saved_goal.get("messages") if saved_goal is not None else None
         updated_goal = cog.get_current_goal(game_data.game_id, self.goal_id)
         if updated_goal is not None:
             em = await updated_goal.goal_post_embed(game_data)
@@ -438,7 +417,8 @@ class Goal:
             text = await self.goal_post_text(game_data)
         if og_msg is None:
             return
-        async for guild_id, channel_id, message_id in AsyncIter(og_msg, delay=5, steps=5):
+        tasks = []
+        for guild_id, channel_id, message_id in og_msg:
             guild = bot.get_guild(int(guild_id))
             if not guild:
                 continue
@@ -461,7 +441,8 @@ class Goal:
                 # in this case we can send off the task to do it's thing
                 # and forget about it. If one never finishes I don't care
             else:
-                await self.edit_goal(bot, channel, message_id, em, text)
+                tasks.append(self.edit_goal(bot, channel, message_id, em, text))
+        await cog.send_limiter.gather(tasks)
         return
 
     async def edit_goal(
@@ -587,6 +568,17 @@ class Goal:
         """
         Gets the embed for goal posts
         """
+        key = game.render_key(
+            "goal", self.goal_id, self.description, str(self.link), include_image
+        )
+        if key is not None and (em := game.api.render_cache.get(key)) is not None:
+            return em
+        em = await self._goal_post_embed(game, include_image=include_image)
+        if key is not None:
+            game.api.render_cache.set(key, em)
+        return em
+
+    async def _goal_post_embed(self, game: Game, *, include_image: bool) -> discord.Embed:
         # h_emoji = game.home_emoji
         # a_emoji = game.away_emoji
         shootout = False
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import Enum
+from io import BytesIO
 from typing import (
     TYPE_CHECKING,
+    Any,
     Coroutine,
     Iterable,
     List,
@@ -29,7 +32,6 @@ from redbot.core.utils import AsyncIter
 from yarl import URL
 
 from .constants import TEAMS
-from .teamentry import TeamEntry
 
 if TYPE_CHECKING:
     from .api import NewAPI
@@ -122,10 +124,10 @@ class Team:
 
     @property
     def file(self) -> Optional[discord.File]:
-        try:
-            return discord.File(self._api.logo_path.joinpath(self.filename))
-        except FileNotFoundError:
+        data = self._api.logos.get(self.filename)
+        if data is None:
             return None
+        return discord.File(BytesIO(data), filename=self.filename)
 
     @classmethod
     def from_json(cls, data: dict, team_name: str, api: NewAPI) -> Team:
@@ -696,20 +698,30 @@ class StandingsFinder(discord.app_commands.Transformer):
         return choices
 
 
+GAME_STATE_OPTIONS = {
+    "Preview": [1, 2, 3, 4],
+    "Live": [5],
+    "Final": [9, 10, 11],
+    "Goal": [],
+    "Periodrecap": [6, 7, 8],
+}
+
+
 def game_states_to_int(states: List[str]) -> List[int]:
     ret = []
-    options = {
-        "Preview": [1, 2, 3, 4],
-        "Live": [5],
-        "Final": [9, 10, 11],
-        "Goal": [],
-        "Periodrecap": [6, 7, 8],
-    }
     for state in states:
-        ret += options.get(state, [])
+        ret += GAME_STATE_OPTIONS.get(state, [])
     return ret
 
 
+def game_state_name(game_state: GameState) -> Optional[str]:
+    """The `[p]hockeyset stateupdates` option which covers this game state"""
+    for name, values in GAME_STATE_OPTIONS.items():
+        if game_state.value in values:
+            return name
+    return None
+
+
 async def check_to_post(
     bot: Red,
     channel: Union[discord.TextChannel, discord.Thread],
@@ -722,7 +734,9 @@ async def check_to_post(
         return False
     channel_teams = channel_data.get("team", [])
     if channel_teams is None:
-        await bot.get_cog("Hockey").config.channel(channel).team.clear()
+        cog = bot.get_cog("Hockey")
+        await cog.config.channel(channel).team.clear()
+        await cog.subscriptions.refresh(channel.id)
         return False
     is_countdown = game_state.value in [2, 3, 4]
     channel_countdown = channel_data["countdown"]
@@ -752,46 +766,6 @@ def get_team_role(guild: discord.Guild, team_name: str) -> Optional[discord.Role
     return role
 
 
-async def get_team(bot: Red, team: str, game_start: str, game_id: int = 0) -> dict:
-    config = bot.get_cog("Hockey").config
-    team_list = await config.teams()
-    if team_list is None:
-        team_list = []
-        team_entry = TeamEntry(
-            game_state=0,
-            team_name=team,
-            period=0,
-            channel=[],
-            goal_id={},
-            created_channel=[],
-            game_start=game_start,
-            game_id=game_id,
-        )
-        team_list.append(team_entry.to_json())
-        await config.teams.set(team_list)
-    for teams in team_list:
-        if (
-            team == teams["team_name"]
-            and game_start == teams["game_start"]
-            and game_id == teams["game_id"]
-        ):
-            return teams
-    # Add unknown teams to the config to track stats
-    return_team = TeamEntry(
-        game_state=0,
-        team_name=team,
-        period=0,
-        channel=[],
-        goal_id={},
-        created_channel=[],
-        game_start=game_start,
-        game_id=game_id,
-    )
-    team_list.append(return_team.to_json())
-    await config.teams.set(team_list)
-    return return_team.to_json()
-
-
 async def get_channel_obj(
     bot: Red, channel_id: int, data: dict
 ) -> Optional[Union[discord.TextChannel, discord.Thread]]:
@@ -811,6 +785,7 @@ async def get_channel_obj(
             return None
         guild = channel.guild
         await bot.get_cog("Hockey").config.channel(channel).guild_id.set(guild.id)
+        data["guild_id"] = guild.id
         return channel
     guild = bot.get_guild(data["guild_id"])
     if not guild:
@@ -828,6 +803,51 @@ async def get_channel_obj(
     return channel or thread
 
 
+class SendLimiter:
+    """
+    Sends messages to many channels concurrently.
+
+    discord.py already waits on each channels own rate limit bucket so
+    sends to different channels can run at the same time. This spaces
+    out requests so that large fan outs stay under the global rate limit
+    and caps how many are in flight at once.
+    """
+
+    def __init__(self, rate: float = 40.0, concurrency: int = 25):
+        self.rate = rate
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_send: float = 0.0
+
+    async def _wait_for_turn(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        send_at = max(now, self._next_send)
+        self._next_send = send_at + 1 / self.rate
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+    async def run(self, coro: Coroutine) -> Any:
+        async with self._semaphore:
+            await self._wait_for_turn()
+            return await coro
+
+    async def gather(self, coros: Iterable[Coroutine]) -> List[Any]:
+        """
+        Run every coroutine under the limiter.
+
+        Exceptions are logged and returned as `None` so one failed channel
+        doesn't stop the rest.
+        """
+        results = await asyncio.gather(*(self.run(c) for c in coros), return_exceptions=True)
+        ret = []
+        for result in results:
+            if isinstance(result, Exception):
+                log.error("Error sending hockey update", exc_info=result)
+                result = None
+            ret.append(result)
+        return ret
+
+
 async def slow_send_task(tasks: Iterable[Coroutine]):
     async for task in AsyncIter(tasks, steps=5, delay=5):
         await task
@@ -19,19 +19,21 @@ from redbot.core.i18n import Translator, cog_i18n
 from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import box
 
-from .api import GameState, NewAPI
+from .api import GameState, HockeyAPIError, NewAPI
 from .constants import BASE_URL, CONFIG_ID, CONTENT_URL, HEADSHOT_URL, TEAMS
 from .dev import HockeyDev
 from .errors import InvalidFileError
 from .gamedaychannels import GameDayChannels
 from .gamedaythreads import GameDayThreads
-from .helper import utc_to_local
+from .gamestore import GameStateStore
+from .helper import SendLimiter, utc_to_local
 from .hockey_commands import HockeyCommands
 from .hockeypickems import HockeyPickems
 from .hockeyset import HockeySetCommands
 from .notifications import HockeyNotifications
 from .pickems import Pickems
 from .standings import Standings
+from .subscriptions import ChannelSubscriptions
 
 if TYPE_CHECKING:
     from .game import Game
@@ -76,6 +78,7 @@ class Hockey(
         self.config = Config.get_conf(self, CONFIG_ID, force_registration=True)
         self.config.register_global(
             teams=[],
+            saved_games={},
             created_gdc=False,
             print=False,
             last_day=0,
@@ -182,6 +185,9 @@ class Hockey(
         self.saving_goals = {}
         self._edit_tasks = {}
         self.emojis = {}
+        self.subscriptions = ChannelSubscriptions(self.config)
+        self.send_limiter = SendLimiter()
+        self.game_store = GameStateStore(self.config)
 
     def format_help_for_context(self, ctx: commands.Context) -> str:
         """
@@ -205,6 +211,7 @@ class Hockey(
 
         if self.loop is not None:
             self.loop.cancel()
+        await self.game_store.close()
         await self.session.close()
         await self.api.close()
         self.pickems_loop.cancel()
@@ -316,6 +323,8 @@ class Hockey(
 
     async def cog_load(self) -> None:
         asyncio.create_task(self.add_cog_to_dev_env())
+        await self.subscriptions.load()
+        await self.game_store.load()
         self.loop = asyncio.create_task(self.game_check_loop())
         self.loop.add_done_callback(self.hockey_loop_error)
         await self.migrate_settings()
@@ -344,10 +353,18 @@ class Hockey(
             await self._schema_2_to_3()
             schema_version += 1
             await self.config.schema_version.set(schema_version)
+        if schema_version == 3:
+            await self._schema_3_to_4()
+            schema_version += 1
+            await self.config.schema_version.set(schema_version)
 
     async def _schema_2_to_3(self) -> None:
         await self.config.teams.clear()
 
+    async def _schema_3_to_4(self) -> None:
+        # game states are now saved per game and team in `saved_games`
+        await self.config.teams.clear()
+
     async def _schema_1_to_2(self) -> None:
         log.info("Adding new leaderboard keys for pickems")
         DEFAULT_LEADERBOARD = {
@@ -439,7 +456,6 @@ class Hockey(
                 continue
             except Exception:
                 log.exception("Error grabbing the schedule for today.")
-                data = {"dates": []}
                 await asyncio.sleep(60)
                 continue
             if schedule.days != []:
@@ -471,65 +487,8 @@ class Hockey(
             while self.current_games != {}:
                 self.games_playing = True
                 to_delete = []
-                for game_id, data in self.current_games.items():
-                    if data["game"] is not None:
-                        await self.fix_pickem_game_start(data["game"])
-                    if data["game"] is not None and data["game"].game_start - timedelta(
-                        hours=1
-                    ) >= datetime.now(timezone.utc):
-                        log.trace(
-                            "Skipping %s @ %s checks until closer to game start.",
-                            data["game"].away_team,
-                            data["game"].home_team,
-                        )
-                        continue
-                    try:
-                        data = await self.api.get_game_from_id(game_id)
-                    except Exception as e:
-                        log.error("Error getting informaiton about the game: %s", e)
-                        data = None
-
-                    if data is None:
-                        continue
-                    try:
-                        game = await self.api.get_game_from_id(game_id)
-                        self.current_games[game_id]["game"] = game
-                    except Exception:
-                        log.exception("Error creating game object from json.")
-                        continue
-                    try:
-                        await self.check_new_day()
-                        posted_final = await game.check_game_state(
-                            self.bot, self.current_games[game_id]["count"]
-                        )
-                    except Exception:
-                        log.exception("Error checking game state: ")
-                        posted_final = False
-                    if (
-                        game.game_state.is_live()
-                        and not self.current_games[game_id]["disabled_buttons"]
-                    ):
-                        log.verbose("Disabling buttons for %r", game)
-                        await self.disable_pickems_buttons(game)
-                        self.current_games[game_id]["disabled_buttons"] = True
-
-                    log.trace(
-                        "%s @ %s %s %s - %s",
-                        game.away_team,
-                        game.home_team,
-                        game.game_state,
-                        game.away_score,
-                        game.home_score,
-                    )
-
-                    if game.game_state.value > GameState.over.value:
-                        self.current_games[game_id]["count"] += 1
-                        if posted_final or game.game_state is GameState.official_final:
-                            try:
-                                await self.set_guild_pickem_winner(game, edit_message=True)
-                            except Exception:
-                                log.exception("Pickems Set Winner error: ")
-                            self.current_games[game_id]["count"] = 21
+                for game_id in self.current_games:
+                    await self.check_current_game(game_id)
                     await asyncio.sleep(1)
 
                 for link in self.current_games:
@@ -561,12 +520,68 @@ class Hockey(
                     pass
                 self.games_playing = False
 
-            # Final cleanup of config incase something went wrong
+            # Final cleanup of saved game states incase something went wrong
             # Should be mostly unnecessary at this point
-            await self.config.teams.clear()
+            await self.game_store.clear()
 
             await asyncio.sleep(300)
 
+    async def check_current_game(self, game_id: int) -> None:
+        """
+        Get the latest data for a game in `current_games` and post any updates
+        """
+        data = self.current_games[game_id]
+        if data["game"] is not None:
+            await self.fix_pickem_game_start(data["game"])
+        if data["game"] is not None and data["game"].game_start - timedelta(
+            hours=1
+        ) >= datetime.now(timezone.utc):
+            log.trace(
+                "Skipping %s @ %s checks until closer to game start.",
+                data["game"].away_team,
+                data["game"].home_team,
+            )
+            return
+        try:
+            game = await self.api.get_game_from_id(game_id)
+        except HockeyAPIError as e:
+            log.error("Error getting informaiton about the game: %s", e)
+            return
+        except Exception:
+            log.exception("Error creating game object from json.")
+            return
+        self.current_games[game_id]["game"] = game
+        try:
+            await self.check_new_day()
+            posted_final = await game.check_game_state(
+                self.bot, self.current_games[game_id]["count"]
+            )
+        except Exception:
+            log.exception("Error checking game state: ")
+            posted_final = False
+        if game.game_state.is_live() and not self.current_games[game_id]["disabled_buttons"]:
+            log.verbose("Disabling buttons for %r", game)
+            await self.disable_pickems_buttons(game)
+            self.current_games[game_id]["disabled_buttons"] = True
+
+        log.trace(
+            "%s @ %s %s %s - %s",
+            game.away_team,
+            game.home_team,
+            game.game_state,
+            game.away_score,
+            game.home_score,
+        )
+
+        if game.game_state.value > GameState.over.value:
+            self.current_games[game_id]["count"] += 1
+            if posted_final or game.game_state is GameState.official_final:
+                try:
+                    await self.set_guild_pickem_winner(game, edit_message=True)
+                except Exception:
+                    log.exception("Pickems Set Winner error: ")
+                self.current_games[game_id]["count"] = 21
+
     async def get_game_data(self, link: str) -> Optional[Dict[str, Any]]:
         if not self.TEST_LOOP:
             try:
@@ -1,13 +1,15 @@
 import asyncio
+import functools
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import discord
 from discord.ext import tasks
 from red_commons.logging import getLogger
 from redbot.core import bank, commands
 from redbot.core.i18n import Translator
-from redbot.core.utils import AsyncIter
+from redbot.core.utils import AsyncIter, bounded_gather
 from redbot.core.utils.chat_formatting import pagify
 
 from hockey.helper import slow_send_task, utc_to_local
@@ -22,6 +24,23 @@ log = getLogger("red.trusty-cogs.Hockey")
 hockey_commands = HockeyMixin.hockey_commands
 # defined in abc.py allowing this to be inherited by multiple files
 
+# Number of guilds tallied at the same time after games finish
+TALLY_CONCURRENCY = 10
+# Seconds between checks for old pickems to remove
+PICKEMS_EXPIRY_INTERVAL = 60 * 60
+
+DEFAULT_LEADERBOARD = {
+    "season": 0,
+    "weekly": 0,
+    "total": 0,
+    "playoffs": 0,
+    "playoffs_weekly": 0,
+    "playoffs_total": 0,
+    "pre-season": 0,
+    "pre-season_weekly": 0,
+    "pre-season_total": 0,
+}
+
 PICKEMS_MESSAGE = _(
     "**Welcome to our daily Pick'ems challenge!  Below you will see today's games!"
     "  Vote for who you think will win!  You get one point for each correct prediction. "
@@ -45,6 +64,12 @@ class HockeyPickems(HockeyMixin):
         # we're not spamming the API with the same game over and over
         # this gets cleared and is only used with leaderboard tallying
         self.antispam = {}
+        # (guild_id, pickem name) of pickems with unsaved changes
+        self._dirty_pickems: Set[Tuple[str, str]] = set()
+        self._last_pickems_expiry: float = 0.0
+        # game_id: {guild_id: pickem} and message_id: pickem for direct lookups
+        self._pickems_by_game: Dict[int, Dict[str, Pickems]] = {}
+        self._pickems_by_message: Dict[int, Pickems] = {}
 
     @tasks.loop(seconds=300)
     async def pickems_loop(self) -> None:
@@ -53,6 +78,68 @@ class HockeyPickems(HockeyMixin):
         except Exception:
             log.exception("Error saving pickems data")
         log.verbose("Saved pickems data.")
+        if time.monotonic() - self._last_pickems_expiry >= PICKEMS_EXPIRY_INTERVAL:
+            try:
+                await self.expire_old_pickems()
+            except Exception:
+                log.exception("Error removing old pickems")
+            self._last_pickems_expiry = time.monotonic()
+
+    def track_pickem(self, guild_id: str, name: str, pickem: Pickems) -> None:
+        """
+        Index a pickem by game and message and have changes to it
+        marked for saving on the next `save_pickems_data`
+        """
+        pickem._save_callback = functools.partial(self._dirty_pickems.add, (guild_id, name))
+        if pickem._should_save:
+            self._dirty_pickems.add((guild_id, name))
+        self._pickems_by_game.setdefault(pickem.game_id, {})[guild_id] = pickem
+        for message in pickem.messages:
+            self.track_pickem_message(pickem, message)
+
+    def track_pickem_message(self, pickem: Pickems, message: str) -> None:
+        try:
+            channel_id, message_id = message.split("-")
+        except ValueError:
+            return
+        self._pickems_by_message[int(message_id)] = pickem
+
+    def remove_pickem(self, guild_id: str, name: str) -> Optional[Pickems]:
+        """
+        Remove a pickem from memory and the lookup indexes
+        """
+        pickem = self.all_pickems.get(guild_id, {}).pop(name, None)
+        self._dirty_pickems.discard((guild_id, name))
+        if pickem is None:
+            return None
+        pickem._save_callback = None
+        guild_pickems = self._pickems_by_game.get(pickem.game_id, {})
+        if guild_pickems.get(guild_id) is pickem:
+            del guild_pickems[guild_id]
+            if not guild_pickems:
+                del self._pickems_by_game[pickem.game_id]
+        for message in pickem.messages:
+            try:
+                message_id = int(message.split("-")[1])
+            except (IndexError, ValueError):
+                continue
+            if self._pickems_by_message.get(message_id) is pickem:
+                del self._pickems_by_message[message_id]
+        return pickem
+
+    def get_pickem_from_message(self, message_id: int) -> Optional[Pickems]:
+        return self._pickems_by_message.get(message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        pickem = self._pickems_by_message.pop(payload.message_id, None)
+        if pickem is None:
+            return
+        message = f"{payload.channel_id}-{payload.message_id}"
+        if message in pickem.messages:
+            # stop trying to edit messages which no longer exist
+            pickem.messages.remove(message)
+            pickem._should_save = True
 
     @commands.Cog.listener()
     async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
@@ -81,39 +168,52 @@ class HockeyPickems(HockeyMixin):
                 log.debug("Unarchiving thread %r", after)
 
     async def save_pickems_data(self) -> None:
+        """
+        Save only the pickems which have changed since the last save
+        """
+        log.trace("Saving %s pickems", len(self._dirty_pickems))
+        # the set is cleared rather than replaced since each pickems
+        # save callback is bound to it
+        dirty = list(self._dirty_pickems)
+        self._dirty_pickems.clear()
+        for guild_id, name in dirty:
+            pickem = self.all_pickems.get(guild_id, {}).get(name)
+            if pickem is None:
+                # removed before it could be saved
+                continue
+            pickem._unsaved = False
+            try:
+                await self.pickems_config.guild_from_id(int(guild_id)).pickems.set_raw(
+                    name, value=pickem.to_json()
+                )
+            except Exception:
+                log.exception("Error saving pickem %r", pickem)
+                pickem._should_save = True
+
+    async def expire_old_pickems(self) -> None:
+        """
+        Remove pickems older than 7 days for pre-season and playoffs
+        and older than 30 days for the regular season
+        """
+        now = datetime.now(timezone.utc)
         to_del: Dict[str, List[str]] = {}
-        log.trace("Saving pickems data")
-        # all_pickems = self.all_pickems.copy()
-        async for guild_id, pickems in AsyncIter(self.all_pickems.items(), steps=10):
-            async with self.pickems_config.guild_from_id(int(guild_id)).pickems() as data:
-                for name, pickem in pickems.items():
-                    if pickem._should_save:
-                        log.trace("Saving pickem %r", pickem)
-                        data[name] = pickem.to_json()
-                    self.all_pickems[guild_id][name]._should_save = False
-                    days_old = datetime.now(timezone.utc) - pickem.game_start
-                    if pickem.game_type in [
-                        GameType.pre_season,
-                        GameType.playoffs,
-                    ] and days_old >= timedelta(days=7):
-                        del data[name]
-                        if guild_id not in to_del:
-                            to_del[guild_id] = [name]
-                        else:
-                            to_del[guild_id].append(name)
-                    elif days_old >= timedelta(days=30):
-                        del data[name]
-                        if guild_id not in to_del:
-                            to_del[guild_id] = [name]
-                        else:
-                            to_del[guild_id].append(name)
+        for guild_id, pickems in self.all_pickems.items():
+            for name, pickem in pickems.items():
+                days_old = now - pickem.game_start
+                if pickem.game_type in [
+                    GameType.pre_season,
+                    GameType.playoffs,
+                ] and days_old >= timedelta(days=7):
+                    to_del.setdefault(guild_id, []).append(name)
+                elif days_old >= timedelta(days=30):
+                    to_del.setdefault(guild_id, []).append(name)
 
         for guild_id, names in to_del.items():
-            for name in names:
-                try:
-                    del self.all_pickems[guild_id][name]
-                except KeyError:
-                    pass
+            async with self.pickems_config.guild_from_id(int(guild_id)).pickems() as data:
+                for name in names:
+                    log.verbose("Removing expired pickem %s", name)
+                    data.pop(name, None)
+                    self.remove_pickem(guild_id, name)
 
     async def after_pickems_loop(self) -> None:
         log.verbose("Saving pickems data and stopping views")
@@ -150,6 +250,9 @@ class HockeyPickems(HockeyMixin):
                 continue
             self.all_pickems[str(guild_id)] = pickems
             for name, pickem in pickems.items():
+                # already saved as is
+                pickem._unsaved = False
+                self.track_pickem(str(guild_id), name, pickem)
                 try:
                     self.bot.add_view(pickem)
                 except Exception:
@@ -159,31 +262,20 @@ class HockeyPickems(HockeyMixin):
         """
         Returns a list of all pickems on the bot for that game
         """
-        return_pickems = []
-        new_name = Pickems.name_from_game(game)
-        for guild_id, pickems in self.all_pickems.items():
-            guild = self.bot.get_guild(int(guild_id))
-            if guild is None:
-                continue
-            if pickems is None:
-                pickems = {}
-            if new_name in pickems:
-                return_pickems.append(pickems[new_name])
-
-        return return_pickems
+        return [
+            pickem
+            for guild_id, pickem in self._pickems_by_game.get(game.game_id, {}).items()
+            if self.bot.get_guild(int(guild_id)) is not None
+        ]
 
     async def disable_pickems_buttons(self, game: Game) -> None:
-        all_pickems = self.all_pickems.copy()
+        game_pickems = self._pickems_by_game.get(game.game_id, {}).copy()
         # log.debug("Disabling pickems Buttons for game %r", game)
-        for guild_id, pickems in all_pickems.items():
+        for guild_id, pickem in game_pickems.items():
             guild = self.bot.get_guild(int(guild_id))
             if guild is None:
                 log.trace("Guild ID %s Not available", guild_id)
                 continue
-            if str(game.game_id) not in pickems:
-                log.trace("Game %r not in pickems", game)
-                continue
-            pickem = self.all_pickems[str(guild_id)][str(game.game_id)]
             should_edit = pickem.disable_buttons()
             if not should_edit:
                 continue
@@ -202,18 +294,14 @@ class HockeyPickems(HockeyMixin):
                 )
 
     async def set_guild_pickem_winner(self, game: Game, edit_message: bool = False) -> None:
-        all_pickems = self.all_pickems.copy()
+        game_pickems = self._pickems_by_game.get(game.game_id, {}).copy()
         # log.debug("Setting winner for game %r", game)
         tasks = []
-        for guild_id, pickems in all_pickems.items():
-            if str(game.game_id) not in pickems:
-                # log.debug("Game %r not in pickems list.", game)
-                continue
+        for guild_id, pickem in game_pickems.items():
             guild = self.bot.get_guild(int(guild_id))
             if guild is None:
                 # log.debug("Guild %s not available", guild_id)
                 continue
-            pickem = self.all_pickems[str(guild_id)][str(game.game_id)]
             if not await pickem.check_winner(game):
                 # log.debug("Game %r does not have a winner yet.", game)
                 continue
@@ -274,21 +362,22 @@ class HockeyPickems(HockeyMixin):
         new_name = Pickems.name_from_game(game)
         if str(guild.id) not in self.all_pickems:
             self.all_pickems[str((guild.id))] = {}
-        old_pickem = self.all_pickems[str(guild.id)].get(str(game.game_id))
+        old_pickem = self._pickems_by_game.get(game.game_id, {}).get(str(guild.id))
 
         if old_pickem is None:
             should_edit = await self.pickems_config.guild(guild).show_count()
             pickem = Pickems.from_game(game, guild, self.api, should_edit)
 
             self.all_pickems[str(guild.id)][str(game.game_id)] = pickem
+            self.track_pickem(str(guild.id), str(game.game_id), pickem)
             log.debug("creating new pickems %s", new_name)
             return pickem
         else:
             if old_pickem.game_start != game.game_start:
-                self.all_pickems[str(guild.id)][str(game.game_id)].game_start = game.game_start
-                self.all_pickems[str(guild.id)][str(game.game_id)].enable_buttons()
-                self.all_pickems[str(guild.id)][str(game.game_id)]._should_save = True
-            return self.all_pickems[str(guild.id)][str(game.game_id)]
+                old_pickem.game_start = game.game_start
+                old_pickem.enable_buttons()
+                old_pickem._should_save = True
+            return old_pickem
 
     async def fix_pickem_game_start(self, game: Game):
         tasks = []
@@ -529,6 +618,7 @@ class HockeyPickems(HockeyMixin):
             log.exception("Error sending pickems %s", pickem.to_components())
             return
         pickem.messages.append(f"{channel.id}-{new_msg.id}")
+        self.track_pickem_message(pickem, f"{channel.id}-{new_msg.id}")
         pickem._should_save = True
         # Create new pickems object for the game
 
@@ -692,17 +782,33 @@ class HockeyPickems(HockeyMixin):
             except Exception:
                 log.exception(f"Error deleting old pickems channels in {repr(guild)}")
 
-    async def tally_guild_leaderboard(self, guild: discord.Guild) -> None:
+    async def tally_guild_leaderboard(
+        self,
+        guild: discord.Guild,
+        deposits: Optional[Dict[int, Tuple[discord.Member, int]]] = None,
+    ) -> None:
         """
         Allows individual guilds to tally pickems leaderboard
+
+        Every finished pickem in the guild is tallied in memory first so the
+        leaderboard and pickems are only written once and each member
+        only receives one deposit for all their correct picks.
+
+        When the bank is global and `deposits` is given, credits are added
+        to it by user ID instead of being deposited so the caller can
+        deposit once per user across every guild.
         """
         global_bank = await bank.is_global()
         if global_bank:
             base_credits = await self.pickems_config.base_credits()
         else:
             base_credits = await self.pickems_config.guild(guild).base_credits()
-        pickems_list = self.all_pickems.get(str(guild.id)).copy()
+        pickems_list = self.all_pickems.get(str(guild.id), {}).copy()
         to_remove = []
+        # user_id: {leaderboard_key: points}
+        results: Dict[str, Dict[str, int]] = {}
+        # user_id: number of correct picks
+        correct: Dict[str, int] = {}
         async for name, pickems in AsyncIter(pickems_list.items(), steps=10):
             # check for definitive winner here just incase
             if name not in self.pickems_games:
@@ -723,80 +829,90 @@ class HockeyPickems(HockeyMixin):
                 continue
             log.debug("Tallying results for %r", pickems)
             to_remove.append(name)
-            DEFAULT_LEADERBOARD = {
-                "season": 0,
-                "weekly": 0,
-                "total": 0,
-                "playoffs": 0,
-                "playoffs_weekly": 0,
-                "playoffs_total": 0,
-                "pre-season": 0,
-                "pre-season_weekly": 0,
-                "pre-season_total": 0,
-            }
+            if pickems.game_type is GameType.playoffs:
+                win_keys = ("playoffs", "playoffs_weekly", "playoffs_total")
+                loss_keys = ("playoffs_total",)
+            elif pickems.game_type is GameType.pre_season:
+                win_keys = ("pre-season", "pre-season_weekly", "pre-season_total")
+                loss_keys = ("pre-season_total",)
+            else:
+                win_keys = ("season", "total", "weekly")
+                # The above needs to be adjusted when this current season
+                # playoffs is finished
+                loss_keys = ("total",)
+                # Weekly reset weekly but we want to track this
+                # regardless of playoffs and pre-season
+                # If this causes confusion I can change it later
+                # leaving this comment so I remember
+            for user, choice in pickems.votes.items():
+                user_results = results.setdefault(str(user), {})
+                if choice == pickems.winner:
+                    correct[str(user)] = correct.get(str(user), 0) + 1
+                    keys = win_keys
+                else:
+                    keys = loss_keys
+                for key in keys:
+                    user_results[key] = user_results.get(key, 0) + 1
+        if not to_remove:
+            return
+
+        if results:
             async with self.pickems_config.guild(guild).leaderboard() as leaderboard:
-                for user, choice in pickems.votes.items():
-                    if str(user) not in leaderboard:
-                        leaderboard[str(user)] = DEFAULT_LEADERBOARD.copy()
-                    for key, value in DEFAULT_LEADERBOARD.items():
-                        # verify all defaults are in the setting
-                        if key not in leaderboard[str(user)]:
-                            leaderboard[str(user)][key] = value
-
-                    if choice == pickems.winner:
-                        if member := guild.get_member(int(user)):
-                            try:
-                                await bank.deposit_credits(member, int(base_credits))
-                            except Exception:
-                                log.debug("Could not deposit pickems credits for %r", member)
-                        if pickems.game_type is GameType.playoffs:
-                            leaderboard[str(user)]["playoffs"] += 1
-                            leaderboard[str(user)]["playoffs_weekly"] += 1
-                            leaderboard[str(user)]["playoffs_total"] += 1
-                        elif pickems.game_type is GameType.pre_season:
-                            leaderboard[str(user)]["pre-season"] += 1
-                            leaderboard[str(user)]["pre-season_weekly"] += 1
-                            leaderboard[str(user)]["pre-season_total"] += 1
-                        else:
-                            leaderboard[str(user)]["season"] += 1
-                            leaderboard[str(user)]["total"] += 1
-                            # The above needs to be adjusted when this current season
-                            # playoffs is finished
-                            leaderboard[str(user)]["weekly"] += 1
-                    else:
-                        if pickems.game_type is GameType.playoffs:
-                            leaderboard[str(user)]["playoffs_total"] += 1
-                        elif pickems.game_type is GameType.pre_season:
-                            leaderboard[str(user)]["pre-season_total"] += 1
-                        else:
-                            leaderboard[str(user)]["total"] += 1
-                        # Weekly reset weekly but we want to track this
-                        # regardless of playoffs and pre-season
-                        # If this causes confusion I can change it later
-                        # leaving this comment so I remember
-        for name in to_remove:
-            try:
+                for user, user_results in results.items():
+                    # verify all defaults are in the setting
+                    user_leaderboard = {**DEFAULT_LEADERBOARD, **leaderboard.get(user, {})}
+                    for key, value in user_results.items():
+                        user_leaderboard[key] += value
+                    leaderboard[user] = user_leaderboard
+
+        if base_credits:
+            async for user, count in AsyncIter(correct.items(), steps=100):
+                if member := guild.get_member(int(user)):
+                    if global_bank and deposits is not None:
+                        amount = deposits.get(member.id, (member, 0))[1]
+                        deposits[member.id] = (member, amount + int(base_credits) * count)
+                        continue
+                    try:
+                        await bank.deposit_credits(member, int(base_credits) * count)
+                    except Exception:
+                        log.debug("Could not deposit pickems credits for %r", member)
+
+        async with self.pickems_config.guild(guild).pickems() as data:
+            for name in to_remove:
                 log.verbose("Removing pickem %s", name)
-                del self.all_pickems[str(guild.id)][name]
-                async with self.pickems_config.guild(guild).pickems() as data:
-                    if name in data:
-                        del data[name]
-            except Exception:
-                log.error("Error removing pickems from memory", exc_info=True)
+                self.remove_pickem(str(guild.id), name)
+                data.pop(name, None)
 
     async def tally_leaderboard(self) -> None:
         """
         This should be where the pickems is removed and tallies are added
         to the leaderboard
         """
-        async for guild_id in AsyncIter(self.all_pickems.keys(), steps=10):
+        guilds = []
+        for guild_id in list(self.all_pickems.keys()):
             guild = self.bot.get_guild(int(guild_id))
             if guild is None:
                 continue
+            guilds.append(guild)
+        start = time.monotonic()
+        # A global bank reads then sets the balance so concurrent deposits
+        # for the same user can overwrite each other. Credits are collected
+        # from every guild and deposited once per user instead.
+        deposits: Dict[int, Tuple[discord.Member, int]] = {}
+        results = await bounded_gather(
+            *[self.tally_guild_leaderboard(guild, deposits) for guild in guilds],
+            return_exceptions=True,
+            limit=TALLY_CONCURRENCY,
+        )
+        for guild, result in zip(guilds, results):
+            if isinstance(result, Exception):
+                log.error("Error tallying leaderboard in %s", guild.name, exc_info=result)
+        async for member, amount in AsyncIter(deposits.values(), steps=100):
             try:
-                await self.tally_guild_leaderboard(guild)
+                await bank.deposit_credits(member, amount)
             except Exception:
-                log.exception(f"Error tallying leaderboard in {guild.name}")
+                log.debug("Could not deposit pickems credits for %r", member)
+        log.debug("Tallied pickems in %s guilds in %.2fs", len(guilds), time.monotonic() - start)
         self.pickems_games = {}
         # Clear the data since we no longer need it after this
         # anything new will be a new day and that's when we care
@@ -1177,10 +1293,9 @@ class HockeyPickems(HockeyMixin):
             return
         if true_or_false:
             await self.pickems_config.guild(ctx.guild).pickems.clear()
-            try:
-                del self.all_pickems[str(ctx.guild.id)]
-            except KeyError:
-                pass
+            for name in list(self.all_pickems.get(str(ctx.guild.id), {})):
+                self.remove_pickem(str(ctx.guild.id), name)
+            self.all_pickems.pop(str(ctx.guild.id), None)
             await ctx.send(_("All pickems removed on this server."))
         else:
             await ctx.send(_("I will not remove the current pickems on this server."))
@@ -420,6 +420,7 @@ class HockeySetCommands(HockeyMixin):
             return
         current = await self.config.channel(channel).countdown()
         await self.config.channel(channel).countdown.set(not current)
+        await self.subscriptions.refresh(channel.id)
         if current:
             await ctx.send(
                 _(
@@ -471,6 +472,7 @@ class HockeySetCommands(HockeyMixin):
                 added.append(state.value)
                 game_states.append(state.value)
             cur_states = game_states
+        await self.subscriptions.refresh(channel.id)
         msg = _("{channel} game updates set to {states}").format(
             channel=channel.mention, states=humanize_list(cur_states) if cur_states else _("None")
         )
@@ -518,6 +520,7 @@ class HockeySetCommands(HockeyMixin):
         else:
             current = not await self.config.channel(channel).include_goal_image()
             await self.config.channel(channel).include_goal_image.set(current)
+            await self.subscriptions.refresh(channel.id)
             if current:
                 await ctx.send(
                     _(
@@ -570,6 +573,7 @@ class HockeySetCommands(HockeyMixin):
                 )
                 if isinstance(channel, discord.Thread):
                     await self.config.channel(channel).parent.set(channel.parent.id)
+                await self.subscriptions.refresh(channel.id)
         await ctx.send(msg)
 
     @hockeyset_commands.command(name="remove", aliases=["del", "rem", "delete"])
@@ -612,4 +616,5 @@ class HockeySetCommands(HockeyMixin):
                         msg = _("{team} goal updates removed from {channel}.").format(
                             team=team, channel=channel.mention
                         )
+            await self.subscriptions.refresh(channel.id)
         await ctx.send(msg)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
 
 import discord
 from red_commons.logging import getLogger
@@ -149,7 +149,9 @@ class Pickems(discord.ui.View):
         self.name = name
         self.link = link
 
-        self._should_save: bool = True
+        self._save_callback: Optional[Callable[[], None]] = None
+        # called whenever the pickem needs saving, see `HockeyPickems.track_pickem`
+        self._unsaved: bool = True
         # Start true so we save instantiated pickems
         self.game_type: GameType = game_type
         super().__init__(timeout=None)
@@ -170,6 +172,16 @@ class Pickems(discord.ui.View):
         self.add_item(self.away_button)
         self.should_edit: bool = should_edit
 
+    @property
+    def _should_save(self) -> bool:
+        return self._unsaved
+
+    @_should_save.setter
+    def _should_save(self, value: bool) -> None:
+        self._unsaved = value
+        if value and self._save_callback is not None:
+            self._save_callback()
+
     @staticmethod
     def name_from_game(game: Game) -> str:
         return f"{game.away.tri_code}@{game.home.tri_code}-{game.game_start.month}-{game.game_start.day}"
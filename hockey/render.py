@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Optional
+
+import discord
+from red_commons.logging import getLogger
+
+log = getLogger("red.trusty-cogs.Hockey")
+
+
+class RenderCache:
+    """
+    Least recently used cache of rendered embeds.
+
+    Keys must include a version of the data the embed was built from,
+    e.g. the API response versions of a game, so that an embed is
+    reused by every channel and command until the data changes.
+    Embeds are copied on the way out since callers may modify them.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._cache: OrderedDict[Hashable, discord.Embed] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, key: Hashable) -> Optional[discord.Embed]:
+        em = self._cache.get(key)
+        if em is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return em.copy()
+
+    def set(self, key: Hashable, em: discord.Embed) -> None:
+        self._cache[key] = em.copy()
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class LogoCache:
+    """
+    Keeps team logos in memory so posting to many channels doesn't
+    read the same files from disk for every message.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._logos: Dict[str, Optional[bytes]] = {}
+
+    def get(self, filename: str) -> Optional[bytes]:
+        if filename not in self._logos:
+            try:
+                self._logos[filename] = self.path.joinpath(filename).read_bytes()
+            except FileNotFoundError:
+                self._logos[filename] = None
+        return self._logos[filename]
+
+    def clear(self) -> None:
+        self._logos.clear()
@@ -0,0 +1,512 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import inspect
+import itertools
+import json
+import time
+import types
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Dict, List, Optional, Union
+
+import discord
+from red_commons.logging import getLogger
+from redbot.core import Config
+from redbot.core.bot import Red
+from redbot.core.config import Value
+from yarl import URL
+
+from .api import CachedResponse, HockeyAPIError, NewAPI
+from .gamestore import GameStateStore
+from .helper import GAME_STATE_OPTIONS, SendLimiter
+from .subscriptions import ChannelSubscriptions
+
+if TYPE_CHECKING:
+    from .game import Game
+    from .hockey import Hockey
+
+log = getLogger("red.trusty-cogs.Hockey")
+
+# Seconds without any fake message activity before a tick is considered done
+QUIET_PERIOD = 0.5
+# Longest time to wait for a single tick to finish posting
+TICK_TIMEOUT = 120
+# Seconds the game loop waits between checks, cached responses are aged by this every tick
+LOOP_INTERVAL = 60
+# Game center endpoints served from the replay folder, anything else is refused
+REPLAY_ENDPOINTS = ("play-by-play", "landing", "right-rail")
+
+_snowflakes = itertools.count()
+
+
+def _snowflake() -> int:
+    # unique ids which still resolve to the current time for `snowflake_time`
+    return discord.utils.time_snowflake(datetime.now(timezone.utc)) + next(_snowflakes)
+
+
+class ReplayRecorder:
+    """Records everything the fake Discord objects are asked to do"""
+
+    def __init__(self):
+        self.sends: int = 0
+        self.edits: int = 0
+        self.deletes: int = 0
+        self.last_activity: float = time.monotonic()
+        self.events: Dict[str, int] = {}
+
+    def record(self, kind: str) -> None:
+        setattr(self, kind, getattr(self, kind) + 1)
+        self.last_activity = time.monotonic()
+
+    @property
+    def total(self) -> int:
+        return self.sends + self.edits + self.deletes
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, message_id: Optional[int] = None):
+        self.id = message_id or _snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+
+    async def edit(self, *args, **kwargs) -> FakeMessage:
+        self.channel.recorder.record("edits")
+        return self
+
+    async def delete(self, *args, **kwargs) -> None:
+        self.channel.recorder.record("deletes")
+
+    async def publish(self) -> None:
+        pass
+
+    async def pin(self, *args, **kwargs) -> None:
+        pass
+
+
+class FakeMember:
+    def __init__(self, member_id: int, name: str):
+        self.id = member_id
+        self.name = name
+
+    def is_timed_out(self) -> bool:
+        return False
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, me: FakeMember):
+        self.id = guild_id
+        self.name = f"Replay Guild {guild_id}"
+        self.me = me
+        self.roles: List[discord.Role] = []
+        self.channels: Dict[int, FakeChannel] = {}
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+    def get_thread(self, thread_id: int) -> None:
+        return None
+
+    def get_role(self, role_id: int) -> None:
+        return None
+
+
+class FakeChannel:
+    """
+    Just enough of a `discord.TextChannel` for posting game updates.
+    """
+
+    def __init__(self, channel_id: int, guild: FakeGuild, recorder: ReplayRecorder):
+        self.id = channel_id
+        self.guild = guild
+        self.name = f"replay-{channel_id}"
+        self.mention = f"<#{channel_id}>"
+        self.recorder = recorder
+
+    def __repr__(self) -> str:
+        return f"<FakeChannel id={self.id}>"
+
+    def permissions_for(self, member: Any) -> discord.Permissions:
+        return discord.Permissions.all()
+
+    def is_news(self) -> bool:
+        return False
+
+    async def send(self, *args, **kwargs) -> FakeMessage:
+        self.recorder.record("sends")
+        return FakeMessage(self)
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        return FakeMessage(self, message_id)
+
+
+# Config methods which change data, these are dropped by `ReplayConfig`
+CONFIG_WRITES = frozenset(
+    {
+        "set",
+        "set_raw",
+        "clear",
+        "clear_raw",
+        "clear_all",
+        "clear_all_globals",
+        "clear_all_guilds",
+        "clear_all_channels",
+        "clear_all_roles",
+        "clear_all_users",
+        "clear_all_members",
+        "clear_all_custom",
+    }
+)
+
+
+@dataclass
+class ConfigUsage:
+    reads: int = 0
+    writes: int = 0
+
+
+class ReadOnlyValue:
+    """
+    A config read which can also be used as `async with` without saving
+    anything when it exits.
+    """
+
+    def __init__(self, awaitable: Awaitable):
+        self._awaitable = awaitable
+
+    def __await__(self):
+        return self._awaitable.__await__()
+
+    async def __aenter__(self) -> Any:
+        return copy.deepcopy(await self._awaitable)
+
+    async def __aexit__(self, *args) -> bool:
+        return False
+
+
+class ReplayConfig:
+    """
+    Read only view of a `Config`, `Group` or `Value` so replays never write real data.
+
+    Reads are counted and passed through to the real config since fake
+    channels and guilds only ever see the defaults. Writes are counted
+    and dropped.
+    """
+
+    def __init__(self, obj: Union[Config, Value], usage: Optional[ConfigUsage] = None):
+        self._obj = obj
+        self.usage = usage or ConfigUsage()
+
+    def _wrap(self, ret: Any) -> Any:
+        if isinstance(ret, (Config, Value)):
+            return ReplayConfig(ret, self.usage)
+        if inspect.isawaitable(ret):
+            self.usage.reads += 1
+            return ReadOnlyValue(ret)
+        return ret
+
+    async def _drop_write(self, *args, **kwargs) -> None:
+        self.usage.writes += 1
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._wrap(self._obj(*args, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        if name in CONFIG_WRITES:
+            return self._drop_write
+        attr = getattr(self._obj, name)
+        if isinstance(attr, (Config, Value)):
+            return ReplayConfig(attr, self.usage)
+        if callable(attr):
+            return lambda *args, **kwargs: self._wrap(attr(*args, **kwargs))
+        return attr
+
+
+class OfflineSession:
+    """Stand-in for an API session which refuses every request"""
+
+    def get(self, url: Any, *args, **kwargs) -> Any:
+        raise HockeyAPIError("Replays can't access the live API.", 0, url)
+
+    async def close(self) -> None:
+        pass
+
+
+class ReplayAPI(NewAPI):
+    """
+    The NHL API with the game center served from recorded responses.
+
+    Responses go through the same response and game caches as live data
+    so requests and cache hits are counted exactly like the game loop
+    would see them. Every other request is refused so a replay never
+    reaches the live API.
+    """
+
+    def __init__(self, api: NewAPI):
+        super().__init__(api.cog_path)
+        self.team_emojis = api.team_emojis
+        # endpoint name -> response body
+        self.responses: Dict[str, bytes] = {}
+        self._sessions: List[Any] = []
+        for client in (self, self.search_api, self.stats_api, self.records_api):
+            self._sessions.append(client.session)
+            client.session = OfflineSession()
+
+    async def close(self):
+        for session in self._sessions:
+            await session.close()
+
+    async def _fetch(
+        self, url: URL, ttl: float, cached: Optional[CachedResponse]
+    ) -> CachedResponse:
+        body = None
+        if url.path.startswith("/v1/gamecenter/"):
+            body = self.responses.get(url.path.rsplit("/", 1)[-1])
+        if body is None:
+            raise HockeyAPIError("Replays can't access the live API.", 0, url)
+        self.requests += 1
+        return self._store(url, ttl, cached, body)
+
+    def advance(self, seconds: float) -> None:
+        """Age every cached response as if `seconds` had passed"""
+        for response in self._responses.values():
+            response.expires -= seconds
+
+
+class ReplayCog:
+    """
+    Proxy of the Hockey cog with its own game state and fake channels.
+
+    Methods of the real cog are bound to the proxy so they only ever see
+    the replay config, state, API and fake bot.
+    """
+
+    def __init__(self, cog: Hockey, config: ReplayConfig, api: ReplayAPI):
+        self._cog = cog
+        self.api = api
+        self.bot: Optional[ReplayBot] = None
+        self.config = config
+        self.subscriptions = ChannelSubscriptions(config)
+        self.game_store = GameStateStore(config)
+        self.send_limiter = SendLimiter()
+        self.saving_goals: Dict[int, Dict[str, asyncio.Event]] = {}
+        self._edit_tasks: Dict[str, asyncio.Task] = {}
+        self.current_games: Dict[int, dict] = {}
+
+    # pickems and game day channels only exist in real guilds so they are left alone
+    async def check_new_day(self) -> None:
+        pass
+
+    async def fix_pickem_game_start(self, game: Game) -> None:
+        pass
+
+    async def disable_pickems_buttons(self, game: Game) -> None:
+        pass
+
+    async def set_guild_pickem_winner(self, game: Game, edit_message: bool = False) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(type(self._cog), name, None)
+        if inspect.isfunction(attr):
+            return types.MethodType(attr, self)
+        value = getattr(self._cog, name)
+        if isinstance(value, Config):
+            return ReplayConfig(value, self.config.usage)
+        return value
+
+
+class ReplayBot:
+    """
+    Proxy of the bot which resolves the fake guilds and channels
+    and keeps dispatched events away from other cogs.
+    """
+
+    def __init__(self, bot: Red, cog: ReplayCog, recorder: ReplayRecorder):
+        self._bot = bot
+        self._cog = cog
+        self._recorder = recorder
+        self.guilds: Dict[int, FakeGuild] = {}
+
+    def get_cog(self, name: str) -> Any:
+        if name == "Hockey":
+            return self._cog
+        return self._bot.get_cog(name)
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        for guild in self.guilds.values():
+            if channel := guild.get_channel(channel_id):
+                return channel
+        return None
+
+    def dispatch(self, event: str, *args, **kwargs) -> None:
+        self._recorder.events[event] = self._recorder.events.get(event, 0) + 1
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._bot, name)
+
+
+@dataclass
+class TickResult:
+    tick: int
+    game_state: str
+    goals_added: int
+    duration: float
+    posts: int
+    http_requests: int
+    http_cache_hits: int
+    config_reads: int
+    config_writes: int
+
+
+@dataclass
+class ReplayReport:
+    channels: int
+    ticks: List[TickResult] = field(default_factory=list)
+    goal_latencies: List[float] = field(default_factory=list)
+    events: Dict[str, int] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        ret = f"Replayed {len(self.ticks)} snapshots to {self.channels} fake channels\n"
+        if self.goal_latencies:
+            ret += (
+                "Goal to last post: "
+                f"avg {sum(self.goal_latencies) / len(self.goal_latencies):.2f}s "
+                f"max {max(self.goal_latencies):.2f}s\n"
+            )
+        ret += f"Events: {self.events}\n"
+        ret += "tick state goals time posts http cached cfg_reads cfg_writes\n"
+        for t in self.ticks:
+            ret += (
+                f"{t.tick} {t.game_state} {t.goals_added} {t.duration:.2f}s {t.posts} "
+                f"{t.http_requests} {t.http_cache_hits} {t.config_reads} {t.config_writes}\n"
+            )
+        return ret
+
+
+class ReplayHarness:
+    """
+    Feeds recorded play by play snapshots through the live game code.
+
+    Every snapshot is served as the play by play response and checked with
+    `check_current_game` exactly like one pass of `game_check_loop`, except
+    that updates are posted to `channels` fake channels following every team
+    and nothing is written to config. The time until posting finishes, HTTP
+    requests, cache hits and config usage are reported for every snapshot.
+    """
+
+    def __init__(self, cog: Hockey, channels: int = 50, guilds: int = 10):
+        self.cog = cog
+        self.recorder = ReplayRecorder()
+        self.config = ReplayConfig(cog.config)
+        self.api = ReplayAPI(cog.api)
+        self.replay_cog = ReplayCog(cog, self.config, self.api)
+        self.bot = ReplayBot(cog.bot, self.replay_cog, self.recorder)
+        self.replay_cog.bot = self.bot
+        self.channels = channels
+        me = FakeMember(_snowflake(), "Hockey")
+        guild_ids = [_snowflake() for _ in range(max(guilds, 1))]
+        for guild_id in guild_ids:
+            self.bot.guilds[guild_id] = FakeGuild(guild_id, me)
+        for i in range(channels):
+            guild = self.bot.guilds[guild_ids[i % len(guild_ids)]]
+            channel = FakeChannel(_snowflake(), guild, self.recorder)
+            guild.channels[channel.id] = channel
+            self.replay_cog.subscriptions._add(
+                channel.id,
+                {
+                    "team": ["all"],
+                    "game_states": list(GAME_STATE_OPTIONS),
+                    "countdown": True,
+                    "to_delete": False,
+                    "update": True,
+                    "publish_states": [],
+                    "guild_id": guild.id,
+                    "parent": None,
+                    "include_goal_image": False,
+                },
+            )
+
+    @staticmethod
+    def load_snapshots(path: Path) -> List[dict]:
+        """Load every `.json` play by play snapshot in a folder in name order"""
+        snapshots = []
+        for file in sorted(path.glob("*.json")):
+            if file.stem in REPLAY_ENDPOINTS:
+                continue
+            with file.open("r") as infile:
+                snapshots.append(json.load(infile))
+        return snapshots
+
+    @staticmethod
+    def load_responses(path: Path) -> Dict[str, dict]:
+        """
+        Load the `landing.json` and `right-rail.json` responses in a folder
+
+        Missing responses are served empty like a game without 3 stars or videos.
+        """
+        responses = {}
+        for endpoint in REPLAY_ENDPOINTS[1:]:
+            file = path / f"{endpoint}.json"
+            if file.is_file():
+                with file.open("r") as infile:
+                    responses[endpoint] = json.load(infile)
+        return responses
+
+    async def _wait_until_quiet(self, start: float) -> None:
+        while time.monotonic() - start < TICK_TIMEOUT:
+            await asyncio.sleep(QUIET_PERIOD / 2)
+            if time.monotonic() - self.recorder.last_activity >= QUIET_PERIOD:
+                return
+
+    async def run(
+        self, snapshots: List[dict], responses: Optional[Dict[str, dict]] = None
+    ) -> ReplayReport:
+        report = ReplayReport(channels=self.channels)
+        api = self.api
+        for endpoint in REPLAY_ENDPOINTS[1:]:
+            api.responses[endpoint] = json.dumps((responses or {}).get(endpoint, {})).encode()
+        try:
+            for tick, data in enumerate(snapshots):
+                game_id = data["id"]
+                current = self.replay_cog.current_games.setdefault(
+                    game_id, {"count": 0, "game": None, "disabled_buttons": False}
+                )
+                known_goals = len(current["game"].goals) if current["game"] is not None else 0
+                requests, cache_hits = api.requests, api.cache_hits
+                reads, writes = self.config.usage.reads, self.config.usage.writes
+                posts = self.recorder.total
+                api.advance(LOOP_INTERVAL)
+                api.responses["play-by-play"] = json.dumps(data).encode()
+                start = time.monotonic()
+                self.recorder.last_activity = start
+                await self.replay_cog.check_current_game(game_id)
+                await self._wait_until_quiet(start)
+                duration = self.recorder.last_activity - start
+                game = current["game"]
+                goals_added = max(len(game.goals) - known_goals, 0) if game is not None else 0
+                if goals_added:
+                    report.goal_latencies.append(duration)
+                await self.replay_cog.game_store.save()
+                report.ticks.append(
+                    TickResult(
+                        tick=tick,
+                        game_state=game.game_state.name if game is not None else "None",
+                        goals_added=goals_added,
+                        duration=duration,
+                        posts=self.recorder.total - posts,
+                        http_requests=api.requests - requests,
+                        http_cache_hits=api.cache_hits - cache_hits,
+                        config_reads=self.config.usage.reads - reads,
+                        config_writes=self.config.usage.writes - writes,
+                    )
+                )
+        finally:
+            await api.close()
+        report.events = dict(self.recorder.events)
+        return report
@@ -5,7 +5,7 @@ import re
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
-from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Union
+from typing import TYPE_CHECKING, Dict, Hashable, List, Literal, Optional, Tuple, Union
 
 import aiohttp
 import discord
@@ -556,6 +556,7 @@ class Standings:
     def __init__(self, records: dict = {}):
         super().__init__()
         self.all_records = records
+        self._rendered: Dict[Tuple[Hashable, ...], discord.Embed] = {}
 
     def last_timestamp(
         self,
@@ -681,7 +682,16 @@ class Standings:
     async def all_standing_embed(self, table: bool = True) -> StandingsPage:
         """
         Builds the standing embed when all TEAMS are selected
+
+        The embed is built once per `Standings` and reused afterwards since
+        the API returns the same `Standings` until the data changes.
         """
+        key = ("all", table, self.last_timestamp())
+        if key not in self._rendered:
+            self._rendered[key] = await self._all_standing_embed(table)
+        return StandingsPage(embed=self._rendered[key].copy(), files=[])
+
+    async def _all_standing_embed(self, table: bool) -> discord.Embed:
         em = discord.Embed()
         new_dict = {}
         nhl_icon = "https://cdn.bleacherreport.net/images/team_logos/328x328/nhl.png"
@@ -706,7 +716,7 @@ class Standings:
         em.add_field(name=_("Legend"), value=legend)
         em.timestamp = utc_to_local(latest_timestamp, "UTC")
         em.set_footer(text="Stats Last Updated", icon_url=nhl_icon)
-        return StandingsPage(embed=em, files=[])
+        return em
 
     async def league_standing_embed(self, table: bool = True) -> StandingsPage:
         em = discord.Embed()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from red_commons.logging import getLogger
+from redbot.core import Config
+
+log = getLogger("red.trusty-cogs.Hockey")
+
+
+class ChannelSubscriptions:
+    """
+    An in memory index of which channels are posting updates for which teams.
+
+    Channels are indexed by `(team, state)` where state is one of the
+    `[p]hockeyset stateupdates` options so that posting an update only looks at
+    channels which want it instead of every channel in config.
+
+    Anything changing a channels team or state settings must call
+    `refresh` afterwards to keep the index in sync with config.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._channels: Dict[int, dict] = {}
+        self._teams: Dict[str, Set[int]] = {}
+        self._states: Dict[Tuple[str, str], Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._channels
+
+    async def load(self) -> None:
+        """Build the index from every channel in config"""
+        self._channels = {}
+        self._teams = {}
+        self._states = {}
+        for channel_id, data in (await self.config.all_channels()).items():
+            self._add(int(channel_id), data)
+        log.debug("Loaded %s channels into the subscription index", len(self._channels))
+
+    def _add(self, channel_id: int, data: dict) -> None:
+        teams = data.get("team") or []
+        if not teams:
+            return
+        self._channels[channel_id] = data
+        for team in teams:
+            self._teams.setdefault(team, set()).add(channel_id)
+            for state in data.get("game_states", []):
+                self._states.setdefault((team, state), set()).add(channel_id)
+
+    def remove(self, channel_id: int) -> None:
+        data = self._channels.pop(channel_id, None)
+        if data is None:
+            return
+        for team in data.get("team") or []:
+            if channels := self._teams.get(team):
+                channels.discard(channel_id)
+                if not channels:
+                    del self._teams[team]
+            for state in data.get("game_states", []):
+                if channels := self._states.get((team, state)):
+                    channels.discard(channel_id)
+                    if not channels:
+                        del self._states[(team, state)]
+
+    async def refresh(self, channel_id: int) -> None:
+        """Reload a single channels settings from config"""
+        data = await self.config.channel_from_id(channel_id).all()
+        self.remove(channel_id)
+        self._add(channel_id, data)
+
+    def get_channels(self, teams: Iterable[str], state: Optional[str] = None) -> Dict[int, dict]:
+        """
+        Get the channels posting updates for any of the provided teams.
+
+        Parameters
+        ----------
+            teams: Iterable[str]
+                The team names to look for, usually `["all", home_team, away_team]`.
+            state: Optional[str]
+                Only include channels with this state enabled e.g. `"Goal"`.
+                If not provided every channel following the teams is returned.
+
+        Returns
+        -------
+            Dict[int, dict]
+                A mapping of channel ID to that channels config data.
+        """
+        channel_ids: Set[int] = set()
+        for team in teams:
+            if state is None:
+                channel_ids.update(self._teams.get(team, ()))
+            else:
+                channel_ids.update(self._states.get((team, state), ()))
+        return {channel_id: self._channels[channel_id] for channel_id in channel_ids}
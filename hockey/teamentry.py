@@ -32,15 +32,20 @@ class TeamEntry:
             "game_id": self.game_id,
         }
 
+    @property
+    def key(self) -> str:
+        """The key this entry is saved under in config"""
+        return f"{self.game_id}-{self.team_name}"
+
     @classmethod
     def from_json(cls, data: dict):
         return cls(
-            data["team_name"],
-            data["game_state"],
-            data["game_start"],
-            data["channel"],
-            data["period"],
-            data["goal_id"],
-            data["created_channel"],
-            data.get("game_id", 0),
+            game_state=data["game_state"],
+            team_name=data["team_name"],
+            period=data["period"],
+            channel=data.get("channel", []),
+            goal_id=data.get("goal_id", {}),
+            created_channel=data.get("created_channel", []),
+            game_start=data.get("game_start", ""),
+            game_id=data.get("game_id", 0),
         )
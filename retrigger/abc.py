@@ -6,6 +6,7 @@ from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Tuple, Union
 import discord
 
 if TYPE_CHECKING:
+    import aiohttp
     from redbot.core import Config, commands
     from redbot.core.bot import Red
     from redbot.core.commands import TimedeltaConverter
@@ -19,6 +20,9 @@ if TYPE_CHECKING:
         ValidEmoji,
         ValidRegex,
     )
+    from .ocr import OCRHandler
+    from .regexpool import RegexPool
+    from .triggerindex import TriggerIndex
 
 
 class ReTriggerMixin(ABC):
@@ -27,6 +31,10 @@ class ReTriggerMixin(ABC):
         self.config: Config
         self.bot: Red
         self.triggers: Dict[int, Dict[str, Trigger]]
+        self.trigger_index: Dict[int, TriggerIndex]
+        self.re_pool: RegexPool
+        self.session: aiohttp.ClientSession
+        self.ocr: OCRHandler
 
     #############################################################################
     # triggerhandler.py                                                         #
@@ -36,6 +44,18 @@ class ReTriggerMixin(ABC):
     async def remove_trigger_from_cache(self, guild_id: int, trigger: Trigger) -> None:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def add_trigger_to_cache(self, guild_id: int, trigger: Trigger) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def rebuild_trigger_index(self, guild_id: int) -> TriggerIndex:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_trigger_index(self, guild_id: int) -> TriggerIndex:
+        raise NotImplementedError()
+
     @abstractmethod
     async def can_edit(self, author: discord.Member, trigger: Trigger) -> bool:
         raise NotImplementedError()
@@ -113,6 +133,12 @@ class ReTriggerMixin(ABC):
     ) -> Tuple[bool, list]:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def safe_regex_search_batch(
+        self, guild: discord.Guild, searches: List[Tuple[Trigger, str]]
+    ) -> List[Tuple[bool, list]]:
+        raise NotImplementedError()
+
     @abstractmethod
     async def perform_trigger(
         self, message: discord.Message, trigger: Trigger, find: List[str]
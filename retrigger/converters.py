@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from dataclasses import dataclass
+from datetime import datetime, timezone
 from enum import Enum
 from typing import (
     TYPE_CHECKING,
+    AbstractSet,
     Any,
     Dict,
     List,
@@ -264,6 +267,80 @@ class TriggerThread:
         }
 
 
+class Cooldown:
+    """
+    Tracks when a trigger was last run per guild, channel, or author.
+
+    Entries are kept in the order they were last used so expired
+    entries can be pruned from the front without scanning everything.
+    Times are taken when the message is processed rather than from
+    `created_at` since edited messages keep their original creation time
+    and would otherwise be stored out of order.
+    """
+
+    __slots__ = ("time", "style", "last")
+
+    def __init__(self, time: int, style: str, last: Optional[Dict[int, float]] = None):
+        self.time: int = time
+        self.style: str = style
+        # snowflake ID -> timestamp last triggered
+        # guild wide cooldowns are stored under 0
+        self.last: OrderedDict[int, float] = OrderedDict(
+            sorted((last or {}).items(), key=lambda x: x[1])
+        )
+
+    @property
+    def is_guild(self) -> bool:
+        return self.style in ["guild", "server"]
+
+    def prune(self, now: float) -> None:
+        """Remove every entry whose cooldown has expired."""
+        while self.last and (now - next(iter(self.last.values()))) > self.time:
+            self.last.popitem(last=False)
+
+    def check(self, message: discord.Message) -> bool:
+        """
+        Returns `True` if the trigger is currently on cooldown
+        otherwise marks the trigger as being used now.
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        snowflake_id = 0 if self.is_guild else getattr(message, self.style).id
+        last = self.last.get(snowflake_id)
+        if last is not None and (now - last) <= self.time:
+            return True
+        self.last[snowflake_id] = now
+        self.last.move_to_end(snowflake_id)
+        self.prune(now)
+        return False
+
+    def to_json(self) -> dict:
+        self.prune(datetime.now(timezone.utc).timestamp())
+        return {
+            "time": self.time,
+            "style": self.style,
+            "last": [[snowflake_id, last] for snowflake_id, last in self.last.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> Optional[Cooldown]:
+        if not data:
+            return None
+        last: Dict[int, float] = {}
+        raw_last = data.get("last", [])
+        if isinstance(raw_last, (int, float)):
+            # older guild style cooldowns stored a single timestamp
+            if raw_last:
+                last[0] = raw_last
+        else:
+            for entry in raw_last:
+                if isinstance(entry, dict):
+                    # older cooldowns stored a list of {"id": id, "last": timestamp}
+                    last[entry["id"]] = entry["last"]
+                else:
+                    last[entry[0]] = entry[1]
+        return cls(data["time"], data["style"], last)
+
+
 class Trigger:
     """
     Trigger class to handle trigger objects
@@ -307,6 +384,7 @@ class Trigger:
         "_last_modified_at",
         "_last_modified",
         "suppress",
+        "_dirty",
     )
 
     def __init__(
@@ -332,7 +410,7 @@ class Trigger:
         self.text: Optional[str] = kwargs.get("text", None)
         self.whitelist: List[int] = kwargs.get("whitelist", [])
         self.blacklist: List[int] = kwargs.get("blacklist", [])
-        self.cooldown: Dict[str, int] = kwargs.get("cooldown", {})
+        self.cooldown: Optional[Cooldown] = kwargs.get("cooldown", None)
         self.multi_payload: List[MultiResponse] = kwargs.get("multi_payload", [])
         self._created_at: int = kwargs.get("created_at", 0)
         self.ignore_commands: bool = kwargs.get("ignore_commands", False)
@@ -358,6 +436,24 @@ class Trigger:
         self._last_modified_at: Optional[int] = kwargs.get("_last_modified_at", None)
         self._last_modified: Optional[str] = kwargs.get("_last_modified", None)
         self.suppress: bool = kwargs.get("suppress", False)
+        self._dirty: bool = True
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Any change to a trigger needs to be saved on the next flush
+        object.__setattr__(self, name, value)
+        if name != "_dirty":
+            object.__setattr__(self, "_dirty", True)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether this trigger has changed since it was last saved."""
+        return self._dirty
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def mark_clean(self):
+        self._dirty = False
 
     def enable(self):
         """Explicitly enable this trigger"""
@@ -426,42 +522,30 @@ class Trigger:
         self._last_modified = _("{attr} set to {value}.").format(attr=attr, value=value)
 
     async def check_cooldown(self, message: discord.Message) -> bool:
-        now = message.created_at.timestamp()
         if self.cooldown:
-            if self.cooldown["style"] in ["guild", "server"]:
-                last = self.cooldown["last"]
-                time = self.cooldown["time"]
-                if (now - last) > time:
-                    self.cooldown["last"] = now
-                    return False
-                else:
-                    return True
-            else:
-                style: str = self.cooldown["style"]
-                snowflake = getattr(message, style)
-                if snowflake.id not in [x["id"] for x in self.cooldown["last"]]:
-                    self.cooldown["last"].append({"id": snowflake.id, "last": now})
-                    return False
-                else:
-                    entity_list = self.cooldown["last"]
-                    for entity in entity_list:
-                        if entity["id"] == snowflake.id:
-                            last = entity["last"]
-                            time = self.cooldown["time"]
-                            if (now - last) > time:
-                                self.cooldown["last"].remove({"id": snowflake.id, "last": last})
-                                self.cooldown["last"].append({"id": snowflake.id, "last": now})
-                                return False
-                            else:
-                                return True
+            if self.cooldown.check(message):
+                return True
+            # the cooldown has just been updated
+            self.mark_dirty()
         return False
 
     async def check_bw_list(
-        self, author: Optional[discord.Member], channel: discord.abc.GuildChannel
+        self,
+        author: Optional[discord.Member],
+        channel: discord.abc.GuildChannel,
+        role_ids: Optional[AbstractSet[int]] = None,
     ) -> bool:
+        """
+        Check whether the author and channel are allowed to use this trigger.
+
+        `role_ids` can be provided to avoid rebuilding the authors
+        role IDs for every trigger checked against the same message.
+        """
         can_run = True
         # author: discord.Member = message.author
         # channel: discord.abc.GuildChannel = message.channel
+        if author is not None and role_ids is None:
+            role_ids = {r.id for r in author.roles if not r.is_default()}
         if self.whitelist:
             can_run = False
             if channel.id in self.whitelist:
@@ -478,11 +562,8 @@ class Trigger:
             if author is not None:
                 if author.id in self.whitelist:
                     can_run = True
-                for role in author.roles:
-                    if role.is_default():
-                        continue
-                    if role.id in self.whitelist:
-                        can_run = True
+                if not role_ids.isdisjoint(self.whitelist):
+                    can_run = True
             return can_run
         else:
             if channel.id in self.blacklist:
@@ -499,11 +580,8 @@ class Trigger:
             if author is not None:
                 if author.id in self.blacklist:
                     can_run = False
-                for role in author.roles:
-                    if role.is_default():
-                        continue
-                    if role.id in self.blacklist:
-                        can_run = False
+                if not role_ids.isdisjoint(self.blacklist):
+                    can_run = False
         return can_run
 
     @property
@@ -557,7 +635,7 @@ class Trigger:
             "text": self.text,
             "whitelist": self.whitelist,
             "blacklist": self.blacklist,
-            "cooldown": self.cooldown,
+            "cooldown": self.cooldown.to_json() if self.cooldown else {},
             "multi_payload": [i.to_json() for i in self.multi_payload],
             "created_at": self._created_at,
             "ignore_commands": self.ignore_commands,
@@ -656,8 +734,9 @@ class Trigger:
                 reactions = []
 
         reactions = [discord.PartialEmoji.from_str(e) for e in reactions]
+        cooldown = Cooldown.from_json(data.pop("cooldown", {}))
 
-        return cls(
+        trigger = cls(
             name,
             regex,
             response_type,
@@ -667,8 +746,11 @@ class Trigger:
             remove_roles=remove_roles,
             reactions=reactions,
             thread=thread,
+            cooldown=cooldown,
             **data,
         )
+        trigger.mark_clean()
+        return trigger
 
 
 class TriggerExists(Converter[Trigger]):
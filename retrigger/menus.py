@@ -202,8 +202,8 @@ class ReTriggerPages(menus.ListPageSource):
                 true_or_false=trigger.include_threads
             )
         if trigger.cooldown:
-            time = trigger.cooldown["time"]
-            style = trigger.cooldown["style"]
+            time = trigger.cooldown.time
+            style = trigger.cooldown.style
             info += _("__Cooldown__: ") + "**{}s per {}**\n".format(time, style)
         if trigger.ocr_search:
             info += _("__OCR__: **Enabled**\n")
@@ -489,6 +489,7 @@ class ReTriggerEditModal(discord.ui.Modal):
                 return
             self.trigger._raw_regex = self.regex.value
             self.trigger.compile()
+            self.og_button.view.cog.rebuild_trigger_index(guild.id)
             # we've already checked if the regex was valid
             any_edits = True
             msg += _("- Regex\n")
@@ -550,6 +551,7 @@ class ReTriggerEditModal(discord.ui.Modal):
                 return
             self.trigger._raw_regex = self.regex.value
             self.trigger.compile()
+            self.og_button.view.cog.rebuild_trigger_index(guild.id)
             # we've already checked if the regex was valid
             edited_regex = True
             changed_values.append("regex")
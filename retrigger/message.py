@@ -4,9 +4,16 @@
 from __future__ import annotations
 
 import re
-from typing import List, Union
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Tuple, Union
 
 import discord
+from red_commons.logging import getLogger
+
+if TYPE_CHECKING:
+    from .abc import ReTriggerMixin
+    from .converters import Trigger
+
+log = getLogger("red.trusty-cogs.ReTrigger")
 
 EVERYONE_REGEX = re.compile(r"@here|@everyone")
 
@@ -66,3 +73,108 @@ class ReTriggerMessage(discord.Message):
         self.retrigger = True
         self.nonce = message.nonce
         self.poll = None
+
+
+class MessageContext:
+    """
+    Information about a message which is shared between every trigger checked against it.
+
+    The different versions of the message content are only built
+    the first time a trigger needs them and reused afterwards.
+    """
+
+    __slots__ = (
+        "cog",
+        "message",
+        "author",
+        "channel",
+        "role_ids",
+        "blocked",
+        "channel_perms",
+        "is_command",
+        "is_mod",
+        "_filenames",
+        "_embeds",
+        "_ocr",
+        "_automod_immune",
+        "_contents",
+    )
+
+    def __init__(self, cog: ReTriggerMixin, message: discord.Message, author: discord.Member):
+        self.cog = cog
+        self.message = message
+        self.author = author
+        self.channel: discord.abc.GuildChannel = message.channel  # type: ignore
+        self.role_ids: FrozenSet[int] = frozenset(r.id for r in author.roles if not r.is_default())
+        self.blocked: bool = False
+        self.channel_perms: discord.Permissions = self.channel.permissions_for(author)
+        self.is_command: bool = False
+        self.is_mod: bool = False
+        self._filenames: Optional[str] = None
+        self._embeds: Optional[str] = None
+        self._ocr: Optional[str] = None
+        self._automod_immune: Optional[bool] = None
+        self._contents: Dict[Tuple[bool, bool, bool], str] = {}
+
+    @classmethod
+    async def from_message(
+        cls, cog: ReTriggerMixin, message: discord.Message, author: discord.Member
+    ) -> MessageContext:
+        ctx = cls(cog, message, author)
+        ctx.blocked = not await cog.bot.allowed_by_whitelist_blacklist(author)
+        ctx.is_command = await cog.check_is_command(message)
+        ctx.is_mod = await cog.is_mod_or_admin(author)
+        return ctx
+
+    @property
+    def filenames(self) -> str:
+        if self._filenames is None:
+            self._filenames = " ".join(f.filename for f in self.message.attachments)
+        return self._filenames
+
+    @property
+    def embeds(self) -> str:
+        if self._embeds is None:
+            self._embeds = "\n".join(
+                self.cog.convert_embed_to_string(embed, index)
+                for index, embed in enumerate(self.message.embeds)
+            )
+        return self._embeds
+
+    async def ocr(self) -> str:
+        if self._ocr is None:
+            try:
+                self._ocr = await self.cog.get_image_text(self.message)
+            except Exception:
+                log.exception(
+                    "Error extracting text from image in channel: %s, message: %s",
+                    self.channel.id,
+                    self.message.id,
+                )
+                self._ocr = ""
+        return self._ocr
+
+    async def is_automod_immune(self) -> bool:
+        if self._automod_immune is None:
+            self._automod_immune = await self.cog.bot.is_automod_immune(self.message)
+        return self._automod_immune
+
+    async def content(self, trigger: Trigger) -> str:
+        """Get the content of the message that a trigger should search."""
+        key = (
+            trigger.read_filenames and bool(self.message.attachments),
+            trigger.ocr_search and self.cog.ALLOW_OCR,
+            trigger.read_embeds and bool(self.message.embeds),
+        )
+        if key in self._contents:
+            return self._contents[key]
+        read_filenames, ocr_search, read_embeds = key
+        content = self.message.content
+        if read_filenames:
+            content += " " + self.filenames
+        if ocr_search:
+            content += await self.ocr()
+        if read_embeds:
+            content += self.embeds
+        self._contents[key] = content
+        return content
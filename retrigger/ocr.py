@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional
+
+import aiohttp
+import discord
+from red_commons.logging import getLogger
+
+try:
+    import pytesseract
+except (ImportError, ValueError):
+    pytesseract = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import regex as re
+except ImportError:
+    import re
+
+log = getLogger("red.trusty-cogs.ReTrigger")
+
+ALLOW_OCR = pytesseract is not None and Image is not None
+
+IMAGE_REGEX: re.Pattern = re.compile(
+    r"(?:(?:https?):\/\/)?[\w\/\-?=%.]+\.(?:png|jpg|jpeg|webp)+", flags=re.I
+)
+
+# Images larger than this are not downloaded for OCR.
+MAX_IMAGE_BYTES = 8 * 1000 * 1000
+# Images are downscaled so their largest side is at most this many pixels.
+MAX_IMAGE_DIMENSION = 2000
+# Seconds tesseract is allowed to run on a single image.
+OCR_TIMEOUT = 5
+
+
+class OCRCache:
+    """
+    Least recently used cache of text found in images.
+
+    The cache is bounded both by number of entries and by the total
+    length of the text stored.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_chars: int = 2 * 1000 * 1000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._chars: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, key: str) -> Optional[str]:
+        text = self._cache.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return text
+
+    def set(self, key: str, text: str) -> None:
+        if key in self._cache:
+            self._chars -= len(self._cache.pop(key))
+        self._cache[key] = text
+        self._chars += len(text)
+        while self._cache and (
+            len(self._cache) > self.max_entries or self._chars > self.max_chars
+        ):
+            _key, old = self._cache.popitem(last=False)
+            self._chars -= len(old)
+
+
+class OCRHandler:
+    """
+    Finds text in images attached or linked in messages.
+
+    Results are cached by the images content hash and by URL for linked
+    images so reposted images are only ever read once. Tesseract runs in
+    a small dedicated thread pool and once `max_queue` images are waiting
+    new images are skipped rather than queued indefinitely.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        max_workers: int = 2,
+        max_queue: int = 16,
+        cache: Optional[OCRCache] = None,
+    ):
+        self.session = session
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.cache = cache or OCRCache()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="retrigger-ocr"
+        )
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._pending: int = 0
+        self._in_progress: Dict[str, asyncio.Future] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of images waiting for a free OCR worker."""
+        return max(self._pending - self.max_workers, 0)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _image_to_string(data: bytes) -> str:
+        with Image.open(BytesIO(data)) as im:
+            im = im.convert("L")
+            if max(im.size) > MAX_IMAGE_DIMENSION:
+                im.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+            try:
+                return pytesseract.image_to_string(im, timeout=OCR_TIMEOUT)
+            except RuntimeError:
+                # pytesseract raises a RuntimeError when the timeout is hit
+                return ""
+
+    async def _run_ocr(self, data: bytes) -> Optional[str]:
+        """
+        Read the text in an image
+
+        Returns `None` if the image was skipped or timed out
+        so that it can be tried again later.
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            log.debug("OCR queue is full, skipping image.")
+            return None
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                task = loop.run_in_executor(
+                    self._executor, functools.partial(self._image_to_string, data)
+                )
+                return await asyncio.wait_for(task, timeout=OCR_TIMEOUT + 5)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending -= 1
+
+    async def _cached_ocr(self, data: bytes, *keys: str) -> str:
+        content_key = "sha:" + hashlib.sha256(data).hexdigest()
+        text = self.cache.get(content_key)
+        if text is None:
+            if content_key in self._in_progress:
+                # the same image is already being read for another message
+                return await asyncio.shield(self._in_progress[content_key])
+            future = asyncio.get_running_loop().create_future()
+            self._in_progress[content_key] = future
+            try:
+                text = await self._run_ocr(data)
+                if text is None:
+                    # skipped or timed out so don't remember it
+                    future.set_result("")
+                    return ""
+                self.cache.set(content_key, text)
+                future.set_result(text)
+            except Exception as e:
+                future.set_exception(e)
+                # make sure the exception is marked as retrieved if nobody was waiting
+                future.exception()
+                raise
+            finally:
+                if not future.done():
+                    # cancelled, let anyone waiting on this image carry on without text
+                    future.set_result("")
+                del self._in_progress[content_key]
+        for key in keys:
+            self.cache.set(key, text)
+        return text
+
+    async def _attachment_text(self, attachment: discord.Attachment) -> str:
+        if attachment.content_type and "image" not in attachment.content_type:
+            return ""
+        if attachment.size > MAX_IMAGE_BYTES:
+            return ""
+        data = await attachment.read()
+        return await self._cached_ocr(data)
+
+    async def _link_text(self, link: str) -> str:
+        url_key = "url:" + link
+        text = self.cache.get(url_key)
+        if text is not None:
+            return text
+        async with self.session.get(link) as resp:
+            if resp.content_length and resp.content_length > MAX_IMAGE_BYTES:
+                return ""
+            buffer = bytearray()
+            async for chunk in resp.content.iter_chunked(64 * 1024):
+                buffer.extend(chunk)
+                if len(buffer) > MAX_IMAGE_BYTES:
+                    return ""
+            data = bytes(buffer)
+        return await self._cached_ocr(data, url_key)
+
+    async def get_image_text(self, message: discord.Message) -> str:
+        """
+        Search every image attachment and image link on the message for text.
+
+        All text found is returned as a single string.
+        """
+        tasks = [self._attachment_text(a) for a in message.attachments]
+        tasks += [self._link_text(link) for link in IMAGE_REGEX.findall(message.content)]
+        if not tasks:
+            return " "
+        results: List[str] = []
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, BaseException):
+                log.debug("Error reading text from an image", exc_info=result)
+                continue
+            results.append(result)
+        return " " + "".join(results)
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from red_commons.logging import getLogger
+
+from . import regexworker
+
+log = getLogger("red.trusty-cogs.ReTrigger")
+
+WORKER_PATH = Path(__file__).parent / "regexworker.py"
+# Running the worker through runpy keeps this cogs folder off of the workers
+# sys.path so that files like `abc.py` can't shadow the standard library.
+WORKER_BOOTSTRAP = "import runpy, sys; runpy.run_path(sys.argv[1], run_name='__main__')"
+# Extra time on top of the regex timeout before a worker is considered stuck.
+HARD_TIMEOUT_GRACE = 1.0
+
+
+class RegexWorker:
+    """
+    A single regex worker process communicating over pipes.
+    """
+
+    def __init__(self):
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._request_id: int = 0
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            WORKER_BOOTSTRAP,
+            str(WORKER_PATH),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+
+    async def stop(self, *, kill: bool = False) -> None:
+        if self.process is None:
+            return
+        process = self.process
+        self.process = None
+        if process.returncode is not None:
+            return
+        if not kill:
+            try:
+                process.stdin.close()
+                await asyncio.wait_for(process.wait(), timeout=5)
+                return
+            except Exception:
+                pass
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+    async def restart(self) -> None:
+        await self.stop(kill=True)
+        await self.start()
+
+    async def _read_frame(self) -> Any:
+        header = await self.process.stdout.readexactly(4)
+        payload = await self.process.stdout.readexactly(int.from_bytes(header, "big"))
+        return pickle.loads(payload)
+
+    async def search(
+        self,
+        guild_id: int,
+        jobs: List[regexworker.SearchJob],
+        contents: List[str],
+        timeout: float,
+        start: int,
+        results: List[Optional[regexworker.SearchResult]],
+    ) -> Tuple[int, bool]:
+        """
+        Search `jobs` from `start` onwards filling in `results` as they arrive.
+
+        Returns the index of the next job which still needs to be searched
+        and whether the worker was restarted.
+        If a single job takes too long or the worker dies that job is marked
+        as failed and the worker is restarted.
+        """
+        if not self.is_alive:
+            await self.start()
+        self._request_id += 1
+        request_id = self._request_id
+        payload = pickle.dumps((request_id, guild_id, jobs[start:], contents, timeout))
+        try:
+            self.process.stdin.write(len(payload).to_bytes(4, "big") + payload)
+            await self.process.stdin.drain()
+        except (ConnectionError, RuntimeError) as e:
+            results[start] = (regexworker.ERROR, f"{type(e).__name__}: {e}")
+            await self.restart()
+            return start + 1, True
+        for index in range(start, len(jobs)):
+            try:
+                frame = await asyncio.wait_for(
+                    self._read_frame(), timeout=timeout + HARD_TIMEOUT_GRACE
+                )
+            except asyncio.TimeoutError:
+                log.debug("Regex worker timed out on job %s, restarting it.", jobs[index][0])
+                results[index] = (regexworker.TIMEOUT, None)
+                await self.restart()
+                return index + 1, True
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                log.error("Regex worker died on job %s, restarting it.", jobs[index][0])
+                results[index] = (regexworker.ERROR, f"{type(e).__name__}: {e}")
+                await self.restart()
+                return index + 1, True
+            frame_request_id, frame_index, status, result = frame
+            if frame_request_id != request_id or frame_index != index - start:
+                log.error("Regex worker returned an unexpected result, restarting it.")
+                results[index] = (regexworker.ERROR, "Unexpected result from worker")
+                await self.restart()
+                return index + 1, True
+            results[index] = (status, result)
+        return len(jobs), False
+
+
+class RegexPool:
+    """
+    An asyncio native pool of regex worker processes.
+
+    Workers are started as they're needed up to `max_workers` and searches
+    are awaited directly on the workers pipes so no executor threads are
+    blocked while a search is running.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers: int = max_workers or os.cpu_count() or 1
+        self._workers: List[RegexWorker] = []
+        self._idle: asyncio.Queue[RegexWorker] = asyncio.Queue()
+        self._waiting: int = 0
+        self._closed: bool = False
+        self.restarts: int = 0
+
+    @property
+    def worker_count(self) -> int:
+        """The number of worker processes that have been started."""
+        return len(self._workers)
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of searches currently waiting for a free worker."""
+        return self._waiting
+
+    @property
+    def busy_workers(self) -> int:
+        return len(self._workers) - self._idle.qsize()
+
+    async def _acquire(self) -> RegexWorker:
+        if self._closed:
+            raise ValueError("Regex pool is closed.")
+        if self._idle.empty() and len(self._workers) < self.max_workers:
+            worker = RegexWorker()
+            self._workers.append(worker)
+            try:
+                await worker.start()
+            except Exception:
+                self._workers.remove(worker)
+                raise
+            return worker
+        self._waiting += 1
+        try:
+            return await self._idle.get()
+        finally:
+            self._waiting -= 1
+
+    def _release(self, worker: RegexWorker) -> None:
+        if self._closed:
+            return
+        self._idle.put_nowait(worker)
+
+    async def search(
+        self,
+        guild_id: int,
+        jobs: List[regexworker.SearchJob],
+        contents: List[str],
+        timeout: float,
+    ) -> List[regexworker.SearchResult]:
+        """
+        Search every job returning a result for each one in order.
+        """
+        results: List[Optional[regexworker.SearchResult]] = [None] * len(jobs)
+        start = 0
+        while start < len(jobs):
+            worker = await self._acquire()
+            try:
+                start, restarted = await worker.search(
+                    guild_id, jobs, contents, timeout, start, results
+                )
+            finally:
+                self._release(worker)
+            if restarted:
+                self.restarts += 1
+        return results  # type: ignore
+
+    async def close(self) -> None:
+        self._closed = True
+        workers = self._workers
+        self._workers = []
+        await asyncio.gather(*(w.stop() for w in workers), return_exceptions=True)
@@ -0,0 +1,131 @@
+"""
+ReTrigger's regex worker process.
+
+This module is run as a standalone script by `RegexPool` and intentionally
+has no imports from the rest of the cog. Requests and results are passed
+over stdin and stdout as length prefixed pickles.
+"""
+
+import pickle
+import signal
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Pattern, Tuple
+
+try:
+    import regex as re
+
+    HAS_REGEX = True
+except ImportError:
+    import re
+
+    HAS_REGEX = False
+
+# Maximum number of compiled patterns kept per worker process.
+MAX_CACHED_PATTERNS = 4096
+
+# (guild_id, trigger_name) -> (raw_pattern, compiled_pattern)
+_PATTERN_CACHE: "OrderedDict[Tuple[int, str], Tuple[str, Pattern]]" = OrderedDict()
+
+# A single search job: trigger name, raw regex pattern, index into the contents list.
+SearchJob = Tuple[str, str, int]
+# A single search result: status, findall result or error message.
+SearchResult = Tuple[str, Any]
+
+OK = "ok"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+def get_pattern(guild_id: int, name: str, raw_pattern: str) -> Pattern:
+    """
+    Get a compiled pattern from this workers cache.
+
+    The pattern is recompiled whenever the raw pattern for a trigger
+    no longer matches what was previously compiled, i.e. it was edited.
+    """
+    key = (guild_id, name)
+    cached = _PATTERN_CACHE.get(key)
+    if cached is not None and cached[0] == raw_pattern:
+        _PATTERN_CACHE.move_to_end(key)
+        return cached[1]
+    compiled = re.compile(raw_pattern)
+    _PATTERN_CACHE[key] = (raw_pattern, compiled)
+    _PATTERN_CACHE.move_to_end(key)
+    while len(_PATTERN_CACHE) > MAX_CACHED_PATTERNS:
+        _PATTERN_CACHE.popitem(last=False)
+    return compiled
+
+
+def findall(pattern: Pattern, content: str, timeout: Optional[float]) -> List[Any]:
+    if HAS_REGEX and timeout:
+        try:
+            return pattern.findall(content, timeout=timeout)
+        except TypeError:
+            # older versions of regex don't support a timeout
+            pass
+    return pattern.findall(content)
+
+
+def search(
+    guild_id: int, job: SearchJob, contents: List[str], timeout: Optional[float]
+) -> SearchResult:
+    """
+    Run a single search job.
+
+    When the regex module is available each pattern is given its own timeout
+    inside the worker, otherwise patterns that finish but take longer than
+    the timeout are still reported as having timed out.
+    """
+    name, raw_pattern, content_index = job
+    start = time.monotonic()
+    try:
+        pattern = get_pattern(guild_id, name, raw_pattern)
+        found = findall(pattern, contents[content_index], timeout)
+    except TimeoutError:
+        return (TIMEOUT, None)
+    except Exception as e:
+        return (ERROR, f"{type(e).__name__}: {e}")
+    if timeout and time.monotonic() - start > timeout:
+        return (TIMEOUT, None)
+    return (OK, found)
+
+
+def write_frame(stream, data: Any) -> None:
+    payload = pickle.dumps(data)
+    stream.write(len(payload).to_bytes(4, "big") + payload)
+    stream.flush()
+
+
+def read_frame(stream) -> Optional[Any]:
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    size = int.from_bytes(header, "big")
+    return pickle.loads(stream.read(size))
+
+
+def main() -> None:
+    """
+    Read batches from stdin and write one result per job to stdout as soon
+    as it is finished so the parent can time out individual patterns.
+
+    The worker exits when stdin is closed.
+    """
+    # Leave handling Ctrl+C to the bot, we exit when the bot closes our stdin.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    while True:
+        request = read_frame(stdin)
+        if request is None:
+            return
+        request_id, guild_id, jobs, contents, timeout = request
+        for index, job in enumerate(jobs):
+            status, result = search(guild_id, job, contents, timeout)
+            write_frame(stdout, (request_id, index, status, result))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
-import asyncio
 from abc import ABC
-from multiprocessing.pool import Pool
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
+import aiohttp
 import discord
 from discord.ext import tasks
 from red_commons.logging import getLogger
@@ -16,6 +15,7 @@ from redbot.core.utils.chat_formatting import humanize_list, pagify
 
 from .converters import (
     ChannelUserRole,
+    Cooldown,
     MentionStyle,
     MultiFlags,
     Trigger,
@@ -32,8 +32,11 @@ from .menus import (
     ReTriggerMenu,
     ReTriggerPages,
 )
+from .ocr import ALLOW_OCR, OCRHandler
+from .regexpool import RegexPool
 from .slash import ReTriggerSlash
-from .triggerhandler import ALLOW_OCR, ALLOW_RESIZE, TriggerHandler
+from .triggerhandler import ALLOW_RESIZE, TriggerHandler
+from .triggerindex import TriggerIndex
 
 log = getLogger("red.trusty-cogs.ReTrigger")
 _ = Translator("ReTrigger", __file__)
@@ -113,8 +116,11 @@ class ReTrigger(
             bypass=False,
         )
         self.config.register_global(trigger_timeout=1, enable_slash=False)
-        self.re_pool = Pool()
+        self.re_pool = RegexPool()
+        self.session = aiohttp.ClientSession()
+        self.ocr = OCRHandler(self.session)
         self.triggers: Dict[int, Dict[str, Trigger]] = {}
+        self.trigger_index: Dict[int, TriggerIndex] = {}
         self.trigger_timeout = 1
         self.save_loop.start()
         self.ALLOW_OCR = ALLOW_OCR
@@ -144,33 +150,38 @@ class ReTrigger(
             except Exception:
                 log.exception("Error removing retrigger from dev environment.")
         log.debug("Closing process pools.")
-        self.re_pool.close()
-        loop = asyncio.get_running_loop()
-        loop.run_in_executor(None, self.re_pool.join)
+        await self.re_pool.close()
+        self.ocr.close()
+        await self.session.close()
         self.save_loop.cancel()
+        await self.save_all_triggers()
 
     async def save_all_triggers(self):
+        """
+        Save every trigger that has changed since the last time it was saved.
+
+        Only changed triggers are serialized and each one is written
+        individually rather than rewriting every trigger in the guild.
+        """
         for guild_id, triggers in self.triggers.items():
             guild = self.bot.get_guild(guild_id)
             if not guild:
                 continue
-            async with self.config.guild(guild).trigger_list() as trigger_list:
-                for trigger in triggers.values():
-                    try:
-                        trigger_list[trigger.name] = await trigger.to_json()
-                    except KeyError:
-                        continue
-                    await asyncio.sleep(0.1)
+            trigger_list = self.config.guild(guild).trigger_list
+            for trigger in [t for t in triggers.values() if t.dirty]:
+                data = await trigger.to_json()
+                # mark clean before writing so changes made while we wait are kept
+                trigger.mark_clean()
+                try:
+                    await trigger_list.set_raw(trigger.name, value=data)
+                except Exception:
+                    log.exception("Error saving trigger %r in guild %s", trigger, guild_id)
+                    trigger.mark_dirty()
 
     @tasks.loop(seconds=120)
     async def save_loop(self):
         await self.save_all_triggers()
 
-    @save_loop.after_loop
-    async def after_save_loop(self):
-        if self.save_loop.is_being_cancelled():
-            await self.save_all_triggers()
-
     @save_loop.before_loop
     async def before_save_loop(self):
         await self.bot.wait_until_red_ready()
@@ -194,6 +205,7 @@ class ReTrigger(
                     # I might move this to DM the author of the trigger
                     # before this becomes actually breaking
                 self.triggers[guild][new_trigger.name] = new_trigger
+            self.rebuild_trigger_index(guild)
         await self._get_commit()
 
     async def _get_commit(self):
@@ -525,12 +537,9 @@ class ReTrigger(
         msg = _("Cooldown of {time}s per {style} set for Trigger `{name}`.")
         if style in ["user", "member"]:
             style = "author"
-        if style in ["guild", "server"]:
-            cooldown = {"time": time, "style": style, "last": 0}
-        else:
-            cooldown = {"time": time, "style": style, "last": []}
+        cooldown = Cooldown(time, style)
         if time <= 0:
-            cooldown = {}
+            cooldown = None
             msg = _("Cooldown for Trigger `{name}` reset.")
         # trigger.modify("cooldown", cooldown, ctx.author, ctx.message.id)
         trigger.cooldown = cooldown
@@ -734,6 +743,7 @@ class ReTrigger(
         trigger._last_modified = _("Regex")
         # provide a nicer name for what changed here instead of `_raw_regex`
         trigger.compile()
+        self.rebuild_trigger_index(ctx.guild.id)
         async with self.config.guild(ctx.guild).trigger_list() as trigger_list:
             trigger_list[trigger.name] = await trigger.to_json()
         # await self.remove_trigger_from_cache(ctx.guild.id, trigger)
@@ -1508,6 +1518,39 @@ class ReTrigger(
             await self.config.guild(ctx.guild).bypass.set(bypass)
             await ctx.send(_("Safe Regex search re-enabled."))
 
+    @retrigger.command(name="settings")
+    @checks.mod_or_permissions(manage_messages=True)
+    @wrapped_additional_help()
+    async def retrigger_settings(self, ctx: commands.Context) -> None:
+        """
+        Show ReTrigger's settings for this server and the state of the regex workers.
+        """
+        bypass = await self.config.guild(ctx.guild).bypass()
+        msg = _("__**Regex Timeout**__: {timeout} seconds\n").format(timeout=self.trigger_timeout)
+        msg += _("__**Safe Regex Bypassed**__: {bypass}\n").format(bypass=bypass)
+        msg += _("__**Has Regex installed**__: {has_regex}\n").format(has_regex=HAS_REGEX)
+        msg += _("__**OCR Available**__: {ocr}\n").format(ocr=self.ALLOW_OCR)
+        if self.ALLOW_OCR:
+            msg += _(
+                "__**OCR Cache**__: {size} images ({hits} hits, {misses} misses)\n"
+                "__**OCR Queue Depth**__: {depth}\n"
+            ).format(
+                size=len(self.ocr.cache),
+                hits=self.ocr.cache.hits,
+                misses=self.ocr.cache.misses,
+                depth=self.ocr.queue_depth,
+            )
+        msg += _("__**Regex Workers**__: {workers}/{max_workers} ({busy} busy)\n").format(
+            workers=self.re_pool.worker_count,
+            max_workers=self.re_pool.max_workers,
+            busy=self.re_pool.busy_workers,
+        )
+        msg += _("__**Regex Queue Depth**__: {depth}\n").format(depth=self.re_pool.queue_depth)
+        msg += _("__**Regex Worker Restarts**__: {restarts}\n").format(
+            restarts=self.re_pool.restarts
+        )
+        await ctx.maybe_send_embed(msg)
+
     @retrigger.command(usage="[trigger]")
     @commands.bot_has_permissions(read_message_history=True, add_reactions=True)
     @wrapped_additional_help()
@@ -1647,9 +1690,7 @@ class ReTrigger(
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
             delete_after=delete_after_seconds,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1680,9 +1721,7 @@ class ReTrigger(
             text=text,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1710,9 +1749,7 @@ class ReTrigger(
             text=text,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1742,9 +1779,7 @@ class ReTrigger(
             text=text,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1775,9 +1810,7 @@ class ReTrigger(
             text=text,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1827,9 +1860,7 @@ class ReTrigger(
             image=filename,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1859,9 +1890,7 @@ class ReTrigger(
             image=filename,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1916,9 +1945,7 @@ class ReTrigger(
             text=text,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1971,9 +1998,7 @@ class ReTrigger(
             image=filename,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2003,9 +2028,7 @@ class ReTrigger(
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
             check_edits=True,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2035,9 +2058,7 @@ class ReTrigger(
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
             check_edits=True,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2072,9 +2093,7 @@ class ReTrigger(
             reactions=list(emojis),
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2101,9 +2120,7 @@ class ReTrigger(
             author,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2138,9 +2155,7 @@ class ReTrigger(
             text=command,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2190,9 +2205,7 @@ class ReTrigger(
             text=command,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2228,9 +2241,7 @@ class ReTrigger(
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
             check_edits=True,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2275,9 +2286,7 @@ class ReTrigger(
             add_roles=role_ids,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2322,9 +2331,7 @@ class ReTrigger(
             remove_roles=role_ids,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -2409,9 +2416,7 @@ class ReTrigger(
             reactions=reactions,
             created_at=ctx.message.id if isinstance(ctx, commands.Context) else ctx.id,
         )
-        if ctx.guild.id not in self.triggers:
-            self.triggers[ctx.guild.id] = {}
-        self.triggers[ctx.guild.id][new_trigger.name] = new_trigger
+        await self.add_trigger_to_cache(ctx.guild.id, new_trigger)
         async with self.config.guild(guild).trigger_list() as trigger_list:
             trigger_list[name] = await new_trigger.to_json()
         await self._trigger_set(ctx, name)
@@ -1,15 +1,13 @@
 import asyncio
 import functools
-import multiprocessing as mp
 import os
 import random
 import string
 from copy import copy
 from datetime import datetime, timezone
 from io import BytesIO
-from typing import Any, Dict, List, Literal, Optional, Tuple, Union, cast
+from typing import Any, Dict, List, Literal, Optional, Set, Tuple, Union, cast
 
-import aiohttp
 import discord
 from red_commons.logging import getLogger
 from redbot.core import commands, modlog
@@ -17,16 +15,11 @@ from redbot.core.data_manager import cog_data_path
 from redbot.core.i18n import Translator
 from redbot.core.utils.chat_formatting import escape, humanize_list
 
+from . import regexworker
 from .abc import ReTriggerMixin
 from .converters import Trigger, TriggerResponse
-from .message import ReTriggerMessage
-
-try:
-    import pytesseract
-
-    ALLOW_OCR = True
-except (ImportError, ValueError):
-    ALLOW_OCR = False
+from .message import MessageContext, ReTriggerMessage
+from .triggerindex import TriggerIndex
 
 try:
     from PIL import Image, ImageSequence
@@ -34,7 +27,6 @@ try:
     ALLOW_RESIZE = True
 except ImportError:
     ALLOW_RESIZE = False
-    ALLOW_OCR = False
 
 
 try:
@@ -51,9 +43,6 @@ RE_POS: re.Pattern = re.compile(r"{((\d+)[^.}]*(\.[^:}]+)?[^}]*)\}")
 LINK_REGEX: re.Pattern = re.compile(
     r"(http[s]?:\/\/[^\"\']*\.(?:png|jpg|jpeg|gif|mp3|mp4|webp)).*", flags=re.I
 )
-IMAGE_REGEX: re.Pattern = re.compile(
-    r"(?:(?:https?):\/\/)?[\w\/\-?=%.]+\.(?:png|jpg|jpeg|webp)+", flags=re.I
-)
 
 
 class TriggerHandler(ReTriggerMixin):
@@ -67,6 +56,29 @@ class TriggerHandler(ReTriggerMixin):
         except KeyError:
             # it will get removed on the next reload of the cog
             log.info("Trigger can't be removed :blobthinking:")
+        self.rebuild_trigger_index(guild_id)
+
+    async def add_trigger_to_cache(self, guild_id: int, trigger: Trigger) -> None:
+        if guild_id not in self.triggers:
+            self.triggers[guild_id] = {}
+        self.triggers[guild_id][trigger.name] = trigger
+        self.rebuild_trigger_index(guild_id)
+
+    def rebuild_trigger_index(self, guild_id: int) -> TriggerIndex:
+        """
+        Rebuild the literal prefilter for a guild.
+
+        This needs to be called any time a trigger is added, removed,
+        or has its regex pattern changed.
+        """
+        index = TriggerIndex(self.triggers.get(guild_id, {}).values())
+        self.trigger_index[guild_id] = index
+        return index
+
+    def get_trigger_index(self, guild_id: int) -> TriggerIndex:
+        if guild_id not in self.trigger_index:
+            return self.rebuild_trigger_index(guild_id)
+        return self.trigger_index[guild_id]
 
     async def can_edit(self, author: discord.Member, trigger: Trigger) -> bool:
         """Chekcs to see if the member is allowed to edit the trigger"""
@@ -129,11 +141,10 @@ class TriggerHandler(ReTriggerMixin):
         directory = cog_data_path(self).joinpath(str(guild.id))
         file_path = cog_data_path(self).joinpath(str(guild.id), str(filename))
         await self.make_guild_folder(directory)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(good_image_url.group(0)) as resp:
-                test = await resp.read()
-                with open(file_path, "wb") as f:
-                    f.write(test)
+        async with self.session.get(good_image_url.group(0)) as resp:
+            test = await resp.read()
+            with open(file_path, "wb") as f:
+                f.write(test)
         return filename
 
     async def wait_for_image(self, ctx: commands.Context) -> Optional[discord.Message]:
@@ -395,6 +406,10 @@ class TriggerHandler(ReTriggerMixin):
         search. This does all the permission checks and cooldown checks
         before actually running the regex to avoid possibly long regex
         operations.
+
+        Triggers whose required literals are not present in the content
+        are skipped and all remaining candidates are searched in a single
+        batch.
         """
         guild: discord.Guild = cast(discord.Guild, message.guild)
         if guild.id not in self.triggers:
@@ -403,10 +418,14 @@ class TriggerHandler(ReTriggerMixin):
         author: Optional[discord.Member] = guild.get_member(message.author.id)
         if not author:
             return
-        blocked = not await self.bot.allowed_by_whitelist_blacklist(author)
-        channel_perms = channel.permissions_for(author)
-        is_command = await self.check_is_command(message)
-        is_mod = await self.is_mod_or_admin(author)
+        context = await MessageContext.from_message(self, message, author)
+        channel_perms = context.channel_perms
+        is_mod = context.is_mod
+        index = self.get_trigger_index(guild.id)
+        # Map of content to the trigger names which could match it so that
+        # triggers searching the same content share a single prefilter pass.
+        candidates: Dict[str, Set[str]] = {}
+        searches: List[Tuple[Trigger, str]] = []
         for trigger in self.triggers[guild.id].values():
             if not trigger.enabled:
                 continue
@@ -418,7 +437,9 @@ class TriggerHandler(ReTriggerMixin):
             if trigger.nsfw and not channel.is_nsfw():
                 continue
 
-            allowed_trigger = await trigger.check_bw_list(author=author, channel=channel)
+            allowed_trigger = await trigger.check_bw_list(
+                author=author, channel=channel, role_ids=context.role_ids
+            )
             is_auto_mod = any(r.is_automod for r in trigger.response_type)
             if not allowed_trigger:
                 log.debug("ReTrigger: %r is immune from allowlist/blocklist %r", author, trigger)
@@ -427,14 +448,14 @@ class TriggerHandler(ReTriggerMixin):
                 log.debug("ReTrigger: %r is immune from automated actions %r", author, trigger)
                 continue
             # log.debug(f"Checking trigger {trigger.name}")
-            if is_command and not trigger.ignore_commands:
+            if context.is_command and not trigger.ignore_commands:
                 log.debug(
                     "ReTrigger: %r is ignored because they used a command %r", author, trigger
                 )
                 continue
 
-            if any(r.is_automod for r in trigger.response_type):
-                if await self.bot.is_automod_immune(message):
+            if is_auto_mod:
+                if await context.is_automod_immune():
                     log.debug("ReTrigger: %r is immune from automated actions %r", author, trigger)
                     continue
             if TriggerResponse.delete in trigger.response_type:
@@ -469,7 +490,7 @@ class TriggerHandler(ReTriggerMixin):
                         trigger,
                     )
             else:
-                if blocked:
+                if context.blocked:
                     log.debug(
                         "ReTrigger: Channel is ignored or %r is blacklisted %r",
                         author,
@@ -477,27 +498,6 @@ class TriggerHandler(ReTriggerMixin):
                     )
                     continue
 
-            content = ""
-            content += message.content
-            if trigger.read_filenames and message.attachments:
-                content += " " + " ".join(f.filename for f in message.attachments)
-
-            if trigger.ocr_search and ALLOW_OCR:
-                try:
-                    content += await self.get_image_text(message)
-                except Exception:
-                    log.exception(
-                        "Error extracting text from image on trigger: %s, in channel: %s, message: %s",
-                        trigger,
-                        channel.id,
-                        message.id,
-                    )
-                    pass
-            if trigger.read_embeds and len(message.embeds) > 0:
-                content += "\n".join(
-                    self.convert_embed_to_string(embed, index)
-                    for index, embed in enumerate(message.embeds)
-                )
             if trigger.regex is None:
                 log.debug(
                     "ReTrigger: Trigger %r must have invalid regex.",
@@ -505,11 +505,21 @@ class TriggerHandler(ReTriggerMixin):
                 )
                 trigger.disable()
                 continue
+            content = await context.content(trigger)
             # log.debug("content = %s message.content = %s", content, message.content)
-            search = await self.safe_regex_search(guild, trigger, content)
+            if content not in candidates:
+                candidates[content] = index.candidates(content)
+            if trigger.name not in candidates[content]:
+                continue
+            searches.append((trigger, content))
+
+        if not searches:
+            return
+        results = await self.safe_regex_search_batch(guild, searches)
+        for (trigger, _content), search in zip(searches, results):
             if not search[0]:
                 trigger.enabled = False
-                return
+                continue
             elif search[0] and search[1] != []:
                 if await trigger.check_cooldown(message):
                     continue
@@ -552,36 +562,10 @@ class TriggerHandler(ReTriggerMixin):
         image links and all attachments on the message
         then runs them through pytesseract. All contents
         from pytesseract are returned as a string.
+
+        See `OCRHandler` for how results are cached and queued.
         """
-        content = " "
-        for attachment in message.attachments:
-            if attachment.content_type and "image" not in attachment.content_type:
-                continue
-            temp = BytesIO()
-            await attachment.save(temp)
-            task = functools.partial(pytesseract.image_to_string, Image.open(temp))
-            loop = asyncio.get_running_loop()
-            new_task = loop.run_in_executor(None, task)
-            try:
-                content += await asyncio.wait_for(new_task, timeout=5)
-            except asyncio.TimeoutError:
-                pass
-        good_image_url = IMAGE_REGEX.findall(message.content)
-        for link in good_image_url:
-            temp = BytesIO()
-            async with aiohttp.ClientSession() as session:
-                async with session.get(link) as resp:
-                    data = await resp.read()
-                    temp.write(data)
-                    temp.seek(0)
-            task = functools.partial(pytesseract.image_to_string, Image.open(temp))
-            loop = asyncio.get_running_loop()
-            new_task = loop.run_in_executor(None, task)
-            try:
-                content += await asyncio.wait_for(new_task, timeout=5)
-            except asyncio.TimeoutError:
-                pass
-        return content
+        return await self.ocr.get_image_text(message)
 
     async def safe_regex_search(
         self, guild: discord.Guild, trigger: Trigger, content: str
@@ -589,65 +573,89 @@ class TriggerHandler(ReTriggerMixin):
         """
         Mostly safe regex search to prevent reDOS from user defined regex patterns
 
-        This works by running the regex pattern inside a process pool defined at the
-        cog level and then checking that process in the default executor to keep
-        things asynchronous. If the process takes too long to complete we log a
-        warning and remove the trigger from trying to run again.
+        This is a batch search of a single trigger see `safe_regex_search_batch`.
+        """
+        results = await self.safe_regex_search_batch(guild, [(trigger, content)])
+        return results[0]
+
+    def _log_regex_timeout(self, guild: discord.Guild, trigger: Trigger) -> None:
+        error_msg = (
+            "ReTrigger: regex process took too long. Removing from memory "
+            "%s (%s) Author %s "
+            "Offending regex `%s` Name: %s"
+        )
+        log.warning(
+            error_msg,
+            guild.name,
+            guild.id,
+            trigger.author,
+            trigger._raw_regex,
+            trigger.name,
+        )
+
+    async def _run_regex_batch(
+        self, guild: discord.Guild, searches: List[Tuple[Trigger, str]]
+    ) -> List[regexworker.SearchResult]:
+        contents: List[str] = []
+        content_index: Dict[str, int] = {}
+        jobs: List[regexworker.SearchJob] = []
+        for trigger, content in searches:
+            if content not in content_index:
+                content_index[content] = len(contents)
+                contents.append(content)
+            jobs.append((trigger.name, trigger._raw_regex, content_index[content]))
+        return await self.re_pool.search(guild.id, jobs, contents, self.trigger_timeout)
+
+    async def safe_regex_search_batch(
+        self, guild: discord.Guild, searches: List[Tuple[Trigger, str]]
+    ) -> List[Tuple[bool, list]]:
+        """
+        Mostly safe regex search to prevent reDOS from user defined regex patterns
+
+        All the searches are sent to a worker in the cogs regex pool in a
+        single call. The worker keeps the compiled patterns cached and results
+        are returned one pattern at a time. If any single pattern takes too long
+        the worker is restarted, we log a warning and remove only that trigger
+        from trying to run again.
         """
+        if not searches:
+            return []
         if await self.config.guild(guild).bypass():
             # log.debug(f"Bypassing safe regex in guild {guild.name} ({guild.id})")
-            return (True, trigger.regex.findall(content))
+            return [(True, trigger.regex.findall(content)) for trigger, content in searches]
         try:
-            process = self.re_pool.apply_async(trigger.regex.findall, (content,))
-            task = functools.partial(process.get, timeout=self.trigger_timeout)
-            loop = asyncio.get_running_loop()
-            new_task = loop.run_in_executor(None, task)
-            search = await asyncio.wait_for(new_task, timeout=self.trigger_timeout + 5)
-        except mp.TimeoutError:
-            error_msg = (
-                "ReTrigger: regex process took too long. Removing from memory "
-                "%s (%s) Author %s "
-                "Offending regex `%s` Name: %s"
-            )
-            log.warning(
-                error_msg,
-                guild.name,
-                guild.id,
-                trigger.author,
-                trigger.regex.pattern,
-                trigger.name,
-            )
-            return (False, [])
-            # we certainly don't want to be performing multiple triggers if this happens
-        except asyncio.TimeoutError:
-            error_msg = (
-                "ReTrigger: regex asyncio timed out."
-                "%s (%s) Author %s "
-                "Offending regex `%s` Name: %s"
-            )
-            log.warning(
-                error_msg,
-                guild.name,
-                guild.id,
-                trigger.author,
-                trigger.regex.pattern,
-                trigger.name,
-            )
-            return (False, [])
+            results = await self._run_regex_batch(guild, searches)
         except ValueError:
-            return (False, [])
+            return [(False, []) for _s in searches]
         except Exception:
             log.error(
-                "ReTrigger encountered an error %s %s in %s %s",
-                trigger.name,
-                trigger.regex,
+                "ReTrigger encountered an error searching %s triggers in %s %s",
+                len(searches),
                 guild.name,
                 guild.id,
                 exc_info=True,
             )
-            return (True, [])
-        else:
-            return (True, search)
+            return [(True, []) for _s in searches]
+
+        ret: List[Tuple[bool, list]] = []
+        for (trigger, _content), (status, result) in zip(searches, results):
+            if status == regexworker.OK:
+                ret.append((True, result))
+            elif status == regexworker.TIMEOUT:
+                # we certainly don't want to be performing multiple triggers if this happens
+                self._log_regex_timeout(guild, trigger)
+                ret.append((False, []))
+            else:
+                log.error(
+                    "ReTrigger encountered an error %s %s in %s %s: %s",
+                    trigger.name,
+                    trigger._raw_regex,
+                    guild.name,
+                    guild.id,
+                    result,
+                )
+                ret.append((True, []))
+        return ret
 
     async def perform_trigger(
         self, message: discord.Message, trigger: Trigger, find: List[str]
@@ -1283,5 +1291,6 @@ class TriggerHandler(ReTriggerMixin):
                                 )
                     del trigger_list[triggers]
                     del self.triggers[guild_id][trigger_name]
+                    self.rebuild_trigger_index(guild_id)
                     return True
         return False
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import warnings
+from collections import deque
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from red_commons.logging import getLogger
+
+try:
+    from re import _constants as sre_constants  # type: ignore
+    from re import _parser as sre_parse  # type: ignore
+except ImportError:
+    import sre_constants  # type: ignore
+    import sre_parse  # type: ignore
+
+try:
+    import regex as re
+except ImportError:
+    import re
+
+if TYPE_CHECKING:
+    from .converters import Trigger
+
+log = getLogger("red.trusty-cogs.ReTrigger")
+
+# `str.casefold` is a per character mapping so a literal found in a pattern
+# will always be found in the casefolded content. The only case-insensitive
+# equivalence the regex engine has that casefold doesn't is the dotless i.
+_NORMALIZE_TABLE = str.maketrans({"\N{LATIN SMALL LETTER DOTLESS I}": "i"})
+
+# Syntax that the `regex` module understands but the standard library parser
+# will happily read as literal characters. Fuzzy matching `(?:foo){e<=1}` and
+# POSIX or nested character classes `[[:alpha:]]` would otherwise produce
+# literals that are not actually required for a match.
+_UNSAFE_SYNTAX = re.compile(r"\{(?!(?:\d+,?\d*|,\d+)\})|\[\[|\[:")
+
+_LITERAL = sre_constants.LITERAL
+_SUBPATTERN = sre_constants.SUBPATTERN
+_BRANCH = sre_constants.BRANCH
+_ATOMIC_GROUP = getattr(sre_constants, "ATOMIC_GROUP", None)
+_REPEATS = tuple(
+    op
+    for op in (
+        sre_constants.MAX_REPEAT,
+        sre_constants.MIN_REPEAT,
+        getattr(sre_constants, "POSSESSIVE_REPEAT", None),
+    )
+    if op is not None
+)
+
+
+def normalize(content: str) -> str:
+    """Normalize text so that literal lookups are case-insensitive."""
+    return content.casefold().translate(_NORMALIZE_TABLE)
+
+
+def _better(current: Optional[FrozenSet[str]], new: Optional[FrozenSet[str]]) -> bool:
+    """Prefer the set of literals whose shortest member is longest, then the smallest set."""
+    if new is None:
+        return False
+    if current is None:
+        return True
+    current_len = min(len(i) for i in current)
+    new_len = min(len(i) for i in new)
+    if new_len != current_len:
+        return new_len > current_len
+    return len(new) < len(current)
+
+
+def _required_literals(pattern: sre_parse.SubPattern) -> Optional[FrozenSet[str]]:
+    """
+    Walk a parsed pattern and find a set of literals where at least one
+    must be present in the content for the pattern to match anything.
+
+    Returns `None` when no such set can be determined.
+    """
+    best: Optional[FrozenSet[str]] = None
+    run: List[str] = []
+
+    def end_run():
+        nonlocal best
+        if run:
+            literal = frozenset([normalize("".join(run))])
+            if _better(best, literal):
+                best = literal
+            run.clear()
+
+    for op, av in pattern:
+        if op is _LITERAL:
+            run.append(chr(av))
+            continue
+        end_run()
+        found: Optional[FrozenSet[str]] = None
+        if op is _SUBPATTERN:
+            found = _required_literals(av[-1])
+        elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+            found = _required_literals(av)
+        elif op in _REPEATS:
+            min_repeat, _max_repeat, item = av
+            if min_repeat >= 1:
+                found = _required_literals(item)
+        elif op is _BRANCH:
+            branches: Set[str] = set()
+            for branch in av[1]:
+                required = _required_literals(branch)
+                if required is None:
+                    branches = set()
+                    break
+                branches.update(required)
+            if branches:
+                found = frozenset(branches)
+        if _better(best, found):
+            best = found
+    end_run()
+    if best is not None and not all(best):
+        return None
+    return best
+
+
+def required_literals(raw_regex: str) -> Optional[FrozenSet[str]]:
+    """
+    Find the literals required by a regex pattern.
+
+    Any pattern which can't be safely parsed by the standard library
+    returns `None` and will always be checked in full.
+    """
+    if _UNSAFE_SYNTAX.search(raw_regex):
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            parsed = sre_parse.parse(raw_regex)
+    except Exception:
+        return None
+    try:
+        return _required_literals(parsed)
+    except Exception:
+        log.debug("Error finding literals in pattern %s", raw_regex, exc_info=True)
+        return None
+
+
+class LiteralAutomaton:
+    """
+    A small Aho-Corasick automaton for finding every literal present in
+    a piece of text in a single pass.
+    """
+
+    __slots__ = ("_goto", "_fail", "_output")
+
+    def __init__(self, literals: Dict[str, Set[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[FrozenSet[str]] = [frozenset()]
+        outputs: List[Set[str]] = [set()]
+        for literal, names in literals.items():
+            state = 0
+            for char in literal:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                state = next_state
+            outputs[state].update(names)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                outputs[next_state].update(outputs[self._fail[next_state]])
+        self._output = [frozenset(i) for i in outputs]
+
+    def search(self, content: str) -> Set[str]:
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found: Set[str] = set()
+        state = 0
+        for char in content:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class TriggerIndex:
+    """
+    Per guild index of triggers used to rule out triggers that cannot
+    possibly match a message before any full regex search is run.
+    """
+
+    __slots__ = ("unfiltered", "automaton")
+
+    def __init__(self, triggers: Iterable[Trigger]):
+        self.unfiltered: Set[str] = set()
+        literals: Dict[str, Set[str]] = {}
+        for trigger in triggers:
+            required = required_literals(trigger._raw_regex)
+            if required is None:
+                self.unfiltered.add(trigger.name)
+                continue
+            for literal in required:
+                literals.setdefault(literal, set()).add(trigger.name)
+        self.automaton: Optional[LiteralAutomaton] = None
+        if literals:
+            self.automaton = LiteralAutomaton(literals)
+
+    def candidates(self, content: str) -> Set[str]:
+        """Returns the names of triggers that could match the provided content."""
+        if self.automaton is None:
+            return set(self.unfiltered)
+        return self.automaton.search(normalize(content)) | self.unfiltered
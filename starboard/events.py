@@ -1,6 +1,6 @@
 import asyncio
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Literal, Union, cast
+from typing import Dict, List, Literal, Optional, Set, Tuple, Union, cast
 
 import discord
 from discord.utils import snowflake_time
@@ -11,11 +11,23 @@ from redbot.core.i18n import Translator, cog_i18n
 from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import humanize_timedelta
 
-from .starboard_entry import FakePayload, StarboardEntry, StarboardMessage
+from .starboard_entry import (
+    FakePayload,
+    MessageKey,
+    StarboardChanges,
+    StarboardEntry,
+    StarboardMessage,
+    emoji_key,
+    key_to_str,
+)
 
 _ = Translator("Starboard", __file__)
 log = getLogger("red.trusty-cogs.Starboard")
 
+# Seconds to wait after a reaction before writing changed messages to config.
+# Every reaction within this window is coalesced into a single save.
+SAVE_DELAY = 10
+
 
 @cog_i18n(_)
 class StarboardEvents:
@@ -23,6 +35,10 @@ class StarboardEvents:
     config: Config
     starboards: Dict[int, Dict[str, StarboardEntry]]
     ready: asyncio.Event
+    emoji_index: Dict[Tuple[int, Union[int, str]], List[StarboardEntry]]
+    _dirty_guilds: Set[int]
+    _save_task: Optional[asyncio.Task]
+    _save_lock: asyncio.Lock
 
     async def _build_embed(
         self, guild: discord.Guild, message: discord.Message, starboard: StarboardEntry
@@ -149,9 +165,117 @@ class StarboardEvents:
         return embeds
 
     async def _save_starboards(self, guild: discord.Guild) -> None:
-        async with self.config.guild(guild).starboards() as starboards:
-            for name, starboard in self.starboards[guild.id].items():
+        """
+        Write every starboard in the guild to config.
+
+        This re-serializes every saved message so should only be used
+        for settings changes, reactions should use `_queue_save` instead.
+        """
+        async with self._save_lock:
+            async with self.config.guild(guild).starboards() as starboards:
+                for name, starboard in self.starboards[guild.id].items():
+                    changes = starboard.pop_changes()
+                    try:
+                        starboards[name] = await starboard.to_json()
+                    except Exception:
+                        starboard.restore_changes(changes)
+                        raise
+
+    def _rebuild_emoji_index(self, guild_id: int) -> None:
+        """
+        Rebuild the lookup of `(guild_id, emoji)` to starboards for a guild.
+
+        This needs to be called whenever a starboard is added, removed
+        or has its emoji changed.
+        """
+        for key in [k for k in self.emoji_index if k[0] == guild_id]:
+            del self.emoji_index[key]
+        for starboard in self.starboards.get(guild_id, {}).values():
+            key = (guild_id, starboard.emoji_key)
+            # lists are replaced rather than modified so anything iterating
+            # the old list isn't affected
+            self.emoji_index[key] = self.emoji_index.get(key, []) + [starboard]
+
+    def _queue_save(self, guild_id: int) -> None:
+        """
+        Schedule the changed messages in a guild to be saved.
+
+        Saves are delayed by `SAVE_DELAY` seconds so that bursts of reactions
+        only result in a single write per changed message.
+        """
+        self._dirty_guilds.add(guild_id)
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self) -> None:
+        await asyncio.sleep(SAVE_DELAY)
+        await self._flush_starboards()
+
+    async def _flush_starboards(self) -> None:
+        """
+        Write only the messages and index entries which have changed since
+        the last save for every guild waiting to be saved.
+        """
+        async with self._save_lock:
+            guilds = self._dirty_guilds
+            self._dirty_guilds = set()
+            remaining = set(guilds)
+            for guild_id in guilds:
+                changed = [
+                    (name, starboard, starboard.pop_changes())
+                    for name, starboard in list(self.starboards.get(guild_id, {}).items())
+                    if starboard.dirty
+                ]
+                if changed:
+                    try:
+                        await self._write_changes(guild_id, changed)
+                    except asyncio.CancelledError:
+                        # keep anything not written yet so the next flush can save it
+                        for _name, starboard, changes in changed:
+                            starboard.restore_changes(changes)
+                        self._dirty_guilds |= remaining
+                        raise
+                    except Exception:
+                        log.exception("Error saving starboards in %s", guild_id)
+                        for _name, starboard, changes in changed:
+                            starboard.restore_changes(changes)
+                        self._dirty_guilds.add(guild_id)
+                remaining.discard(guild_id)
+
+    async def _write_changes(
+        self, guild_id: int, changed: List[Tuple[str, StarboardEntry, StarboardChanges]]
+    ) -> None:
+        """
+        Apply the changes for every starboard in a guild and save them in one write.
+
+        Every `set` rewrites the whole settings file on the JSON driver
+        so the guild's starboards are written once no matter how many
+        messages changed.
+        """
+        group = self.config.guild_from_id(guild_id).starboards
+        starboards = await group()
+        for name, starboard, changes in changed:
+            data = starboards.get(name)
+            if data is None:
                 starboards[name] = await starboard.to_json()
+                continue
+            messages = data.setdefault("messages", {})
+            for key in changes.messages:
+                message = starboard.messages.get(key)
+                if message is not None:
+                    messages[key_to_str(key)] = message.to_json()
+            for key in changes.removed_messages:
+                messages.pop(key_to_str(key), None)
+            index = data.setdefault("starboarded_messages", {})
+            for index_key in changes.index:
+                key = starboard.starboarded_messages.get(index_key)
+                if key is not None:
+                    index[key_to_str(index_key)] = key_to_str(key)
+            for index_key in changes.removed_index:
+                index.pop(key_to_str(index_key), None)
+            data["starred_messages"] = starboard.starred_messages
+            data["stars_added"] = starboard.stars_added
+        await group.set(starboards)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent) -> None:
@@ -202,6 +326,10 @@ class StarboardEvents:
         """
         if not payload.guild_id:
             return
+        starboards = self.emoji_index.get((payload.guild_id, emoji_key(payload.emoji)))
+        if not starboards:
+            # the vast majority of reactions aren't for a starboard
+            return
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
             return
@@ -209,8 +337,6 @@ class StarboardEvents:
             return
         channel = guild.get_channel_or_thread(payload.channel_id)
 
-        if guild.id not in self.starboards:
-            return
         if await self.bot.cog_disabled_in_guild(self, guild):
             return
 
@@ -221,85 +347,81 @@ class StarboardEvents:
         msg = guild._state._get_message(payload.message_id)
         # I know I am not supposed to use these private methods but I want to avoid
         # lookups if I can while ensuring historical lookups
-        for starboard in self.starboards[guild.id].values():
-            if starboard.emoji == payload.emoji:
-                if not starboard.enabled:
-                    continue
-                allowed_roles = starboard.check_roles(member)
-                allowed_channel = starboard.check_channel(self.bot, channel)
-                if any((not allowed_roles, not allowed_channel)):
-                    log.debug("User or channel not in allowlist")
-                    continue
+        for starboard in starboards:
+            if not starboard.enabled:
+                continue
+            allowed_roles = starboard.check_roles(member)
+            allowed_channel = starboard.check_channel(self.bot, channel)
+            if any((not allowed_roles, not allowed_channel)):
+                log.debug("User or channel not in allowlist")
+                continue
 
-                star_channel = guild.get_channel(starboard.channel)
-                if star_channel is None:
-                    continue
-                if (
-                    not star_channel.permissions_for(guild.me).send_messages
-                    or not star_channel.permissions_for(guild.me).embed_links
-                ):
-                    continue
+            star_channel = guild.get_channel(starboard.channel)
+            if star_channel is None:
+                continue
+            if (
+                not star_channel.permissions_for(guild.me).send_messages
+                or not star_channel.permissions_for(guild.me).embed_links
+            ):
+                continue
 
-                async with starboard.lock:
-                    star_message = await self._loop_messages(payload, starboard, star_channel)
-                    if star_message is True:
-                        continue
-                    if msg is None:
-                        try:
-                            msg = await channel.fetch_message(payload.message_id)
-                        except (discord.errors.NotFound, discord.Forbidden):
-                            continue
-                    if star_message is False:
-                        if getattr(payload, "event_type", None) == "REACTION_REMOVE":
-                            # Return early so we don't create a new starboard message
-                            # when the first time we're seeing the message is on a
-                            # reaction remove event
-                            continue
-
-                        reactions = [payload.user_id]
-                        if payload.user_id == msg.author.id:
-                            if not starboard.selfstar:
-                                reactions.remove(payload.user_id)
-                        star_message = StarboardMessage(
-                            guild=guild.id,
-                            original_message=payload.message_id,
-                            original_channel=payload.channel_id,
-                            new_message=None,
-                            new_channel=None,
-                            author=msg.author.id,
-                            reactions=reactions,
-                        )
-                    starboard.stars_added += 1
-                    key = f"{payload.channel_id}-{payload.message_id}"
-                    # await star_message.update_count(self.bot, starboard, remove)
-                    count = len(star_message.reactions)
-                    # log.debug(f"First time {count=} {starboard.threshold=}")
-                    if count < starboard.threshold:
-                        if key not in starboard.messages:
-                            self.starboards[guild.id][starboard.name].messages[key] = star_message
-                        await self._save_starboards(guild)
+            async with starboard.lock:
+                star_message = await self._loop_messages(payload, starboard, star_channel)
+                if star_message is True:
+                    continue
+                if msg is None:
+                    try:
+                        msg = await channel.fetch_message(payload.message_id)
+                    except (discord.errors.NotFound, discord.Forbidden):
                         continue
-                    if not starboard.selfstar and msg.author.id == payload.user_id:
-                        log.debug("Is a selfstar so let's return")
-                        # this is here to prevent 1 threshold selfstars
+                if star_message is False:
+                    if getattr(payload, "event_type", None) == "REACTION_REMOVE":
+                        # Return early so we don't create a new starboard message
+                        # when the first time we're seeing the message is on a
+                        # reaction remove event
                         continue
-                    embeds = await self._build_embed(guild, msg, starboard)
-                    count_msg = "{emoji} **#{count}**".format(emoji=payload.emoji, count=count)
-                    post_msg = await star_channel.send(count_msg, embeds=embeds)
-                    if starboard.autostar:
-                        try:
-                            await post_msg.add_reaction(starboard.emoji)
-                        except Exception:
-                            log.exception("Error adding autostar.")
-                    if key not in starboard.messages:
-                        self.starboards[guild.id][starboard.name].messages[key] = star_message
-                    star_message.new_message = post_msg.id
-                    star_message.new_channel = star_channel.id
-                    starboard.starred_messages += 1
-                    index_key = f"{star_channel.id}-{post_msg.id}"
-                    self.starboards[guild.id][starboard.name].messages[key] = star_message
-                    self.starboards[guild.id][starboard.name].starboarded_messages[index_key] = key
-                    await self._save_starboards(guild)
+
+                    reactions = [payload.user_id]
+                    if payload.user_id == msg.author.id:
+                        if not starboard.selfstar:
+                            reactions.remove(payload.user_id)
+                    star_message = StarboardMessage(
+                        guild=guild.id,
+                        original_message=payload.message_id,
+                        original_channel=payload.channel_id,
+                        new_message=None,
+                        new_channel=None,
+                        author=msg.author.id,
+                        reactions=reactions,
+                    )
+                starboard.stars_added += 1
+                key = (payload.channel_id, payload.message_id)
+                # await star_message.update_count(self.bot, starboard, remove)
+                count = len(star_message.reactions)
+                # log.debug(f"First time {count=} {starboard.threshold=}")
+                if count < starboard.threshold:
+                    starboard.add_message(key, star_message)
+                    self._queue_save(guild.id)
+                    continue
+                if not starboard.selfstar and msg.author.id == payload.user_id:
+                    log.debug("Is a selfstar so let's return")
+                    # this is here to prevent 1 threshold selfstars
+                    continue
+                embeds = await self._build_embed(guild, msg, starboard)
+                count_msg = "{emoji} **#{count}**".format(emoji=payload.emoji, count=count)
+                post_msg = await star_channel.send(count_msg, embeds=embeds)
+                if starboard.autostar:
+                    try:
+                        await post_msg.add_reaction(starboard.emoji)
+                    except Exception:
+                        log.exception("Error adding autostar.")
+                star_message.new_message = post_msg.id
+                star_message.new_channel = star_channel.id
+                starboard.starred_messages += 1
+                index_key = (star_channel.id, post_msg.id)
+                starboard.add_message(key, star_message)
+                starboard.set_index(index_key, key)
+                self._queue_save(guild.id)
 
     async def red_delete_data_for_user(
         self,
@@ -312,19 +434,14 @@ class StarboardEvents:
         """
         for guild_id, starboards in self.starboards.items():
             for starboard, entry in starboards.items():
-                for message_ids, message in entry.messages.items():
+                for message_ids, message in list(entry.messages.items()):
                     if message.author == user_id:
-                        index_key = f"{message.new_channel}-{message.new_message}"
-                        try:
-                            del self.starboards[guild_id][starboard].messages[message_ids]
-                            del self.starboards[guild_id][starboard].starboarded_messages[
-                                index_key
-                            ]
-                        except Exception:
-                            pass
-            async with self.config.guild_from_id(guild_id).starboards() as starboards:
-                for name, starboard in self.starboards[guild_id].items():
-                    starboards[name] = await starboard.to_json()
+                        index_key = message.index_key
+                        entry.remove_message(message_ids)
+                        if index_key in entry.starboarded_messages:
+                            entry.remove_index(index_key)
+            self._dirty_guilds.add(guild_id)
+        await self._flush_starboards()
 
     async def cleanup_old_messages(self) -> None:
         """This will periodically iterate through old messages
@@ -358,17 +475,17 @@ class StarboardEvents:
                                 if message.new_message:
                                     if snowflake_time(message.new_message) < to_purge:
                                         to_rem.append(message_ids)
-                                        index_key = f"{message.new_channel}-{message.new_message}"
-                                        to_rem_index.append(index_key)
+                                        if message.index_key is not None:
+                                            to_rem_index.append(message.index_key)
                                 else:
                                     if snowflake_time(message.original_message) < to_purge:
                                         to_rem.append(message_ids)
                             for m in to_rem:
                                 log.verbose("Removing %s", m)
-                                del starboard.messages[m]
+                                starboard.remove_message(m)
                                 total_pruned += 1
                             for m in to_rem_index:
-                                del starboard.starboarded_messages[m]
+                                starboard.remove_index(m)
                             if len(to_rem) > 0:
                                 log.info(
                                     "Starboard pruned %s messages that are %s old from %s (%s)",
@@ -379,7 +496,8 @@ class StarboardEvents:
                                 )
                         except Exception:
                             log.exception("Error trying to clenaup old starboard messages.")
-                await self._save_starboards(guild)
+                self._dirty_guilds.add(guild_id)
+            await self._flush_starboards()
             if total_pruned:
                 log.info(
                     "Starboard has pruned %s messages and ignored %s guilds.",
@@ -426,7 +544,7 @@ class StarboardEvents:
             guild = star_channel.guild
         except AttributeError:
             return False
-        key = f"{payload.channel_id}-{payload.message_id}"
+        key: MessageKey = (payload.channel_id, payload.message_id)
         if key in starboard.messages:
             # the starred message was an original starboard message
             starboard_msg = starboard.messages[key]
@@ -444,29 +562,31 @@ class StarboardEvents:
 
         if getattr(payload, "event_type", None) == "REACTION_ADD":
             if (user_id := getattr(payload, "user_id", 0)) not in starboard_msg.reactions:
-                starboard_msg.reactions.append(user_id)
+                starboard_msg.reactions.add(user_id)
                 log.verbose("Adding user (%s) in _loop_messages", user_id)
                 starboard.stars_added += 1
+                starboard.mark_message_dirty(key)
+                self._queue_save(guild.id)
         else:
             if (user_id := getattr(payload, "user_id", 0)) in starboard_msg.reactions:
-                starboard_msg.reactions.remove(user_id)
+                starboard_msg.reactions.discard(user_id)
                 log.verbose("Removing user (%s) in _loop_messages", user_id)
                 starboard.stars_added -= 1
+                starboard.mark_message_dirty(key)
+                self._queue_save(guild.id)
 
         if not starboard_msg.new_message or not starboard_msg.new_channel:
             return starboard_msg
         count = len(starboard_msg.reactions)
         log.debug("Existing count=%s starboard.threshold=%s", count, starboard.threshold)
         if count < starboard.threshold:
-            try:
-                index_key = f"{starboard_msg.new_channel}-{starboard_msg.new_message}"
-                del starboard.starboarded_messages[index_key]
+            index_key = (starboard_msg.new_channel, starboard_msg.new_message)
+            if starboard.remove_index(index_key) is not None:
                 log.debug("Removed old message from index")
-            except KeyError:
-                pass
             await starboard_msg.delete(star_channel)
             starboard.starred_messages -= 1
-            await self._save_starboards(guild)
+            starboard.mark_message_dirty(key)
+            self._queue_save(guild.id)
             return True
         log.debug("Editing starboard")
         count_message = f"{starboard.emoji} **#{count}**"
@@ -1,6 +1,6 @@
 import asyncio
 from datetime import timedelta
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import discord
 from red_commons.logging import getLogger
@@ -38,6 +38,10 @@ class Starboard(StarboardEvents, commands.Cog):
         self.starboards: Dict[int, Dict[str, StarboardEntry]] = {}
         self.ready = asyncio.Event()
         self.cleanup_loop: Optional[asyncio.Task] = None
+        self.emoji_index: Dict[Tuple[int, Union[int, str]], List[StarboardEntry]] = {}
+        self._dirty_guilds: Set[int] = set()
+        self._save_task: Optional[asyncio.Task] = None
+        self._save_lock = asyncio.Lock()
 
     async def cog_load(self) -> None:
         log.debug("Started building starboards cache from config.")
@@ -50,6 +54,7 @@ class Starboard(StarboardEvents, commands.Cog):
                 except Exception:
                     log.exception("error converting starboard")
                 self.starboards[guild_id][name] = starboard
+            self._rebuild_emoji_index(guild_id)
 
         self.cleanup_loop = asyncio.create_task(self.cleanup_old_messages())
         self.ready.set()
@@ -59,6 +64,11 @@ class Starboard(StarboardEvents, commands.Cog):
         self.ready.clear()
         if self.cleanup_loop:
             self.cleanup_loop.cancel()
+        if self._save_task:
+            self._save_task.cancel()
+            # a cancelled flush puts its unsaved changes back before finishing
+            await asyncio.gather(self._save_task, return_exceptions=True)
+        await self._flush_starboards()
 
     async def cog_check(self, ctx: commands.Context) -> bool:
         return self.ready.is_set()
@@ -117,6 +127,7 @@ class Starboard(StarboardEvents, commands.Cog):
             "{emoji} Messages: **{starred_messages}**\n"
             "{emoji} Added: **{stars_added}**\nSelfstar: **{selfstar}**\n"
             "Inherit from parent channel: **{inherit}**\n"
+            "Stored messages: **{stored}** ({memory:.2f} MiB)\n"
         ).format(
             name=starboard.name,
             enabled=starboard.enabled,
@@ -127,6 +138,8 @@ class Starboard(StarboardEvents, commands.Cog):
             stars_added=starboard.stars_added,
             selfstar=starboard.selfstar,
             inherit=starboard.inherit,
+            stored=len(starboard.messages),
+            memory=starboard.memory_usage() / 1024**2,
         )
         if starboard.blacklist:
             channels = [guild.get_channel(c) for c in starboard.blacklist]
@@ -214,6 +227,7 @@ class Starboard(StarboardEvents, commands.Cog):
             return
         starboard = StarboardEntry(name=name, channel=channel.id, emoji=str(emoji), guild=guild.id)
         self.starboards[guild.id][name] = starboard
+        self._rebuild_emoji_index(guild.id)
         await self._save_starboards(guild)
         msg = _("Starboard set to {channel} with emoji {emoji}").format(
             channel=channel.mention, emoji=emoji
@@ -231,7 +245,7 @@ class Starboard(StarboardEvents, commands.Cog):
             return
         channels = 0
         boards = 0
-        for name, starboard in self.starboards[guild.id].items():
+        for name, starboard in list(self.starboards[guild.id].items()):
             channel = guild.get_channel(starboard.channel)
             if channel is None:
                 del self.starboards[guild.id][name]
@@ -251,6 +265,7 @@ class Starboard(StarboardEvents, commands.Cog):
                     if channel is None and role is None:
                         self.starboards[guild.id][name].whitelist.remove(c)
                         channels += 1
+        self._rebuild_emoji_index(guild.id)
         await self._save_starboards(guild)
         msg = _(
             "Removed {channels} channels and roles, and {boards} boards that no longer exist"
@@ -289,6 +304,7 @@ class Starboard(StarboardEvents, commands.Cog):
                 log.exception("Error removing starboard")
                 await ctx.send("Deleting the starboard failed.")
                 return
+        self._rebuild_emoji_index(guild.id)
         await ctx.send(_("Deleted starboard {name}").format(name=starboard.name))
 
     @commands.command()
@@ -888,6 +904,7 @@ class Starboard(StarboardEvents, commands.Cog):
         self.starboards[ctx.guild.id][starboard.name].emoji = discord.PartialEmoji.from_str(
             str(emoji)
         )
+        self._rebuild_emoji_index(guild.id)
         await self._save_starboards(guild)
         msg = _("{emoji} set for starboard {name}").format(emoji=emoji, name=starboard.name)
         await ctx.send(msg)
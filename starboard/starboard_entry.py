@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import sys
+from array import array
+from bisect import bisect_left
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 
 import discord
 from red_commons.logging import getLogger
@@ -11,6 +15,29 @@ from redbot.core.utils import AsyncIter
 
 log = getLogger("red.trusty-cogs.starboard")
 
+# (channel_id, message_id) used to look up stored messages
+MessageKey = Tuple[int, int]
+
+
+def key_to_str(key: MessageKey) -> str:
+    """Convert a message key into the `channel_id-message_id` form used in config"""
+    return f"{key[0]}-{key[1]}"
+
+
+def key_from_str(key: str) -> MessageKey:
+    channel_id, message_id = key.split("-")
+    return int(channel_id), int(message_id)
+
+
+def emoji_key(emoji: Union[discord.PartialEmoji, discord.Emoji, str]) -> Union[int, str]:
+    """
+    A hashable key matching how emojis are compared.
+    Custom emojis are compared by ID and unicode emojis by name.
+    """
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    return emoji.id or emoji.name
+
 
 @dataclass
 class FakePayload:
@@ -24,6 +51,15 @@ class FakePayload:
     event_type: str
 
 
+class StarboardChanges(NamedTuple):
+    """Keys of a starboards messages and index that need to be written to config"""
+
+    messages: Set[MessageKey]
+    removed_messages: Set[MessageKey]
+    index: Set[MessageKey]
+    removed_index: Set[MessageKey]
+
+
 @dataclass
 class StarboardEntry:
     def __init__(self, **kwargs):
@@ -37,14 +73,20 @@ class StarboardEntry:
         self.selfstar: bool = kwargs.get("selfstar", False)
         self.blacklist: List[int] = kwargs.get("blacklist", [])
         self.whitelist: List[int] = kwargs.get("whitelist", [])
-        self.messages: Dict[str, StarboardMessage] = kwargs.get("messages", {})
-        self.starboarded_messages: Dict[str, str] = kwargs.get("starboarded_messages", {})
+        self.messages: Dict[MessageKey, StarboardMessage] = kwargs.get("messages", {})
+        self.starboarded_messages: Dict[MessageKey, MessageKey] = kwargs.get(
+            "starboarded_messages", {}
+        )
         self.threshold: int = kwargs.get("threshold", 1)
         self.autostar: bool = kwargs.get("autostar", False)
         self.starred_messages: int = kwargs.get("starred_messages", 0)
         self.stars_added: int = kwargs.get("stars_added", 0)
         self.lock: asyncio.Lock = asyncio.Lock()
         self.inherit: bool = kwargs.get("inherit", False)
+        self._dirty_messages: Set[MessageKey] = set()
+        self._removed_messages: Set[MessageKey] = set()
+        self._dirty_index: Set[MessageKey] = set()
+        self._removed_index: Set[MessageKey] = set()
 
     def __repr__(self) -> str:
         return (
@@ -52,6 +94,85 @@ class StarboardEntry:
             "enabled={0.enabled} threshold={0.threshold}>"
         ).format(self)
 
+    @property
+    def emoji_key(self) -> Union[int, str]:
+        return emoji_key(self.emoji)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(
+            self._dirty_messages
+            or self._removed_messages
+            or self._dirty_index
+            or self._removed_index
+        )
+
+    def add_message(self, key: MessageKey, message: StarboardMessage) -> None:
+        self.messages[key] = message
+        self.mark_message_dirty(key)
+
+    def mark_message_dirty(self, key: MessageKey) -> None:
+        """Mark a single message as needing to be saved"""
+        self._removed_messages.discard(key)
+        self._dirty_messages.add(key)
+
+    def remove_message(self, key: MessageKey) -> Optional[StarboardMessage]:
+        self._dirty_messages.discard(key)
+        self._removed_messages.add(key)
+        return self.messages.pop(key, None)
+
+    def set_index(self, index_key: MessageKey, key: MessageKey) -> None:
+        self.starboarded_messages[index_key] = key
+        self._removed_index.discard(index_key)
+        self._dirty_index.add(index_key)
+
+    def remove_index(self, index_key: MessageKey) -> Optional[MessageKey]:
+        self._dirty_index.discard(index_key)
+        self._removed_index.add(index_key)
+        return self.starboarded_messages.pop(index_key, None)
+
+    def pop_changes(self) -> StarboardChanges:
+        """
+        Returns every change made since the last save and marks this
+        starboard as clean.
+        """
+        changes = StarboardChanges(
+            self._dirty_messages,
+            self._removed_messages,
+            self._dirty_index,
+            self._removed_index,
+        )
+        self._dirty_messages = set()
+        self._removed_messages = set()
+        self._dirty_index = set()
+        self._removed_index = set()
+        return changes
+
+    def restore_changes(self, changes: StarboardChanges) -> None:
+        """Put back changes that failed to save so they're tried again"""
+        for key in changes.messages - self._removed_messages:
+            self._dirty_messages.add(key)
+        for key in changes.removed_messages - self._dirty_messages:
+            self._removed_messages.add(key)
+        for key in changes.index - self._removed_index:
+            self._dirty_index.add(key)
+        for key in changes.removed_index - self._dirty_index:
+            self._removed_index.add(key)
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes used by the stored messages and index"""
+        size = sys.getsizeof(self.messages) + sys.getsizeof(self.starboarded_messages)
+        # every key is a tuple of two ints, values in the index are the message keys
+        key_size = sys.getsizeof((0, 0)) + 2 * sys.getsizeof(2**63)
+        size += key_size * (len(self.messages) + len(self.starboarded_messages))
+        for message in self.messages.values():
+            size += message.memory_usage()
+        return size
+
+    def mark_clean(self) -> None:
+        """Called once the whole starboard has been saved"""
+        self.pop_changes()
+
     def check_roles(self, member: Union[discord.Member, discord.User]) -> bool:
         """
         Checks if the user is allowed to add to the starboard
@@ -168,9 +289,12 @@ class StarboardEntry:
             "blacklist": self.blacklist,
             "whitelist": self.whitelist,
             "messages": {
-                k: m.to_json() async for k, m in AsyncIter(self.messages.items(), steps=500)
+                key_to_str(k): m.to_json()
+                async for k, m in AsyncIter(self.messages.items(), steps=500)
+            },
+            "starboarded_messages": {
+                key_to_str(k): key_to_str(v) for k, v in self.starboarded_messages.items()
             },
-            "starboarded_messages": self.starboarded_messages,
             "threshold": self.threshold,
             "autostar": self.autostar,
             "starred_messages": self.starred_messages,
@@ -184,26 +308,31 @@ class StarboardEntry:
         guild = data.get("guild", guild_id)
         if guild is None and guild_id is not None:
             guild = guild_id
-        starboarded_messages = data.get("starboarded_messages", {})
+        starboarded_messages = {}
+        for index_key, key in data.get("starboarded_messages", {}).items():
+            try:
+                starboarded_messages[key_from_str(index_key)] = key_from_str(key)
+            except ValueError:
+                # older versions could save messages which were never posted as `None-None`
+                continue
         if isinstance(messages, list):
             new_messages = {}
             async for message_data in AsyncIter(messages, steps=500):
                 message_obj = StarboardMessage.from_json(message_data, guild)
                 if not message_obj.guild:
                     message_obj.guild = guild
-                key = f"{message_obj.original_channel}-{message_obj.original_message}"
-                new_messages[key] = message_obj
+                new_messages[message_obj.key] = message_obj
             messages = new_messages
         else:
             new_messages = {}
             async for key, value in AsyncIter(messages.items()):
                 msg = StarboardMessage.from_json(value, guild)
-                new_messages[key] = msg
+                new_messages[msg.key] = msg
             messages = new_messages
         if not starboarded_messages:
             async for message_ids, obj in AsyncIter(messages.items()):
-                key = f"{obj.new_channel}-{obj.new_message}"
-                starboarded_messages[key] = f"{obj.original_channel}-{obj.original_message}"
+                if obj.index_key is not None:
+                    starboarded_messages[obj.index_key] = obj.key
         starred_messages = data.get("starred_messages", len(starboarded_messages))
         stars_added = data.get("stars_added", 0)
         if not stars_added:
@@ -240,7 +369,70 @@ class StarboardEntry:
         )
 
 
-@dataclass
+class ReactionSet:
+    """
+    A compact sorted set of the user ID's who have reacted to a message.
+
+    ID's are stored as unsigned 64 bit integers in a sorted array which uses
+    a fraction of the memory of a list of python ints and allows
+    membership checks with a binary search.
+    """
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._ids: array = array("Q", sorted(set(ids)))
+
+    def __repr__(self) -> str:
+        return f"<ReactionSet count={len(self._ids)}>"
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        index = bisect_left(self._ids, user_id)
+        return index < len(self._ids) and self._ids[index] == user_id
+
+    def add(self, user_id: int) -> None:
+        index = bisect_left(self._ids, user_id)
+        if index < len(self._ids) and self._ids[index] == user_id:
+            return
+        self._ids.insert(index, user_id)
+
+    def discard(self, user_id: int) -> None:
+        index = bisect_left(self._ids, user_id)
+        if index < len(self._ids) and self._ids[index] == user_id:
+            del self._ids[index]
+
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self._ids)
+
+    def pack(self) -> str:
+        """Pack the ID's into a base64 string of little endian 64 bit integers"""
+        ids = self._ids
+        if sys.byteorder != "little":
+            ids = array("Q", ids)
+            ids.byteswap()
+        return base64.b64encode(ids.tobytes()).decode("ascii")
+
+    @classmethod
+    def unpack(cls, data: Union[str, List[int]]) -> ReactionSet:
+        """Load reactions from either a packed string or an older list of ID's"""
+        if not isinstance(data, str):
+            return cls(data)
+        ids = array("Q")
+        ids.frombytes(base64.b64decode(data))
+        if sys.byteorder != "little":
+            ids.byteswap()
+        reactions = cls()
+        # packed reactions are always saved sorted
+        reactions._ids = ids
+        return reactions
+
+
 class StarboardMessage:
     """A class to hold message objects pertaining
     To starboarded messages including the original
@@ -248,6 +440,16 @@ class StarboardMessage:
     as well as a list of users who have added their "vote"
     """
 
+    __slots__ = (
+        "guild",
+        "original_message",
+        "original_channel",
+        "new_message",
+        "new_channel",
+        "author",
+        "reactions",
+    )
+
     def __init__(self, **kwargs):
         self.guild: int = kwargs.get("guild", None)
         self.original_message: int = kwargs.get("original_message", 0)
@@ -255,7 +457,10 @@ class StarboardMessage:
         self.new_message: Optional[int] = kwargs.get("new_message")
         self.new_channel: Optional[int] = kwargs.get("new_channel")
         self.author: int = kwargs.get("author", 0)
-        self.reactions: List[int] = kwargs.get("reactions", [])
+        reactions = kwargs.get("reactions", [])
+        if not isinstance(reactions, ReactionSet):
+            reactions = ReactionSet(reactions)
+        self.reactions: ReactionSet = reactions
 
     def __repr__(self) -> str:
         return (
@@ -264,6 +469,18 @@ class StarboardMessage:
             "new_channel={0.new_channel} new_message={0.new_message}>"
         ).format(self, len(self.reactions))
 
+    @property
+    def key(self) -> MessageKey:
+        """The key for this message in `StarboardEntry.messages`"""
+        return (self.original_channel, self.original_message)
+
+    @property
+    def index_key(self) -> Optional[MessageKey]:
+        """The key for this message in `StarboardEntry.starboarded_messages`"""
+        if not self.new_channel or not self.new_message:
+            return None
+        return (self.new_channel, self.new_message)
+
     async def delete(self, star_channel: discord.TextChannel) -> None:
         if self.new_message is None:
             return
@@ -336,28 +553,48 @@ class StarboardMessage:
                     continue
                 if not starboard.selfstar and user.id == orig_msg.author.id:
                     continue
-                if user.id not in self.reactions and not user.bot:
-                    self.reactions.append(user.id)
-        if remove and remove in self.reactions:
-            self.reactions.remove(remove)
-        self.reactions = list(set(self.reactions))
+                if not user.bot:
+                    self.reactions.add(user.id)
+        if remove:
+            self.reactions.discard(remove)
         return self
 
-    def to_json(self) -> Dict[str, Union[List[int], int, None]]:
-        return {
-            "guild": self.guild,
-            "original_message": self.original_message,
-            "original_channel": self.original_channel,
-            "new_message": self.new_message,
-            "new_channel": self.new_channel,
-            "author": self.author,
-            "reactions": self.reactions,
-        }
+    def memory_usage(self) -> int:
+        """Approximate number of bytes used by this message"""
+        return sys.getsizeof(self) + self.reactions.memory_usage()
+
+    def to_json(self) -> List[Union[str, int, None]]:
+        """
+        Messages are saved as a list in the order
+        `[original_channel, original_message, new_channel, new_message, author, reactions]`
+        with the reactions packed into a single string.
+        """
+        return [
+            self.original_channel,
+            self.original_message,
+            self.new_channel,
+            self.new_message,
+            self.author,
+            self.reactions.pack(),
+        ]
 
     @classmethod
     def from_json(
-        cls, data: Dict[str, Union[List[int], int, None]], guild_id: Optional[int]
+        cls,
+        data: Union[List[Union[str, int, None]], Dict[str, Union[List[int], int, None]]],
+        guild_id: Optional[int],
     ) -> StarboardMessage:
+        if isinstance(data, list):
+            original_channel, original_message, new_channel, new_message, author, reactions = data
+            return cls(
+                guild=guild_id,
+                original_message=original_message,
+                original_channel=original_channel,
+                new_message=new_message,
+                new_channel=new_channel,
+                author=author,
+                reactions=ReactionSet.unpack(reactions),
+            )
         return cls(
             guild=data.get("guild", guild_id),
             original_message=data.get("original_message"),
@@ -365,5 +602,5 @@ class StarboardMessage:
             new_message=data.get("new_message"),
             new_channel=data.get("new_channel"),
             author=data.get("author"),
-            reactions=data.get("reactions", []),
+            reactions=ReactionSet.unpack(data.get("reactions", [])),
         )